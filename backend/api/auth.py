@@ -1,49 +1,58 @@
 from ninja.security import HttpBearer
 import jwt
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from datetime import datetime
 
-User = get_user_model()
+from api.principal import get_principal, PrincipalUser
+from api.revocation import revocation_filter
+
+
+def decode_token(token):
+    """
+    Decode and verify a JWT, returning its payload or None.
+
+    Tokens are verified once against SECRET_KEY. The legacy mock-auth key is
+    only tried when JWT_ACCEPT_MOCK_TOKENS is enabled (DEBUG builds only), and
+    only when the signature - not the token itself - was the problem.
+    """
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidSignatureError:
+        if not settings.JWT_ACCEPT_MOCK_TOKENS:
+            return None
+    except jwt.InvalidTokenError:
+        return None
+
+    try:
+        return jwt.decode(token, settings.JWT_MOCK_SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+
 
 class JWTAuth(HttpBearer):
     def authenticate(self, request, token):
-        try:
-            # Try with the real secret key first
-            try:
-                payload = jwt.decode(
-                    token,
-                    settings.SECRET_KEY,
-                    algorithms=['HS256']
-                )
-            except jwt.InvalidTokenError:
-                # Try with mock secret key as fallback
-                payload = jwt.decode(
-                    token,
-                    'mock-secret-key',
-                    algorithms=['HS256']
-                )
-            
-            # Check if token is expired
-            exp = payload.get('exp')
-            if exp and datetime.utcnow().timestamp() > exp:
-                return None
-                
-            # Get user
-            user_id = payload.get('user_id')
-            if not user_id:
-                return None
-                
-            try:
-                user = User.objects.get(id=user_id)
-                request.user = user
-                return user
-            except User.DoesNotExist:
-                return None
-                
-        except (jwt.InvalidTokenError, jwt.DecodeError):
+        # Signature and expiry are both verified by jwt.decode
+        payload = decode_token(token)
+        if not payload:
+            return None
+
+        user_id = payload.get('user_id')
+        if not user_id:
             return None
 
+        # Tokens minted before sessions existed carry no sid and simply age out
+        if revocation_filter.is_revoked(payload.get('sid')):
+            return None
+
+        principal = get_principal(user_id)
+        if not principal or not principal.is_active:
+            return None
+
+        user = PrincipalUser(principal)
+        request.principal = principal
+        request.token_payload = payload
+        request.user = user
+        return user
+
 
 # Create a global instance
 jwt_auth = JWTAuth()
@@ -51,15 +60,21 @@ jwt_auth = JWTAuth()
 
 # Optional auth that doesn't require authentication but sets user if token is present
 class OptionalJWTAuth(HttpBearer):
+    def __call__(self, request):
+        # HttpBearer rejects requests without an Authorization header outright
+        if not request.headers.get(self.header):
+            request.user = None
+            return True
+        return super().__call__(request)
+
     def authenticate(self, request, token):
         if not token:
             request.user = None
             return True  # Allow access without token
-            
+
         # Try to authenticate with token
-        auth = JWTAuth()
-        user = auth.authenticate(request, token)
+        user = jwt_auth.authenticate(request, token)
         request.user = user
         return True  # Allow access regardless
 
-optional_jwt_auth = OptionalJWTAuth()
\ No newline at end of file
+optional_jwt_auth = OptionalJWTAuth()
@@ -0,0 +1,214 @@
+"""
+Media delivery for uploaded files (lesson videos, message attachments).
+
+Files are reached through signed, expiring URLs (`signed_url`), so private
+uploads can be linked from API responses without a session on the media
+request. The view answers conditional requests (If-None-Match /
+If-Modified-Since) with 304 and byte ranges with 206, so players can seek
+and interrupted downloads can resume (If-Range guards against the file
+having changed in between).
+
+The bytes themselves are streamed with FileResponse, or handed to the
+frontend server when MEDIA_OFFLOAD is set: 'x-accel' returns an
+X-Accel-Redirect to MEDIA_ACCEL_PREFIX (an nginx `internal` location, which
+then handles ranges itself) and 'x-sendfile' returns an X-Sendfile header
+with the file's path. Storages without local paths (S3) are redirected to
+the storage's own URL, which supports ranges natively.
+"""
+
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote, unquote, urlencode, urlsplit
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.http.request import validate_host
+from django.urls import reverse
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+MEDIA_SALT = "api.media"
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# Signed URLs
+
+def _signature(path, expires):
+    return signing.Signer(salt=MEDIA_SALT).signature(f"{path}:{expires}")
+
+
+def signed_url(path, expires_in=None):
+    """Relative URL that serves `path` (a default-storage name) until it expires"""
+    expires_in = settings.MEDIA_SIGNED_URL_SECONDS if expires_in is None else expires_in
+    expires = int(time.time()) + expires_in
+    url = reverse('signed-media', kwargs={'path': path})
+    return f"{url}?{urlencode({'exp': expires, 'sig': _signature(path, expires)})}"
+
+
+def local_media_path(url):
+    """Storage name for a URL of ours under MEDIA_URL, or None for external URLs"""
+    parts = urlsplit(url or '')
+    if parts.netloc and not validate_host(parts.netloc, settings.ALLOWED_HOSTS):
+        return None
+    if parts.path.startswith(settings.MEDIA_URL):
+        return unquote(parts.path[len(settings.MEDIA_URL):]) or None
+    return None
+
+
+def _valid(path, expires, signature):
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return signing.constant_time_compare(signature, _signature(path, int(expires)))
+
+
+# Ranges and validators
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, None to send the
+    whole file (no or unsupported header), or False if unsatisfiable.
+    """
+    match = _RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(mtime) <= since
+
+
+def _range_applies(request, etag, mtime):
+    """If-Range: only honour the range if the client's copy is still current"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+class _RangeFile:
+    """File-like view of bytes [start, start + length) of an open file"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+# Serving
+
+class _MediaResponse(FileResponse):
+    block_size = STREAM_BLOCK_SIZE
+
+
+def serve_file(request, path, storage=None, cache_seconds=0):
+    """Serve a storage file with validators, ranges and optional offload"""
+    storage = storage or default_storage
+    try:
+        full_path = storage.path(path)
+    except NotImplementedError:
+        # Remote storage: its URLs handle ranges and expiry themselves
+        return HttpResponseRedirect(storage.url(path))
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    etag = _etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f'private, max-age={cache_seconds}' if cache_seconds else 'private, no-cache',
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_OFFLOAD == 'x-accel':
+        # nginx serves the file (ranges included) from its internal location
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(path)
+        response['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    elif settings.MEDIA_OFFLOAD == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+        response['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    else:
+        byte_range = None
+        if _range_applies(request, etag, stat.st_mtime):
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range is None:
+            response = _MediaResponse(open(full_path, 'rb'))
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = _MediaResponse(
+                _RangeFile(open(full_path, 'rb'), start, length),
+                status=206,
+                content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+@require_safe
+def serve_signed(request, path):
+    """Serve a file reached through a `signed_url` link"""
+    expires = request.GET.get('exp', '')
+    if not _valid(path, expires, request.GET.get('sig', '')):
+        # Same answer for missing, forged and expired links
+        raise Http404("Not found")
+    return serve_file(request, path, cache_seconds=max(0, min(int(expires) - int(time.time()), 3600)))
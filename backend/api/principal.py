@@ -0,0 +1,187 @@
+"""
+Principal resolution for JWT-authenticated requests.
+
+Authentication only needs a handful of user attributes, so instead of loading
+the full User row (plus its profile and host profile) on every request we keep
+a compact snapshot in the shared cache. Snapshots are tagged with a per-user
+version that is bumped whenever the user, their profile or their host profile
+is saved, so stale snapshots are never served.
+"""
+
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+User = get_user_model()
+
+PRINCIPAL_KEY = "principal:{user_id}"
+PRINCIPAL_VERSION_KEY = "principal_version:{user_id}"
+
+
+class Principal:
+    """
+    Compact, cacheable snapshot of an authenticated user.
+
+    `is_verified` mirrors `User.is_verified`; `identity_verified` mirrors
+    `UserProfile.is_verified` and is None when the user has no profile.
+    """
+
+    FIELDS = (
+        'id',
+        'username',
+        'user_type',
+        'is_active',
+        'is_staff',
+        'is_verified',
+        'identity_verified',
+        'host_profile_id',
+    )
+
+    __slots__ = FIELDS + ('version',)
+
+    def __init__(self, version=0, **fields):
+        self.version = version
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def is_host(self):
+        return self.host_profile_id is not None
+
+    def to_cache(self) -> dict:
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data['id'] = str(self.id)
+        data['v'] = self.version
+        return data
+
+    @classmethod
+    def from_cache(cls, data: dict) -> 'Principal':
+        fields = {name: data.get(name) for name in cls.FIELDS}
+        fields['id'] = uuid.UUID(fields['id'])
+        return cls(version=data.get('v', 0), **fields)
+
+    def __repr__(self):
+        return f"<Principal {self.username} ({self.user_type})>"
+
+
+class PrincipalUser(SimpleLazyObject):
+    """
+    Lazy stand-in for the authenticated User.
+
+    Attributes covered by the principal snapshot are answered without touching
+    the database; anything else loads the full User row on first access. The
+    object reports `User` as its class, so it can be passed straight into ORM
+    filters (`filter(user=request.auth)`) without triggering that load.
+    """
+
+    SNAPSHOT_ATTRS = frozenset(('id', 'pk', 'username', 'user_type', 'is_active', 'is_staff', 'is_verified'))
+
+    def __init__(self, principal: Principal):
+        self.__dict__['principal'] = principal
+        super().__init__(lambda: User.objects.get(pk=principal.id))
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            if name in self.SNAPSHOT_ATTRS:
+                return getattr(self.principal, name)
+            if name == '_meta':
+                return User._meta
+            # Attribute probes the ORM makes (e.g. hasattr(value, 'resolve_expression'))
+            # would fail on a loaded User too, so answer them without loading it
+            if name != '_state' and not hasattr(User, name):
+                raise AttributeError(name)
+        return super().__getattr__(name)
+
+    @property
+    def __class__(self):
+        return User
+
+    def __bool__(self):
+        return True
+
+    def __hash__(self):
+        return hash(self.principal.id)
+
+    def __repr__(self):
+        if self._wrapped is empty:
+            return f"<PrincipalUser: {self.principal!r}>"
+        return repr(self._wrapped)
+
+
+def _timeout():
+    return getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 300)
+
+
+def load_principal(user_id, version=0) -> Optional[Principal]:
+    """Build a principal from the database in a single joined query."""
+    row = User.objects.filter(pk=user_id).values(
+        'id',
+        'username',
+        'user_type',
+        'is_active',
+        'is_staff',
+        'is_verified',
+        'profile__is_verified',
+        'host_profile__id',
+    ).first()
+    if not row:
+        return None
+
+    return Principal(
+        version=version,
+        id=row['id'],
+        username=row['username'],
+        user_type=row['user_type'],
+        is_active=row['is_active'],
+        is_staff=row['is_staff'],
+        is_verified=row['is_verified'],
+        identity_verified=row['profile__is_verified'],
+        host_profile_id=row['host_profile__id'],
+    )
+
+
+def get_principal(user_id) -> Optional[Principal]:
+    """
+    Resolve a principal, preferring the cached snapshot.
+
+    The snapshot and the user's current version are fetched in one cache
+    round trip; a snapshot tagged with an older version is ignored.
+    """
+    try:
+        user_id = uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+
+    key = PRINCIPAL_KEY.format(user_id=user_id)
+    version_key = PRINCIPAL_VERSION_KEY.format(user_id=user_id)
+    cached = cache.get_many([key, version_key])
+    version = cached.get(version_key, 0)
+
+    snapshot = cached.get(key)
+    if snapshot and snapshot.get('v') == version:
+        return Principal.from_cache(snapshot)
+
+    principal = load_principal(user_id, version)
+    if principal:
+        cache.set(key, principal.to_cache(), _timeout())
+    return principal
+
+
+def invalidate_principal(user_id):
+    """Bump the user's principal version and drop any cached snapshot."""
+    version_key = PRINCIPAL_VERSION_KEY.format(user_id=user_id)
+    cache.add(version_key, 0, None)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # Key was evicted between add() and incr()
+        cache.set(version_key, 1, None)
+    cache.delete(PRINCIPAL_KEY.format(user_id=user_id))
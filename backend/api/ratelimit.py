@@ -0,0 +1,212 @@
+"""
+Sliding-window rate limiting on the shared cache.
+
+Each key keeps one counter per fixed window; a request is weighed against the
+current window's count plus the previous window's count scaled by how much of
+it still overlaps the sliding window. Counters are bumped with an atomic
+`cache.incr`, so concurrent requests in different workers never lose updates
+the way a get-then-set does. If the shared cache is unreachable the limiter
+falls back to per-process counters rather than failing open or closed.
+
+Routes opt in with the `rate_limit` decorator, placed below the router
+decorator:
+
+    @router.post("/login", response=TokenResponse)
+    @rate_limit("login", "10/m", key="ip")
+    def login_user(request, data: LoginRequest):
+        ...
+"""
+
+import logging
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from ninja.responses import Response
+from ninja.throttling import BaseThrottle
+from ninja.utils import contribute_operation_callback
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY = "rl:{key}:{window}"
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class RateLimitResult:
+    """Outcome of a single hit against a limit"""
+
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset', 'retry_after')
+
+    def __init__(self, allowed, limit, remaining, reset, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+    def headers(self):
+        headers = {
+            'RateLimit-Limit': str(self.limit),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(self.reset),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(self.retry_after)
+        return headers
+
+
+def parse_rate(rate):
+    """Parse '10/m' or '100/5m' into (limit, window_seconds)"""
+    count, _, period = rate.partition('/')
+    multiplier = period[:-1] or '1'
+    return int(count), int(multiplier) * _UNITS[period[-1]]
+
+
+class LocalCounters:
+    """Per-process window counters used while the shared cache is down"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            count, expires = self._counts.get(key, (0, 0))
+            if expires <= now:
+                count = 0
+                if len(self._counts) > 10000:
+                    self._counts = {k: v for k, v in self._counts.items() if v[1] > now}
+            self._counts[key] = (count + 1, now + ttl)
+            return count + 1
+
+    def get(self, key):
+        count, expires = self._counts.get(key, (0, 0))
+        return count if expires > time.monotonic() else 0
+
+
+_local = LocalCounters()
+
+
+def _shared_incr(key, ttl):
+    cache.add(key, 0, ttl)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, ttl)
+        return 1
+
+
+def hit(key, limit, window):
+    """
+    Count one request against `key` and report whether it is within
+    `limit` requests per sliding `window` seconds.
+    """
+    now = time.time()
+    current = int(now // window)
+    elapsed = now - current * window
+    current_key = RATE_LIMIT_KEY.format(key=key, window=current)
+    previous_key = RATE_LIMIT_KEY.format(key=key, window=current - 1)
+    ttl = window * 2
+
+    try:
+        count = _shared_incr(current_key, ttl)
+        previous = cache.get(previous_key, 0)
+    except Exception as e:
+        logger.warning(f"Rate limit cache unavailable, using local counters: {e}")
+        count = _local.incr(current_key, ttl)
+        previous = _local.get(previous_key)
+
+    weight = (window - elapsed) / window
+    estimated = previous * weight + count
+    allowed = estimated <= limit
+
+    reset = max(1, math.ceil(window - elapsed))
+    if allowed:
+        retry_after = 0
+    elif count <= limit and previous:
+        # Wait for enough of the previous window to slide out
+        retry_after = math.ceil((estimated - limit) * window / previous)
+    else:
+        retry_after = reset
+
+    return RateLimitResult(
+        allowed=allowed,
+        limit=limit,
+        remaining=max(0, int(limit - estimated)),
+        reset=reset,
+        retry_after=max(1, retry_after),
+    )
+
+
+def client_ip(request):
+    """Client address, honouring NINJA_NUM_PROXIES for X-Forwarded-For"""
+    return BaseThrottle().get_ident(request) or 'unknown'
+
+
+def _request_key(request, key, kwargs):
+    if callable(key):
+        return key(request, **kwargs)
+    if key in ('user', 'user_or_ip'):
+        user = getattr(request, 'auth', None)
+        user_id = getattr(user, 'id', None)
+        if user_id:
+            return f"user:{user_id}"
+        if key == 'user':
+            return None
+    return f"ip:{client_ip(request)}"
+
+
+def _attach_headers(run):
+    @wraps(run)
+    def wrapper(request, *args, **kwargs):
+        response = run(request, *args, **kwargs)
+        results = getattr(request, '_rate_limits', None)
+        if results and not response.has_header('RateLimit-Limit'):
+            # Report the limit closest to being exhausted
+            tightest = min(results, key=lambda r: (r.remaining, -r.reset))
+            for name, value in tightest.headers().items():
+                response[name] = value
+        return response
+    return wrapper
+
+
+def rate_limit(scope, rate, key='user_or_ip', when=None):
+    """
+    Limit a Ninja operation to `rate` requests ('10/m', '100/h', ...).
+
+    `key` is 'user', 'ip', 'user_or_ip' or a callable taking the request and
+    the operation's arguments and returning an identifier (None skips the
+    limit). `when` optionally restricts limiting to matching calls.
+    The rate can be overridden per scope with settings.RATE_LIMITS.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if getattr(settings, 'RATE_LIMIT_ENABLED', True) and (when is None or when(request, **kwargs)):
+                ident = _request_key(request, key, kwargs)
+                if ident:
+                    limit, window = parse_rate(getattr(settings, 'RATE_LIMITS', {}).get(scope, rate))
+                    result = hit(f"{scope}:{ident}", limit, window)
+                    request._rate_limits = getattr(request, '_rate_limits', []) + [result]
+                    if not result.allowed:
+                        response = Response({"error": "Too many requests, please slow down"}, status=429)
+                        for name, value in result.headers().items():
+                            response[name] = value
+                        return response
+            return view_func(request, *args, **kwargs)
+
+        def install(operation):
+            operation.run = _attach_headers(operation.run)
+
+        if not getattr(view_func, '_rate_limit_headers', False):
+            contribute_operation_callback(wrapper, install)
+            wrapper._rate_limit_headers = True
+        return wrapper
+
+    return decorator
@@ -0,0 +1,118 @@
+"""
+In-memory revocation filter for access tokens.
+
+Access tokens are short-lived, so a revoked session only has to be remembered
+until the last access token it could have minted expires. Each worker keeps
+revoked session ids in time buckets keyed by that expiry; a lookup touches at
+most two small sets and never the database.
+
+Workers learn about revocations made elsewhere through an append-only log in
+the shared cache: a sequence counter plus one short-lived entry per
+revocation. The counter is polled at most once per sync interval, so the
+per-request cost is a dictionary lookup.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+REVOCATION_SEQ_KEY = "token_revocations:seq"
+REVOCATION_ENTRY_KEY = "token_revocations:{seq}"
+
+# Entries a fresh worker reads back from the log on its first sync
+BACKFILL_LIMIT = 5000
+SYNC_BATCH_SIZE = 500
+# How long a sequence number may stay unreadable before it is skipped
+MISSING_ENTRY_GRACE_SECONDS = 5
+
+
+class RevocationFilter:
+    """Time-bucketed set of revoked session ids, synced through the cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._seen_seq = None
+        self._missing = {}
+        self._next_sync = 0.0
+
+    @property
+    def bucket_seconds(self):
+        return settings.ACCESS_TOKEN_LIFETIME_SECONDS
+
+    def _add(self, session_id, expires_at):
+        bucket = int(expires_at // self.bucket_seconds)
+        with self._lock:
+            self._buckets.setdefault(bucket, set()).add(session_id)
+
+    def _prune(self, now):
+        current = int(now // self.bucket_seconds)
+        with self._lock:
+            for bucket in [b for b in self._buckets if b < current]:
+                del self._buckets[bucket]
+
+    def revoke(self, session_id):
+        """Revoke every access token carrying this session id"""
+        session_id = str(session_id)
+        ttl = self.bucket_seconds
+        expires_at = time.time() + ttl
+
+        cache.add(REVOCATION_SEQ_KEY, 0, None)
+        try:
+            seq = cache.incr(REVOCATION_SEQ_KEY)
+        except ValueError:
+            cache.set(REVOCATION_SEQ_KEY, 1, None)
+            seq = 1
+        cache.set(REVOCATION_ENTRY_KEY.format(seq=seq), (session_id, expires_at), ttl)
+
+        self._add(session_id, expires_at)
+
+    def is_revoked(self, session_id):
+        if not session_id:
+            return False
+
+        now = time.time()
+        if now >= self._next_sync:
+            self.sync(now)
+
+        current = int(now // self.bucket_seconds)
+        buckets = self._buckets
+        # Tokens expire within one bucket width, so only two buckets are live
+        return session_id in buckets.get(current, ()) or session_id in buckets.get(current + 1, ())
+
+    def sync(self, now=None):
+        """Pull revocations published by other workers since the last sync"""
+        now = now or time.time()
+        self._next_sync = now + getattr(settings, 'TOKEN_REVOCATION_SYNC_SECONDS', 1)
+
+        seq = cache.get(REVOCATION_SEQ_KEY, 0)
+        if self._seen_seq is None or seq < self._seen_seq:
+            # First sync, or the counter was evicted and restarted
+            start = max(0, seq - BACKFILL_LIMIT)
+            self._missing = {}
+        else:
+            start = self._seen_seq
+
+        wanted = list(self._missing) + list(range(start + 1, seq + 1))
+        for offset in range(0, len(wanted), SYNC_BATCH_SIZE):
+            batch = wanted[offset:offset + SYNC_BATCH_SIZE]
+            entries = cache.get_many([REVOCATION_ENTRY_KEY.format(seq=n) for n in batch])
+            for n in batch:
+                entry = entries.get(REVOCATION_ENTRY_KEY.format(seq=n))
+                if entry:
+                    self._missing.pop(n, None)
+                    self._add(*entry)
+                elif n > start or n in self._missing:
+                    # The revoking worker bumps the counter before writing the
+                    # entry; retry briefly rather than dropping it
+                    deadline = self._missing.setdefault(n, now + MISSING_ENTRY_GRACE_SECONDS)
+                    if deadline <= now:
+                        del self._missing[n]
+
+        self._seen_seq = seq
+        self._prune(now)
+
+
+revocation_filter = RevocationFilter()
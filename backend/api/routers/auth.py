@@ -7,19 +7,24 @@ from django.urls import reverse
 from django.http import JsonResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional, Dict, Any
-import jwt
-from django.conf import settings
-from datetime import datetime, timedelta
-from api.auth import jwt_auth
-from allauth.socialaccount.models import SocialApp, SocialAccount
+from api.auth import jwt_auth, decode_token
+from api.ratelimit import client_ip, rate_limit
+from api.tokens import (
+    RefreshTokenError, hash_token, issue_tokens, rotate_refresh_token,
+    revoke_session, revoke_user_sessions,
+)
+from users.models import RefreshToken
+from users.social import clear_provider_documents
+from allauth.socialaccount.models import SocialAccount
 from allauth.socialaccount.helpers import complete_social_login
+from allauth.socialaccount.providers.oauth2.client import OAuth2Error
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.facebook.views import FacebookOAuth2Adapter
 from allauth.socialaccount.providers.linkedin_oauth2.views import LinkedInOAuth2Adapter
 from allauth.socialaccount.providers.apple.views import AppleOAuth2Adapter
 from allauth.socialaccount import app_settings
 from allauth.socialaccount.adapter import get_adapter
-import requests
+import json
 import logging
 
 User = get_user_model()
@@ -43,6 +48,8 @@ class LoginRequest(BaseModel):
 
 class TokenResponse(BaseModel):
     access_token: str
+    refresh_token: str
+    expires_in: int
     token_type: str = "bearer"
     user_id: str
     username: str
@@ -63,15 +70,24 @@ class UserResponse(BaseModel):
     organization_id: Optional[int] = None
 
 
-def generate_token(user):
-    """Generate JWT token for user"""
-    payload = {
-        'user_id': str(user.id),
-        'username': user.username,
-        'exp': datetime.utcnow() + timedelta(days=7),
-        'iat': datetime.utcnow()
-    }
-    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class RefreshResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    expires_in: int
+    token_type: str = "bearer"
+
+
+def _optional_body(request):
+    """Parse a JSON body that clients may omit entirely"""
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
 
 
 @router.post("/register", response=UserResponse)
@@ -112,7 +128,15 @@ def register(request, data: RegisterRequest):
     )
 
 
+def _login_username(request, data, **kwargs):
+    # Per client as well as per username: keyed on the username alone, anyone
+    # could lock a user out by sending a few bad logins a minute
+    return f"username:{data.username.lower()}:ip:{client_ip(request)}"
+
+
 @router.post("/login", response=TokenResponse)
+@rate_limit("login", "20/m", key="ip")
+@rate_limit("login_username", "5/m", key=_login_username)
 def login_user(request, data: LoginRequest):
     """Login and receive JWT token"""
     
@@ -132,14 +156,14 @@ def login_user(request, data: LoginRequest):
     if not user:
         return Response({"error": "Invalid credentials"}, status=401)
     
-    # Generate JWT token
-    token = generate_token(user)
+    # Start a token session: short-lived access token plus rotating refresh token
+    tokens = issue_tokens(user, request)
     
     # Also login the user for session-based auth
     login(request, user)
     
     return TokenResponse(
-        access_token=token,
+        **tokens,
         user_id=str(user.id),
         username=user.username,
         email=user.email,
@@ -147,26 +171,62 @@ def login_user(request, data: LoginRequest):
     )
 
 
+@router.post("/refresh", response=RefreshResponse)
+@rate_limit("token_refresh", "30/m", key="ip")
+def refresh_tokens(request, data: RefreshRequest):
+    """Exchange a refresh token for a new access/refresh token pair"""
+    
+    try:
+        user, tokens = rotate_refresh_token(data.refresh_token, request)
+    except RefreshTokenError as e:
+        return Response({"error": str(e)}, status=401)
+    
+    return RefreshResponse(**tokens)
+
+
 @router.post("/logout")
 def logout_user(request):
-    """Logout the current user"""
+    """Logout the current user and revoke their token session"""
+    
+    # The session can be identified by the bearer token or the refresh token
+    session_id = None
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        payload = decode_token(header[7:])
+        session_id = payload.get('sid') if payload else None
+    refresh_token = _optional_body(request).get('refresh_token')
+    if not session_id and refresh_token:
+        session_id = (
+            RefreshToken.objects.filter(token_hash=hash_token(refresh_token))
+            .values_list('session_id', flat=True)
+            .first()
+        )
+    if session_id:
+        revoke_session(session_id)
+    
     logout(request)
     return {"message": "Successfully logged out"}
 
 
+@router.post("/logout-all", auth=jwt_auth)
+def logout_all_sessions(request):
+    """Revoke every token session of the current user"""
+    
+    revoked = revoke_user_sessions(request.auth)
+    logout(request)
+    return {"message": "Logged out of all sessions", "sessions_revoked": revoked}
+
+
 @router.get("/me", response=UserResponse, auth=jwt_auth)
 def get_current_user(request):
     """Get current user details"""
     
     user = request.auth  # The authenticated user from JWT
     
-    # Get organization ID if user is a host
+    # Organization ID comes from the cached principal, no extra query
     organization_id = None
     if user.user_type.lower() == 'host':
-        try:
-            organization_id = user.host_profile.id
-        except:
-            pass
+        organization_id = request.principal.host_profile_id
     
     return UserResponse(
         id=str(user.id),
@@ -240,6 +300,8 @@ class SocialAuthURLRequest(BaseModel):
 
 class SocialAuthResponse(BaseModel):
     access_token: str
+    refresh_token: str
+    expires_in: int
     token_type: str = "bearer"
     user_id: str
     username: str
@@ -256,30 +318,33 @@ class ProviderURLResponse(BaseModel):
 
 logger = logging.getLogger(__name__)
 
+SOCIAL_ADAPTERS = {
+    'google': GoogleOAuth2Adapter,
+    'facebook': FacebookOAuth2Adapter,
+    'linkedin_oauth2': LinkedInOAuth2Adapter,
+    'apple': AppleOAuth2Adapter,
+}
+
+
+def get_social_app(request, provider):
+    """Look up a provider's app config through the cached adapter lookup"""
+    apps = get_adapter(request).list_apps(request, provider=provider)
+    configured = [app for app in apps if app.client_id]
+    return configured[0] if configured else None
+
 
 @router.post("/social/auth-url", response=ProviderURLResponse)
 def get_social_auth_url(request, data: SocialAuthURLRequest):
     """Get authorization URL for social provider"""
     
-    try:
-        # Get the social app for the provider
-        social_app = SocialApp.objects.get(provider=data.provider)
-    except SocialApp.DoesNotExist:
-        return Response({"error": f"Social provider {data.provider} not configured"}, status=400)
-    
-    # Get the appropriate adapter
-    adapter_map = {
-        'google': GoogleOAuth2Adapter,
-        'facebook': FacebookOAuth2Adapter,
-        'linkedin_oauth2': LinkedInOAuth2Adapter,
-        'apple': AppleOAuth2Adapter,
-    }
-    
-    if data.provider not in adapter_map:
+    if data.provider not in SOCIAL_ADAPTERS:
         return Response({"error": f"Unsupported provider: {data.provider}"}, status=400)
     
-    adapter_class = adapter_map[data.provider]
-    adapter = adapter_class(request)
+    # Get the social app for the provider
+    if not get_social_app(request, data.provider):
+        return Response({"error": f"Social provider {data.provider} not configured"}, status=400)
+    
+    adapter = SOCIAL_ADAPTERS[data.provider](request)
     
     # Generate the authorization URL
     try:
@@ -303,34 +368,27 @@ def get_social_auth_url(request, data: SocialAuthURLRequest):
 def social_auth_callback(request, data: SocialAuthRequest):
     """Handle social authentication callback with authorization code"""
     
-    try:
-        # Get the social app for the provider
-        social_app = SocialApp.objects.get(provider=data.provider)
-    except SocialApp.DoesNotExist:
-        return Response({"error": f"Social provider {data.provider} not configured"}, status=400)
-    
-    # Get the appropriate adapter
-    adapter_map = {
-        'google': GoogleOAuth2Adapter,
-        'facebook': FacebookOAuth2Adapter,
-        'linkedin_oauth2': LinkedInOAuth2Adapter,
-        'apple': AppleOAuth2Adapter,
-    }
-    
-    if data.provider not in adapter_map:
+    if data.provider not in SOCIAL_ADAPTERS:
         return Response({"error": f"Unsupported provider: {data.provider}"}, status=400)
     
+    # Get the social app for the provider
+    app = get_social_app(request, data.provider)
+    if not app:
+        return Response({"error": f"Social provider {data.provider} not configured"}, status=400)
+    
     try:
-        adapter_class = adapter_map[data.provider]
-        adapter = adapter_class(request)
+        adapter = SOCIAL_ADAPTERS[data.provider](request)
         
-        # Exchange authorization code for access token
-        app = adapter.get_provider().get_app(request)
-        token = adapter.parse_token({'code': data.code})
+        # Exchange authorization code for access token over the pooled session
+        client = adapter.get_client(request, app)
+        if data.redirect_uri:
+            client.callback_url = data.redirect_uri
+        token_data = client.get_access_token(data.code)
+        token = adapter.parse_token(token_data)
         token.app = app
         
-        # Get user info from the provider
-        login_data = adapter.complete_login(request, app, token, response={'code': data.code})
+        # Get user info from the provider; id_tokens are verified against cached keys
+        login_data = adapter.complete_login(request, app, token, response=token_data)
         
         # Check if this is a new user
         is_new_user = not login_data.user.pk
@@ -348,11 +406,11 @@ def social_auth_callback(request, data: SocialAuthRequest):
             provider=data.provider
         )
         
-        # Generate JWT token
-        jwt_token = generate_token(user)
+        # Start a token session
+        tokens = issue_tokens(user, request)
         
         return SocialAuthResponse(
-            access_token=jwt_token,
+            **tokens,
             user_id=str(user.id),
             username=user.username,
             email=user.email,
@@ -361,6 +419,15 @@ def social_auth_callback(request, data: SocialAuthRequest):
             social_account_id=str(social_account.id)
         )
         
+    except OAuth2Error as e:
+        if "Invalid 'kid'" in str(e):
+            # Provider rotated its signing keys; refetch them on the next attempt
+            clear_provider_documents()
+        logger.error(f"Social authentication error for {data.provider}: {str(e)}")
+        return Response({
+            "error": "Social authentication failed", 
+            "details": str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Social authentication error for {data.provider}: {str(e)}")
         return Response({
@@ -374,9 +441,12 @@ def get_configured_providers(request):
     """Get list of configured social authentication providers"""
     
     providers = []
-    social_apps = SocialApp.objects.all()
+    social_apps = get_adapter(request).list_apps(request)
     
     for app in social_apps:
+        if not app.client_id:
+            # Settings-backed placeholder without credentials
+            continue
         provider_info = {
             "provider": app.provider,
             "name": app.name,
@@ -3,28 +3,38 @@ Event check-in API endpoints with enterprise-grade security.
 """
 
 from typing import List, Optional
+from uuid import UUID, uuid4
 from datetime import datetime
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from ninja import Router, Schema
+from ninja import Router, Schema, Query
 from ninja.responses import Response
 from pydantic import BaseModel, Field
-import qrcode
-import io
-import base64
 import logging
 
 from api.auth import jwt_auth
-from events.models import Event, EventTicket, DeviceRegistration, CheckIn
-from events.utils import SecureTokenGenerator, CheckInValidator
+from api.exports import stream_export
+from api.ratelimit import rate_limit, hit as rate_limit_hit
+from events.models import Event, EventTicket, EventWaitlistEntry, DeviceRegistration, CheckIn
+from events.utils import SecureTokenGenerator, CheckInValidator, RotatingTicketCode
+from events import counters, registration as registration_service
+from events import qr as qr_render
+from events.checkin import MAX_BATCH_SCANS, process_scans
+from events.issuance import MAX_BULK_ISSUE, issue_tickets
+from events.scanner import build_manifest, load_manifest_signature, sync_scans
 from opportunities.models import Opportunity
-from users.models import UserProfile
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+QR_TOKEN_CACHE_KEY = "qr_token:{ticket_id}"
+QR_TOKEN_REUSE_SECONDS = 5
+
 
 # Request/Response Schemas
 class EventRegistrationRequest(BaseModel):
@@ -46,12 +56,37 @@ class EventTicketResponse(BaseModel):
     checked_in_at: Optional[datetime]
 
 
+class WaitlistResponse(BaseModel):
+    waitlisted: bool = True
+    event_title: str
+    position: int
+    joined_at: datetime
+
+
 class QRCodeResponse(BaseModel):
-    qr_code_base64: str
+    format: str = "png"
+    qr_code_base64: Optional[str] = Field(None, description="PNG or SVG data URI")
+    matrix_size: Optional[int] = Field(None, description="Modules per side, matrix format only")
+    matrix: Optional[str] = Field(None, description="Base64 bit-packed rows, 1 = dark, matrix format only")
     expires_at: datetime
     valid_seconds: int
 
 
+class TicketCodeSecretRequest(BaseModel):
+    reissue: bool = Field(False, description="Revoke the previous secret and issue a new one")
+
+
+class TicketCodeSecretResponse(BaseModel):
+    ticket_id: str
+    secret: str
+    algorithm: str
+    digits: int
+    period: int
+    payload_prefix: str
+    otpauth_uri: str
+    issued_at: datetime
+
+
 class DeviceRegistrationResponse(BaseModel):
     device_id: str
     device_name: str
@@ -60,6 +95,10 @@ class DeviceRegistrationResponse(BaseModel):
     registered_at: datetime
 
 
+class PushTokenRequest(BaseModel):
+    push_token: str = Field("", max_length=255)
+
+
 class CheckInRequest(BaseModel):
     qr_token: str
     device_fingerprint: Optional[str] = None
@@ -75,22 +114,94 @@ class CheckInResponse(BaseModel):
     event_title: Optional[str] = None
 
 
+class OfflineScan(BaseModel):
+    scan_id: UUID = Field(..., description="Client-generated id; makes re-uploads idempotent")
+    qr_token: str
+    scanned_at: datetime
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class ScannerSyncRequest(BaseModel):
+    manifest_signature: str
+    scans: List[OfflineScan] = Field(..., max_length=MAX_BATCH_SCANS)
+
+
+class BatchScan(BaseModel):
+    scan_id: Optional[UUID] = Field(None, description="Client-generated id; makes retries idempotent")
+    qr_token: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class BatchCheckInRequest(BaseModel):
+    scans: List[BatchScan] = Field(..., min_length=1, max_length=MAX_BATCH_SCANS)
+
+
+class ScanResult(BaseModel):
+    scan_id: str
+    success: bool
+    result: str
+    message: str
+    ticket_id: Optional[str] = None
+    duplicate: bool = False
+    user_name: Optional[str] = None
+    user_email: Optional[str] = None
+    event_title: Optional[str] = None
+
+
+class ScanBatchResponse(BaseModel):
+    processed: int
+    checked_in: int
+    results: List[ScanResult]
+
+
+class BulkIssueRequest(BaseModel):
+    users: List[str] = Field(..., min_length=1, max_length=MAX_BULK_ISSUE, description="User ids or emails")
+
+
+class BulkIssueRow(BaseModel):
+    row: int
+    input: str
+    status: str
+    user_id: Optional[str] = None
+    ticket_id: Optional[str] = None
+    message: str
+
+
+class BulkIssueResponse(BaseModel):
+    issued: int
+    skipped: int
+    results: List[BulkIssueRow]
+
+
 # Event Registration Endpoints
-@router.post("/opportunities/{opportunity_id}/register-for-event", response=EventTicketResponse, auth=jwt_auth)
+@router.post(
+    "/opportunities/{opportunity_id}/register-for-event",
+    response={200: EventTicketResponse, 202: WaitlistResponse},
+    auth=jwt_auth,
+)
 def register_for_event(request, opportunity_id: str, registration: EventRegistrationRequest):
     """
     Register a verified user for an event.
     Requires user to be verified and opportunity to have an associated event.
+    
+    Returns the ticket, or 202 with a waitlist position when the event is
+    full. Send an `Idempotency-Key` header to make retries safe: repeating
+    a request with the same key returns the original outcome.
     """
     user = request.user
     
+    idempotency_key = request.headers.get('Idempotency-Key', '')
+    if len(idempotency_key) > 64:
+        return Response({"error": "Idempotency-Key must be at most 64 characters"}, status=400)
+    
     # Check user verification
-    try:
-        profile = user.profile
-        if not profile.is_verified:
-            return Response({"error": "User verification required to register for events"}, status=403)
-    except UserProfile.DoesNotExist:
+    identity_verified = request.principal.identity_verified
+    if identity_verified is None:
         return Response({"error": "User profile not found"}, status=404)
+    if not identity_verified:
+        return Response({"error": "User verification required to register for events"}, status=403)
     
     # Get opportunity and event
     opportunity = get_object_or_404(Opportunity, id=opportunity_id)
@@ -99,46 +210,41 @@ def register_for_event(request, opportunity_id: str, registration: EventRegistra
     except Event.DoesNotExist:
         return Response({"error": "This opportunity does not have check-in enabled"}, status=400)
     
-    # Check if already registered
-    if EventTicket.objects.filter(event=event, user=user).exists():
-        return Response({"error": "Already registered for this event"}, status=400)
-    
-    # Check capacity
-    if event.max_attendees:
-        current_registrations = event.tickets.filter(status='active').count()
-        if current_registrations >= event.max_attendees:
-            return Response({"error": "Event is at capacity"}, status=400)
-    
-    with transaction.atomic():
-        # Handle device registration if provided
-        device = None
-        if registration.device_fingerprint and event.require_device_registration:
-            fingerprint_hash = SecureTokenGenerator.generate_device_fingerprint({
-                'device_id': registration.device_fingerprint,
-                'user_id': str(user.id),
-                'device_type': registration.device_type or 'unknown',
-            })
-            
-            device, created = DeviceRegistration.objects.get_or_create(
-                device_fingerprint_hash=fingerprint_hash,
-                defaults={
-                    'user': user,
-                    'device_type': registration.device_type or 'web',
-                    'device_name': registration.device_name or 'Unknown Device',
-                }
-            )
-            
-            if not created and device.user != user:
-                return Response({"error": "Device registered to another user"}, status=400)
+    # Handle device registration if provided
+    device = None
+    if registration.device_fingerprint and event.require_device_registration:
+        fingerprint_hash = SecureTokenGenerator.generate_device_fingerprint({
+            'device_id': registration.device_fingerprint,
+            'user_id': str(user.id),
+            'device_type': registration.device_type or 'unknown',
+        })
         
-        # Create ticket
-        ticket = EventTicket.objects.create(
-            event=event,
-            user=user,
-            registered_device=device,
+        device, created = DeviceRegistration.objects.get_or_create(
+            device_fingerprint_hash=fingerprint_hash,
+            defaults={
+                'user': user,
+                'device_type': registration.device_type or 'web',
+                'device_name': registration.device_name or 'Unknown Device',
+            }
         )
         
-        logger.info(f"User {user.username} registered for event {event.opportunity.title}")
+        if not created and device.user_id != user.id:
+            return Response({"error": "Device registered to another user"}, status=400)
+    
+    try:
+        ticket, entry = registration_service.register(event, user, device, idempotency_key)
+    except registration_service.RegistrationError as e:
+        return Response({"error": str(e)}, status=400)
+    
+    if entry:
+        logger.info(f"User {user.username} joined the waitlist for event {opportunity.title}")
+        return 202, WaitlistResponse(
+            event_title=opportunity.title,
+            position=registration_service.waitlist_position(entry),
+            joined_at=entry.created_at,
+        )
+    
+    logger.info(f"User {user.username} registered for event {opportunity.title}")
     
     return EventTicketResponse(
         ticket_id=str(ticket.id),
@@ -154,6 +260,36 @@ def register_for_event(request, opportunity_id: str, registration: EventRegistra
     )
 
 
+@router.delete("/opportunities/{opportunity_id}/waitlist", auth=jwt_auth)
+def leave_waitlist(request, opportunity_id: str):
+    """Give up a place on an event's waitlist"""
+    entry = get_object_or_404(
+        EventWaitlistEntry,
+        event__opportunity_id=opportunity_id,
+        user_id=request.principal.id,
+        status='waiting',
+    )
+    registration_service.withdraw(entry)
+    return {"success": True, "message": "Left the waitlist"}
+
+
+@router.post("/tickets/{ticket_id}/cancel", auth=jwt_auth)
+def cancel_ticket(request, ticket_id: str):
+    """
+    Cancel your ticket. The seat goes to the next person on the waitlist.
+    """
+    ticket = get_object_or_404(EventTicket, id=ticket_id, user_id=request.principal.id)
+    
+    if ticket.checked_in_at:
+        return Response({"error": "Ticket has already been used to check in"}, status=400)
+    
+    if not registration_service.cancel_ticket(ticket):
+        return Response({"error": "Ticket is not active"}, status=400)
+    
+    logger.info(f"Ticket {ticket.id} cancelled by its holder")
+    return {"success": True, "message": "Ticket cancelled"}
+
+
 @router.get("/events/my-tickets", response=List[EventTicketResponse], auth=jwt_auth)
 def get_my_tickets(request):
     """Get all event tickets for the authenticated user."""
@@ -179,15 +315,35 @@ def get_my_tickets(request):
     ]
 
 
+def _current_qr_token(ticket, user_id):
+    """
+    The ticket's current QR token. Requests arriving within a few seconds of
+    each other (retries, duplicate refreshes) share one token, and with it
+    one cached render.
+    """
+    key = QR_TOKEN_CACHE_KEY.format(ticket_id=ticket.id)
+    token_data = cache.get(key)
+    if token_data is None:
+        token_data = SecureTokenGenerator.generate_qr_token(
+            ticket_id=str(ticket.id),
+            user_id=user_id
+        )
+        cache.set(key, token_data, QR_TOKEN_REUSE_SECONDS)
+    return token_data
+
+
 @router.get("/tickets/{ticket_id}/qr-code", response=QRCodeResponse, auth=jwt_auth)
-def generate_qr_code(request, ticket_id: str):
+def generate_qr_code(request, ticket_id: str, format: Optional[str] = None):
     """
     Generate a time-limited QR code for event check-in.
     QR codes rotate based on event settings.
+    
+    `format` (or the Accept header) selects a PNG data URI (default), an
+    SVG data URI, or the raw bit-packed module matrix.
     """
     # Get ticket and verify ownership
     ticket = get_object_or_404(EventTicket, id=ticket_id)
-    if ticket.user != request.user:
+    if ticket.user_id != request.principal.id:
         return Response({"error": "Not authorized to access this ticket"}, status=403)
     
     # Check basic ticket validity (but allow QR generation even when check-in is closed)
@@ -198,41 +354,27 @@ def generate_qr_code(request, ticket_id: str):
         return Response({"error": "Ticket already used"}, status=400)
     
     # Verify user is still verified
-    try:
-        profile = ticket.user.profile
-        if not profile.is_verified:
-            return Response({"error": "User verification required"}, status=400)
-    except:
+    identity_verified = request.principal.identity_verified
+    if identity_verified is None:
         return Response({"error": "User profile not found"}, status=400)
+    if not identity_verified:
+        return Response({"error": "User verification required"}, status=400)
     
     try:
-        # Generate secure token
-        token_data = SecureTokenGenerator.generate_qr_token(
-            ticket_id=str(ticket.id),
-            user_id=request.user.id
+        token_data = _current_qr_token(ticket, request.user.id)
+        rendered = qr_render.render(
+            token_data['token'],
+            qr_render.negotiate_format(request, format),
         )
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(token_data['token'])
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+        expires_at = datetime.fromisoformat(token_data['expires_at'])
         
         return QRCodeResponse(
-            qr_code_base64=f"data:image/png;base64,{qr_base64}",
-            expires_at=datetime.fromisoformat(token_data['expires_at']),
-            valid_seconds=token_data['valid_seconds'],
+            format=rendered['format'],
+            qr_code_base64=rendered.get('data_uri'),
+            matrix_size=rendered.get('size'),
+            matrix=rendered.get('modules'),
+            expires_at=expires_at,
+            valid_seconds=max(0, int((expires_at - timezone.now()).total_seconds())),
         )
         
     except ValueError as e:
@@ -242,6 +384,45 @@ def generate_qr_code(request, ticket_id: str):
         return Response({"error": "Failed to generate QR code"}, status=500)
 
 
+@router.post("/tickets/{ticket_id}/code-secret", response=TicketCodeSecretResponse, auth=jwt_auth)
+@rate_limit("ticket_code_secret", "10/h", key="user")
+def issue_ticket_code_secret(request, ticket_id: str, data: TicketCodeSecretRequest):
+    """
+    Hand the attendee's app the secret it needs to generate rotating check-in
+    codes offline. The secret is issued once; reissuing revokes the old one.
+    """
+    ticket = get_object_or_404(EventTicket.objects.select_related('event'), id=ticket_id)
+    if ticket.user_id != request.principal.id:
+        return Response({"error": "Not authorized to access this ticket"}, status=403)
+    
+    if ticket.status != 'active':
+        return Response({"error": "Ticket is not active"}, status=400)
+    
+    if ticket.checked_in_at:
+        return Response({"error": "Ticket already used"}, status=400)
+    
+    if not request.principal.identity_verified:
+        return Response({"error": "User verification required"}, status=400)
+    
+    if ticket.code_secret_issued_at and not data.reissue:
+        return Response({"error": "Code secret already issued for this ticket"}, status=409)
+    
+    update_fields = ['code_secret_issued_at']
+    if ticket.code_secret_issued_at:
+        # New server_token => new derived secret; the old one stops validating
+        ticket.server_token = ''
+        ticket.code_last_step = None
+        update_fields += ['server_token', 'code_last_step']
+    ticket.code_secret_issued_at = timezone.now()
+    ticket.save(update_fields=update_fields)
+    
+    return TicketCodeSecretResponse(
+        ticket_id=str(ticket.id),
+        issued_at=ticket.code_secret_issued_at,
+        **RotatingTicketCode.provisioning_data(ticket, ticket.event.qr_rotation_seconds),
+    )
+
+
 # Device Management Endpoints
 @router.get("/devices", response=List[DeviceRegistrationResponse], auth=jwt_auth)
 def get_my_devices(request):
@@ -263,6 +444,23 @@ def get_my_devices(request):
     ]
 
 
+@router.put("/devices/{device_id}/push-token", auth=jwt_auth)
+def set_device_push_token(request, device_id: str, data: PushTokenRequest):
+    """
+    Set (or clear, with an empty token) the push token of a registered device.
+    A token moves with the app install, so it is removed from any other device.
+    """
+    device = get_object_or_404(DeviceRegistration, id=device_id, user=request.user, is_active=True)
+    
+    with transaction.atomic():
+        if data.push_token:
+            DeviceRegistration.objects.filter(push_token=data.push_token).exclude(id=device.id).update(push_token='')
+        device.push_token = data.push_token
+        device.save(update_fields=['push_token', 'last_seen_at'])
+    
+    return {"success": True}
+
+
 @router.delete("/devices/{device_id}", auth=jwt_auth)
 def remove_device(request, device_id: str):
     """Remove a registered device."""
@@ -274,6 +472,77 @@ def remove_device(request, device_id: str):
 
 
 # Check-in Endpoints (for event staff/scanners)
+def _get_check_in_ticket(ticket_id):
+    try:
+        return EventTicket.objects.select_related(
+            'event__opportunity', 'user', 'registered_device'
+        ).get(id=ticket_id)
+    except (EventTicket.DoesNotExist, ValueError):
+        return None
+
+
+def _resolve_qr_token(qr_token, scanner_id):
+    """Server-minted JWT QR token -> (ticket, error)"""
+    ticket_id, error = SecureTokenGenerator.validate_qr_token(qr_token, scanner_id)
+    if error:
+        return None, error
+    
+    ticket = _get_check_in_ticket(ticket_id)
+    if not ticket:
+        return None, "Invalid ticket"
+    return ticket, None
+
+
+def _resolve_rotating_code(payload, scanner_id):
+    """
+    Device-generated rotating code -> (ticket, error).
+    
+    The code must match a time step within the skew window and be newer than
+    the last step accepted for the ticket, so a photographed code cannot be
+    replayed even inside its own validity window.
+    """
+    if not rate_limit_hit(f"qr_val:{scanner_id}", SecureTokenGenerator.MAX_VALIDATION_PER_MINUTE, 60).allowed:
+        return None, "Scanner rate limit exceeded"
+    
+    ticket_id, code = RotatingTicketCode.parse_payload(payload)
+    if not ticket_id:
+        return None, "Invalid token format"
+    
+    ticket = _get_check_in_ticket(ticket_id)
+    if not ticket or not ticket.code_secret_issued_at:
+        return None, "Invalid ticket"
+    
+    step = RotatingTicketCode.match_step(ticket.server_token, code, ticket.event.qr_rotation_seconds)
+    if step is None:
+        return ticket, "Invalid or expired code"
+    
+    # Atomically claim the step; a concurrent scan of the same code loses
+    claimed = EventTicket.objects.filter(
+        Q(code_last_step__isnull=True) | Q(code_last_step__lt=step),
+        pk=ticket.pk,
+    ).update(code_last_step=step)
+    if not claimed:
+        return ticket, "Token already used"
+    
+    ticket.code_last_step = step
+    return ticket, None
+
+
+def _save_attempt(check_in_record):
+    # The audit row needs an event; scans that never resolved to one are only logged
+    if check_in_record.event_id:
+        with transaction.atomic():
+            check_in_record.save()
+            counters.increment(
+                check_in_record.event_id, counters.check_in_deltas([check_in_record.result])
+            )
+    else:
+        logger.warning(
+            f"Unresolved check-in scan by user {check_in_record.scanner_user_id}: "
+            f"{check_in_record.result_message}"
+        )
+
+
 @router.post("/events/check-in", response=CheckInResponse, auth=jwt_auth)
 def check_in_attendee(request, check_in_data: CheckInRequest):
     """
@@ -285,7 +554,7 @@ def check_in_attendee(request, check_in_data: CheckInRequest):
     # Validate scanner permissions
     # TODO: Add proper role-based access control for event staff
     # For now, we'll check if user is a host
-    if not hasattr(scanner_user, 'host_profile'):
+    if not request.principal.is_host:
         return Response({"error": "Not authorized to perform check-ins"}, status=403)
     
     # Record all check-in attempts for audit
@@ -298,29 +567,21 @@ def check_in_attendee(request, check_in_data: CheckInRequest):
         user_agent=request.META.get('HTTP_USER_AGENT', ''),
     )
     
-    # Validate token
-    ticket_id, error = SecureTokenGenerator.validate_qr_token(
-        check_in_data.qr_token,
-        scanner_user.id
-    )
+    # Rotating codes are generated on the attendee's device; JWT tokens by the server
+    if RotatingTicketCode.is_code_payload(check_in_data.qr_token):
+        ticket, error = _resolve_rotating_code(check_in_data.qr_token, scanner_user.id)
+    else:
+        ticket, error = _resolve_qr_token(check_in_data.qr_token, scanner_user.id)
     
     if error:
         check_in_record.result = 'invalid_token'
         check_in_record.result_message = error
-        check_in_record.save()
+        if ticket:
+            check_in_record.ticket = ticket
+            check_in_record.event = ticket.event
+        _save_attempt(check_in_record)
         return CheckInResponse(success=False, message=error)
     
-    # Get ticket
-    try:
-        ticket = EventTicket.objects.select_related(
-            'event__opportunity', 'user', 'registered_device'
-        ).get(id=ticket_id)
-    except EventTicket.DoesNotExist:
-        check_in_record.result = 'invalid_token'
-        check_in_record.result_message = "Ticket not found"
-        check_in_record.save()
-        return CheckInResponse(success=False, message="Invalid ticket")
-    
     check_in_record.ticket = ticket
     check_in_record.event = ticket.event
     
@@ -341,18 +602,19 @@ def check_in_attendee(request, check_in_data: CheckInRequest):
         }
         check_in_record.result = result_map.get(error_message, "unknown_error")
         check_in_record.result_message = error_message
-        check_in_record.save()
+        _save_attempt(check_in_record)
         return CheckInResponse(success=False, message=error_message)
     
     # Perform check-in
     with transaction.atomic():
         ticket.checked_in_at = timezone.now()
         ticket.checked_in_by = scanner_user
-        ticket.save()
+        ticket.save(update_fields=['checked_in_at', 'checked_in_by'])
         
         check_in_record.result = 'success'
         check_in_record.result_message = "Successfully checked in"
         check_in_record.save()
+        counters.increment(ticket.event_id, counters.check_in_deltas(['success']))
         
         logger.info(
             f"User {ticket.user.username} checked in to {ticket.event.opportunity.title} "
@@ -368,30 +630,149 @@ def check_in_attendee(request, check_in_data: CheckInRequest):
     )
 
 
-@router.get("/events/{event_id}/attendees", auth=jwt_auth)
-def get_event_attendees(request, event_id: str):
+@router.post("/events/check-in/batch", response=ScanBatchResponse, auth=jwt_auth)
+@rate_limit("check_in_batch", "60/m", key="user")
+def check_in_batch(request, data: BatchCheckInRequest):
     """
-    Get list of checked-in attendees for an event.
+    Check in a batch of scans from a door scanner in one request.
+    
+    All tokens are validated in one pass, the tickets are loaded with a
+    single query and the results are written in one transaction.
+    """
+    if not request.principal.is_host:
+        return Response({"error": "Only event hosts can check in attendees"}, status=403)
+    
+    now = timezone.now()
+    scans = [
+        {
+            'scan_id': scan.scan_id or uuid4(),
+            'qr_token': scan.qr_token,
+            'scanned_at': now,
+            'latitude': scan.latitude,
+            'longitude': scan.longitude,
+        }
+        for scan in data.scans
+    ]
+    
+    results = process_scans(
+        scans,
+        request.user,
+        EventTicket.objects.filter(event__opportunity__host_id=request.principal.host_profile_id),
+        request_meta=request.META,
+    )
+    
+    return _batch_response(results)
+
+
+def _batch_response(results):
+    return ScanBatchResponse(
+        processed=len(results),
+        checked_in=sum(1 for r in results if r['success'] and not r['duplicate']),
+        results=results,
+    )
+
+
+def _get_hosted_event(request, event_id):
+    """Load an event owned by the requesting host, or return an error response"""
+    event = get_object_or_404(Event.objects.select_related('opportunity'), id=event_id)
+    
+    if not request.principal.is_host:
+        return None, Response({"error": "Not authorized"}, status=403)
+    
+    if event.opportunity.host_id != request.principal.host_profile_id:
+        return None, Response({"error": "Not authorized for this event"}, status=403)
+    
+    return event, None
+
+
+# Offline scanner mode
+@router.get("/events/{event_id}/scanner-manifest", auth=jwt_auth)
+@rate_limit("scanner_manifest", "30/m", key="user")
+def get_scanner_manifest(request, event_id: int):
+    """
+    Download a signed manifest of the event's tickets so a scanner can keep
+    validating check-ins without connectivity.
+    """
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
+    
+    return build_manifest(event, request.user)
+
+
+@router.post("/events/{event_id}/scanner-sync", response=ScanBatchResponse, auth=jwt_auth)
+def sync_offline_scans(request, event_id: int, data: ScannerSyncRequest):
+    """
+    Upload scans recorded offline. Every scan is re-validated at the time it
+    was taken and the batch is applied in one transaction.
+    """
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
+    
+    if not load_manifest_signature(data.manifest_signature, event, request.user):
+        return Response({"error": "Invalid or expired manifest signature"}, status=400)
+    
+    results = sync_scans(
+        event,
+        request.user,
+        [scan.model_dump() for scan in data.scans],
+        request_meta=request.META,
+    )
+    
+    return _batch_response(results)
+
+
+@router.post("/events/{event_id}/tickets/bulk", response=BulkIssueResponse, auth=jwt_auth)
+@rate_limit("bulk_issue", "10/m", key="user")
+def bulk_issue_tickets(request, event_id: int, data: BulkIssueRequest):
+    """
+    Issue tickets to a list of existing users (ids or emails), e.g. when
+    importing an attendee list. Returns one result per input row.
     Only event hosts can access this.
     """
-    event = get_object_or_404(Event, id=event_id)
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
     
-    # Check permissions
-    if not hasattr(request.user, 'host_profile'):
-        return Response({"error": "Not authorized"}, status=403)
+    issued, report = issue_tickets(event, data.users)
+    logger.info(f"Host {request.user.username} bulk issued {issued} tickets for event {event.id}")
     
-    if event.opportunity.host != request.user.host_profile:
-        return Response({"error": "Not authorized for this event"}, status=403)
+    return BulkIssueResponse(
+        issued=issued,
+        skipped=len(report) - issued,
+        results=report,
+    )
+
+
+@router.get("/events/{event_id}/attendees", auth=jwt_auth)
+def get_event_attendees(
+    request,
+    event_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200)
+):
+    """
+    Get a page of checked-in attendees for an event, most recent first.
+    Only event hosts can access this.
+    """
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
     
+    totals = counters.snapshot(event.id)
+    offset = (page - 1) * page_size
     attendees = EventTicket.objects.filter(
         event=event,
         checked_in_at__isnull=False
-    ).select_related('user').order_by('-checked_in_at')
+    ).select_related('user').order_by('-checked_in_at')[offset:offset + page_size]
     
     return {
         "event_title": event.opportunity.title,
-        "total_registered": event.tickets.filter(status='active').count(),
-        "total_checked_in": attendees.count(),
+        "total_registered": totals['registered'],
+        "total_checked_in": totals['checked_in'],
+        "page": page,
+        "page_size": page_size,
         "attendees": [
             {
                 "name": ticket.user.get_full_name() or ticket.user.username,
@@ -408,23 +789,15 @@ def get_check_in_stats(request, event_id: str):
     """
     Get check-in statistics and recent activity for an event.
     Only event hosts can access this.
-    """
-    event = get_object_or_404(Event, id=event_id)
-    
-    # Check permissions
-    if not hasattr(request.user, 'host_profile'):
-        return Response({"error": "Not authorized"}, status=403)
     
-    if event.opportunity.host != request.user.host_profile:
-        return Response({"error": "Not authorized for this event"}, status=403)
+    Stats come from the live counters; the dashboard follows updates from
+    `stats.seq` on by polling the live endpoint.
+    """
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
     
-    # Get stats
-    from django.db.models import Count, Q
-    stats = CheckIn.objects.filter(event=event).aggregate(
-        total_scans=Count('id'),
-        successful_scans=Count('id', filter=Q(result='success')),
-        failed_scans=Count('id', filter=~Q(result='success')),
-    )
+    stats = counters.snapshot(event.id)
     
     # Get recent activity
     recent_attempts = CheckIn.objects.filter(
@@ -443,4 +816,88 @@ def get_check_in_stats(request, event_id: str):
             }
             for attempt in recent_attempts
         ]
-    }
\ No newline at end of file
+    }
+
+
+TICKET_EXPORT_COLUMNS = [
+    ('ticket_id', 'id'),
+    ('username', 'user__username'),
+    ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'),
+    ('email', 'user__email'),
+    ('status', 'status'),
+    ('registered_at', 'registered_at'),
+    ('checked_in_at', 'checked_in_at'),
+]
+
+CHECK_IN_EXPORT_COLUMNS = [
+    ('check_in_id', 'id'),
+    ('created_at', 'created_at'),
+    ('scanned_at', 'scanned_at'),
+    ('result', 'result'),
+    ('result_message', 'result_message'),
+    ('ticket_id', 'ticket_id'),
+    ('attendee_email', 'ticket__user__email'),
+    ('scanner', 'scanner_user__username'),
+    ('scanner_device_id', 'scanner_device_id'),
+    ('ip_address', 'ip_address'),
+]
+
+
+@router.get("/events/{event_id}/export/tickets", auth=jwt_auth)
+@rate_limit("export", "10/m", key="user")
+def export_event_tickets(request, event_id: int, format: str = Query('csv', pattern='^(csv|ndjson)$')):
+    """
+    Stream every ticket for an event as CSV or NDJSON.
+    Only event hosts can access this.
+    """
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
+    
+    return stream_export(
+        EventTicket.objects.filter(event=event).order_by('registered_at'),
+        TICKET_EXPORT_COLUMNS,
+        filename=f"event-{event.id}-tickets",
+        format=format,
+    )
+
+
+@router.get("/events/{event_id}/export/check-ins", auth=jwt_auth)
+@rate_limit("export", "10/m", key="user")
+def export_event_check_ins(request, event_id: int, format: str = Query('csv', pattern='^(csv|ndjson)$')):
+    """
+    Stream the raw check-in attempt log for an event, oldest first.
+    Attempts already compacted away are in the daily summaries and archives.
+    Only event hosts can access this.
+    """
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
+    
+    return stream_export(
+        CheckIn.objects.filter(event=event).order_by('created_at'),
+        CHECK_IN_EXPORT_COLUMNS,
+        filename=f"event-{event.id}-check-ins",
+        format=format,
+    )
+
+
+@router.get("/events/{event_id}/live", auth=jwt_auth)
+def poll_check_in_counters(request, event_id: int, response: HttpResponse, since: Optional[int] = None):
+    """
+    Changes to an event's check-in counters since sequence number `since`.
+    
+    Dashboards start from `stats.seq` of check-in-stats and poll every
+    `poll_seconds`, passing back the last `seq`; the answer is the deltas
+    since then, or a fresh snapshot when there is no `since` or the log no
+    longer reaches back that far. Returns at once rather than holding the
+    request open, so dashboards never tie up worker threads.
+    Only event hosts can access this.
+    """
+    event, error = _get_hosted_event(request, event_id)
+    if error:
+        return error
+    
+    response['Cache-Control'] = 'no-store'
+    return {**counters.changes(event.id, since), "poll_seconds": counters.LIVE_POLL_SECONDS}
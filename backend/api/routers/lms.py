@@ -1,7 +1,12 @@
+import hashlib
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from uuid import UUID
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Avg, Prefetch
+from django.db.models import Count, Avg, Prefetch
 from django.db import transaction
 from django.utils import timezone
 from ninja import Router, Schema, File, UploadedFile
@@ -11,9 +16,21 @@ from pydantic import BaseModel
 
 from lms.models import (
     Course, Module, Enrollment, ModuleProgress, 
-    Quiz, Question, Answer, QuizAttempt, QuizAnswer, Certificate
+    Quiz, QuizAttempt, Certificate
 )
-from api.auth import jwt_auth
+from lms.drafts import DraftError, close_attempt, load_drafts, save_draft
+from lms.grading import GradingError
+from lms.analytics import MAX_REPORT_DAYS, course_report
+from lms.catalog import list_catalog
+from lms.certificates import CERTIFICATE_CACHE_KEY, CERTIFICATE_CACHE_SECONDS, issue_certificate
+from lms.certificates import load_token as load_certificate_token
+from lms.enrollments import enroll_users, select_users
+from lms.progress import record_module_progress
+from lms.quizzes import load_compiled_quiz, ordered_questions
+from api.auth import jwt_auth, optional_jwt_auth
+from api.media import local_media_path, signed_url
+from api.ratelimit import rate_limit
+from opportunities.models import Opportunity
 
 router = Router()
 
@@ -126,6 +143,21 @@ class EnrollmentSchema(BaseModel):
     certificate_id: Optional[str] = None
 
 
+class BulkEnrollRequest(BaseModel):
+    user_ids: Optional[List[UUID]] = None
+    emails: Optional[List[str]] = None
+    user_type: Optional[str] = None
+    opportunity_id: Optional[UUID] = None  # participants of this opportunity
+
+
+class BulkEnrollResponse(BaseModel):
+    course_id: str
+    title: str
+    matched: int
+    enrolled: int
+    already_enrolled: int
+
+
 class ProgressUpdateRequest(BaseModel):
     module_id: int
     completed: bool
@@ -140,12 +172,22 @@ class QuizAttemptSchema(BaseModel):
     score: Optional[float] = None
     passed: Optional[bool] = None
     remaining_attempts: int
+    expires_at: Optional[datetime] = None
 
 
 class SubmitQuizRequest(BaseModel):
     answers: List[dict]  # [{"question_id": 1, "answer_id": 2, "text_answer": "..."}]
 
 
+class DraftAnswersRequest(BaseModel):
+    answers: List[dict]  # Changed answers only; no answer_id/text_answer clears a question
+
+
+class DraftAnswersSchema(BaseModel):
+    answers: List[dict]
+    expires_at: Optional[datetime] = None
+
+
 class CertificateSchema(BaseModel):
     certificate_id: str
     user_name: str
@@ -154,10 +196,22 @@ class CertificateSchema(BaseModel):
     issued_date: datetime
     final_score: Optional[float] = None
     verification_url: str
+    render_status: str
+    pdf_url: Optional[str] = None
+    png_url: Optional[str] = None
+
+
+class CertificateVerificationSchema(BaseModel):
+    valid: bool
+    certificate_id: str
+    user_name: str
+    course_title: str
+    completion_date: str
+    final_score: Optional[float] = None
 
 
 # Course endpoints
-@router.get("/courses", response=List[CourseListSchema])
+@router.get("/courses", response=List[CourseListSchema], auth=optional_jwt_auth)
 def list_courses(
     request,
     audience_type: Optional[str] = None,
@@ -165,81 +219,34 @@ def list_courses(
     difficulty: Optional[str] = None,
     search: Optional[str] = None
 ):
-    """List all published courses with filters"""
-    # Allow unauthenticated browsing
-    user = getattr(request, 'auth', None)
-    
-    courses = Course.objects.filter(is_active=True, is_published=True)
-    
-    # Apply filters
-    if audience_type:
-        courses = courses.filter(Q(audience_type=audience_type) | Q(audience_type='both'))
-    
-    if category:
-        courses = courses.filter(category__icontains=category)
-    
-    if difficulty:
-        courses = courses.filter(difficulty_level=difficulty)
-    
-    if search:
-        courses = courses.filter(
-            Q(title__icontains=search) |
-            Q(description__icontains=search) |
-            Q(tags__icontains=search)
-        )
+    """
+    List all published courses with filters.
     
-    # Get user's enrollments (if authenticated)
-    if user:
-        user_enrollments = set(
-            Enrollment.objects.filter(user=user).values_list('course_id', flat=True)
-        )
-    else:
-        user_enrollments = set()
-    
-    # Annotate with counts
-    courses = courses.annotate(
-        modules_count=Count('modules'),
-        enrolled_count=Count('enrollments', filter=Q(enrollments__completion_status__in=['active', 'completed']))
+    Served from the cached catalog snapshot; signed-in users also get their
+    enrollment status and progress per course.
+    """
+    # Allow unauthenticated browsing
+    return list_catalog(
+        user=request.user,
+        audience_type=audience_type,
+        category=category,
+        difficulty=difficulty,
+        search=search,
     )
-    
-    # Build response
-    course_list = []
-    for course in courses:
-        enrollment = None
-        if user and str(course.id) in user_enrollments:
-            try:
-                enrollment = Enrollment.objects.get(user=user, course=course)
-            except Enrollment.DoesNotExist:
-                pass
-        
-        course_list.append(CourseListSchema(
-            id=str(course.id),
-            title=course.title,
-            slug=course.slug,
-            description=course.description,
-            audience_type=course.audience_type,
-            difficulty_level=course.difficulty_level,
-            estimated_duration=course.estimated_duration,
-            category=course.category,
-            thumbnail_url=course.thumbnail.url if course.thumbnail else None,
-            is_published=course.is_published,
-            is_enrolled=str(course.id) in user_enrollments,
-            progress_percentage=enrollment.progress_percentage if enrollment else None,
-            modules_count=course.modules_count,
-            enrolled_count=course.enrolled_count
-        ))
-    
-    return course_list
 
 
-@router.get("/courses/{course_id}", response=CourseDetailSchema)
+@router.get("/courses/{course_id}", response=CourseDetailSchema, auth=optional_jwt_auth)
 def get_course_detail(request, course_id: str):
     """Get detailed course information"""
     # Allow unauthenticated browsing
-    user = getattr(request, 'auth', None)
+    user = request.user
     
     course = get_object_or_404(
-        Course.objects.prefetch_related('modules'),
+        Course.objects.select_related('created_by').annotate(
+            enrolled_count=Count('enrollments')
+        ).prefetch_related(
+            Prefetch('modules', queryset=Module.objects.select_related('quiz'))
+        ),
         id=course_id,
         is_active=True
     )
@@ -248,14 +255,11 @@ def get_course_detail(request, course_id: str):
     enrollment = None
     module_progress = {}
     if user:
-        try:
-            enrollment = Enrollment.objects.get(user=user, course=course)
-            module_progress = {
-                mp.module_id: mp.completed
-                for mp in enrollment.module_progress.all()
-            }
-        except Enrollment.DoesNotExist:
-            pass
+        enrollment = Enrollment.objects.filter(user=user, course=course).first()
+        if enrollment:
+            module_progress = dict(
+                enrollment.module_progress.values_list('module_id', 'completed')
+            )
     
     # Build modules list
     modules = []
@@ -287,10 +291,8 @@ def get_course_detail(request, course_id: str):
         is_published=course.is_published,
         is_enrolled=enrollment is not None,
         progress_percentage=enrollment.progress_percentage if enrollment else None,
-        modules_count=course.modules.count(),
-        enrolled_count=course.enrollments.filter(
-            completion_status__in=['active', 'completed']
-        ).count(),
+        modules_count=course.modules_count,
+        enrolled_count=course.enrolled_count,
         created_by=course.created_by.get_full_name() if course.created_by else None,
         created_at=course.created_at,
         modules=modules,
@@ -324,6 +326,29 @@ def create_course(request, data: CreateCourseRequest):
     return {"message": "Course created successfully", "course_id": str(course.id)}
 
 
+@router.get("/courses/{course_id}/analytics", response=dict, auth=jwt_auth)
+def get_course_analytics(request, course_id: str, response: HttpResponse,
+                         start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Course dashboard (staff or the course author): daily totals and
+    per-module completion, time and quiz figures, served from the rollup
+    tables. Defaults to the last 30 days.
+    """
+    user = request.auth
+    
+    course = get_object_or_404(Course, id=course_id)
+    if not user.is_staff and course.created_by_id != user.id:
+        raise HttpError(403, "You don't have permission to view this course's analytics")
+    
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= MAX_REPORT_DAYS:
+        raise HttpError(400, f"Choose a range of at most {MAX_REPORT_DAYS} days")
+    
+    response['Cache-Control'] = 'private, max-age=60'
+    return course_report(course, start, end)
+
+
 # Module endpoints
 @router.post("/courses/{course_id}/modules", response={201: dict}, auth=jwt_auth)
 def create_module(request, course_id: str, data: CreateModuleRequest):
@@ -370,9 +395,8 @@ def get_module_content(request, module_id: int):
         module=module
     )
     
-    # Update last accessed
-    enrollment.last_accessed = timezone.now()
-    enrollment.save()
+    # Uploaded videos go out as signed links that support seeking (see api.media)
+    video_path = local_media_path(module.video_url)
     
     return {
         "module": {
@@ -380,7 +404,7 @@ def get_module_content(request, module_id: int):
             "title": module.title,
             "content": module.content,
             "content_type": module.content_type,
-            "video_url": module.video_url,
+            "video_url": signed_url(video_path) if video_path else module.video_url,
             "duration": module.duration,
         },
         "progress": {
@@ -415,6 +439,35 @@ def enroll_in_course(request, course_id: str):
     }
 
 
+@router.post("/courses/{course_id}/enroll/bulk", response=BulkEnrollResponse, auth=jwt_auth)
+@rate_limit("bulk_enroll", "10/m", key="user")
+def bulk_enroll(request, course_id: str, data: BulkEnrollRequest):
+    """
+    Enroll every user matching the rule in a course. Staff and the course
+    author may use any rule; hosts may enroll their opportunity's participants.
+    """
+    user = request.auth
+    
+    course = get_object_or_404(Course, id=course_id, is_active=True, is_published=True)
+    
+    if not (data.user_ids or data.emails or data.user_type or data.opportunity_id):
+        raise HttpError(400, "Give user_ids, emails, user_type or opportunity_id")
+    
+    if not user.is_staff and course.created_by != user:
+        if data.opportunity_id is None or not Opportunity.objects.filter(
+            id=data.opportunity_id, host__user=user
+        ).exists():
+            raise HttpError(403, "You can only enroll participants of your own opportunities")
+    
+    users = select_users(
+        user_ids=data.user_ids,
+        emails=data.emails,
+        user_type=data.user_type,
+        opportunity_id=data.opportunity_id,
+    )
+    return enroll_users(course, users)
+
+
 @router.get("/enrollments", response=List[EnrollmentSchema], auth=jwt_auth)
 def get_my_enrollments(request, status: Optional[str] = None):
     """Get user's course enrollments"""
@@ -452,42 +505,29 @@ def update_progress(request, data: ProgressUpdateRequest):
     
     module = get_object_or_404(Module, id=data.module_id)
     enrollment = get_object_or_404(
-        Enrollment,
+        Enrollment.objects.select_related('course'),
         user=user,
-        course=module.course,
+        course_id=module.course_id,
         completion_status__in=['not_started', 'in_progress']
     )
     
     with transaction.atomic():
-        progress, created = ModuleProgress.objects.get_or_create(
-            enrollment=enrollment,
-            module=module
+        record_module_progress(
+            enrollment,
+            module,
+            completed=data.completed,
+            time_spent=data.time_spent_seconds or 0,
         )
         
-        progress.completed = data.completed
-        if data.completed:
-            progress.completed_at = timezone.now()
-        
-        if data.time_spent_seconds:
-            progress.time_spent += data.time_spent_seconds
-        
-        progress.save()
-        
-        # Update enrollment progress
-        enrollment.update_progress()
-        
         # Check if course completed and issue certificate
         if enrollment.completion_status == 'completed' and enrollment.course.provides_certificate:
             if not hasattr(enrollment, 'certificate'):
-                Certificate.objects.create(
-                    enrollment=enrollment,
+                # Only the row is written here; the PDF/PNG are rendered by render_certificates
+                issue_certificate(
+                    enrollment,
                     user_name=user.get_full_name() or user.username,
-                    course_title=enrollment.course.title,
-                    completion_date=timezone.now().date(),
-                    final_score=calculate_final_score(enrollment)
+                    final_score=calculate_final_score(enrollment),
                 )
-                enrollment.certificate_issued = True
-                enrollment.save()
     
     return {
         "message": "Progress updated",
@@ -502,19 +542,16 @@ def get_quiz(request, module_id: int):
     """Get quiz for a module"""
     user = request.auth
     
-    module = get_object_or_404(Module, id=module_id)
-    quiz = get_object_or_404(Quiz, module=module)
+    quiz = get_object_or_404(Quiz.objects.select_related('module'), module_id=module_id)
     
     # Check enrollment
     enrollment = get_object_or_404(
         Enrollment,
         user=user,
-        course=module.course
+        course_id=quiz.module.course_id
     )
     
-    # Count questions and total points
-    questions = quiz.questions.all()
-    total_points = sum(q.points for q in questions)
+    compiled = load_compiled_quiz(quiz)
     
     return QuizSchema(
         id=quiz.id,
@@ -523,62 +560,52 @@ def get_quiz(request, module_id: int):
         passing_score=quiz.passing_score,
         max_attempts=quiz.max_attempts,
         time_limit_minutes=quiz.time_limit_minutes,
-        questions_count=questions.count(),
-        total_points=total_points
+        questions_count=compiled['questions_count'],
+        total_points=compiled['total_points']
     )
 
 
 @router.get("/quizzes/{quiz_id}/questions", response=List[QuestionSchema], auth=jwt_auth)
-def get_quiz_questions(request, quiz_id: int):
-    """Get questions for a quiz"""
+def get_quiz_questions(request, quiz_id: int, attempt_id: Optional[int] = None):
+    """
+    Get questions for a quiz.
+    
+    Randomized quizzes are shuffled per attempt: the order is fixed for
+    `attempt_id` (or the user's open attempt), so reloading or resuming an
+    attempt shows the same order.
+    """
     user = request.auth
     
-    quiz = get_object_or_404(Quiz, id=quiz_id)
+    quiz = get_object_or_404(Quiz.objects.select_related('module'), id=quiz_id)
     
     # Check enrollment
     enrollment = get_object_or_404(
         Enrollment,
         user=user,
-        course=quiz.module.course
+        course_id=quiz.module.course_id
     )
     
-    # Get or create attempt
-    attempts_count = QuizAttempt.objects.filter(
-        enrollment=enrollment,
-        quiz=quiz
-    ).count()
-    
-    if quiz.max_attempts > 0 and attempts_count >= quiz.max_attempts:
-        raise HttpError(400, "Maximum attempts reached")
+    attempts = QuizAttempt.objects.filter(enrollment=enrollment, quiz=quiz)
+    if attempt_id is not None:
+        attempt = get_object_or_404(attempts, id=attempt_id)
+    else:
+        attempt = attempts.filter(completed_at__isnull=True).order_by('-started_at').first()
+    
+    if attempt is None:
+        attempts_count = attempts.count()
+        if quiz.max_attempts > 0 and attempts_count >= quiz.max_attempts:
+            raise HttpError(400, "Maximum attempts reached")
+        # Not started yet: stable until the next attempt begins
+        seed = f"{user.id}:next:{attempts_count}"
+    else:
+        seed = attempt.id
     
-    questions = quiz.questions.prefetch_related('answers').all()
-    
-    if quiz.randomize_questions:
-        questions = questions.order_by('?')
-    
-    question_list = []
-    for question in questions:
-        answers = None
-        if question.question_type in ['multiple_choice', 'true_false']:
-            answers = [
-                {
-                    "id": ans.id,
-                    "answer_text": ans.answer_text,
-                    "order": ans.order
-                }
-                for ans in question.answers.all()
-            ]
-        
-        question_list.append(QuestionSchema(
-            id=question.id,
-            question_text=question.question_text,
-            question_type=question.question_type,
-            points=question.points,
-            order=question.order,
-            answers=answers
-        ))
+    compiled = load_compiled_quiz(quiz)
     
-    return question_list
+    return [
+        QuestionSchema(**question)
+        for question in ordered_questions(quiz, compiled, seed)
+    ]
 
 
 @router.post("/quizzes/{quiz_id}/start", response=QuizAttemptSchema, auth=jwt_auth)
@@ -617,7 +644,47 @@ def start_quiz_attempt(request, quiz_id: int):
         completed_at=None,
         score=None,
         passed=None,
-        remaining_attempts=remaining
+        remaining_attempts=remaining,
+        expires_at=attempt.deadline,
+    )
+
+
+@router.patch("/attempts/{attempt_id}/draft", response={200: dict}, auth=jwt_auth)
+@rate_limit("quiz_autosave", "120/m", key="user")
+def autosave_quiz_answers(request, attempt_id: int, data: DraftAnswersRequest):
+    """
+    Autosave changed answers of an open attempt. Deltas are coalesced in the
+    cache and written to the database periodically (see lms.drafts).
+    """
+    try:
+        saved = save_draft(attempt_id, request.auth, data.answers)
+    except QuizAttempt.DoesNotExist:
+        raise HttpError(404, "Attempt not found")
+    except DraftError as e:
+        raise HttpError(400, str(e))
+    
+    return {
+        "revision": saved['revision'],
+        "expires_at": saved['deadline'],
+    }
+
+
+@router.get("/attempts/{attempt_id}/draft", response=DraftAnswersSchema, auth=jwt_auth)
+def get_quiz_draft(request, attempt_id: int):
+    """Saved answers of an open attempt, for resuming it"""
+    attempt = get_object_or_404(
+        QuizAttempt.objects.select_related('quiz'),
+        id=attempt_id,
+        enrollment__user=request.auth,
+        completed_at__isnull=True
+    )
+    
+    return DraftAnswersSchema(
+        answers=[
+            {"question_id": question_id, **answer}
+            for question_id, answer in load_drafts(attempt).items()
+        ],
+        expires_at=attempt.deadline,
     )
 
 
@@ -627,85 +694,73 @@ def submit_quiz(request, attempt_id: int, data: SubmitQuizRequest):
     user = request.auth
     
     attempt = get_object_or_404(
-        QuizAttempt,
+        QuizAttempt.objects.select_related('quiz__module', 'enrollment'),
         id=attempt_id,
         enrollment__user=user,
         completed_at__isnull=True
     )
     
-    with transaction.atomic():
-        # Save answers
-        for answer_data in data.answers:
-            question = get_object_or_404(
-                Question,
-                id=answer_data['question_id'],
-                quiz=attempt.quiz
-            )
-            
-            quiz_answer = QuizAnswer.objects.create(
-                attempt=attempt,
-                question=question
-            )
-            
-            # Check answer based on type
-            if question.question_type in ['multiple_choice', 'true_false']:
-                selected = get_object_or_404(Answer, id=answer_data['answer_id'])
-                quiz_answer.selected_answer = selected
-                quiz_answer.is_correct = selected.is_correct
-                if selected.is_correct:
-                    quiz_answer.points_earned = question.points
-            elif question.question_type == 'short_answer':
-                # Simple exact match for now
-                quiz_answer.text_answer = answer_data.get('text_answer', '')
-                correct_answers = question.answers.filter(is_correct=True)
-                for correct in correct_answers:
-                    if quiz_answer.text_answer.lower().strip() == correct.answer_text.lower().strip():
-                        quiz_answer.is_correct = True
-                        quiz_answer.points_earned = question.points
-                        break
-            
-            quiz_answer.save()
-        
-        # Calculate score
-        attempt.calculate_score()
-        
-        # Update module progress
-        module_progress, _ = ModuleProgress.objects.get_or_create(
-            enrollment=attempt.enrollment,
-            module=attempt.quiz.module
-        )
-        module_progress.quiz_score = attempt.score
-        if attempt.passed:
-            module_progress.completed = True
-            module_progress.completed_at = timezone.now()
-        module_progress.save()
-        
-        # Update enrollment progress
-        attempt.enrollment.update_progress()
+    # Autosaved drafts fill in anything the submission leaves out; past the
+    # time limit only the drafts saved in time count
+    try:
+        expired = close_attempt(attempt, data.answers)
+    except GradingError as e:
+        raise HttpError(400, str(e))
     
     return {
         "score": float(attempt.score),
         "passed": attempt.passed,
         "passing_score": attempt.quiz.passing_score,
-        "show_correct_answers": attempt.quiz.show_correct_answers
+        "show_correct_answers": attempt.quiz.show_correct_answers,
+        "time_expired": expired,
     }
 
 
 # Certificate endpoints
+@router.get("/certificates/verify/{token}", response=CertificateVerificationSchema)
+def verify_certificate(request, token: str, response: HttpResponse):
+    """
+    Verify a certificate from its signed token (public). Needs no database
+    read, and the answer for a given URL never changes, so it is cacheable.
+    """
+    details = load_certificate_token(token)
+    if details is None:
+        raise HttpError(404, "Certificate not found or token invalid")
+    
+    etag = f'"{hashlib.sha256(token.encode()).hexdigest()[:32]}"'
+    if request.headers.get('If-None-Match') == etag:
+        not_modified = HttpResponse(status=304)
+        not_modified['ETag'] = etag
+        return not_modified
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return CertificateVerificationSchema(valid=True, **details)
+
+
 @router.get("/certificates/{certificate_id}", response=CertificateSchema)
-def get_certificate(request, certificate_id: str):
-    """Get certificate details (public endpoint for verification)"""
-    certificate = get_object_or_404(Certificate, certificate_id=certificate_id)
-    
-    return CertificateSchema(
-        certificate_id=str(certificate.certificate_id),
-        user_name=certificate.user_name,
-        course_title=certificate.course_title,
-        completion_date=certificate.completion_date.isoformat(),
-        issued_date=certificate.issued_date,
-        final_score=certificate.final_score,
-        verification_url=certificate.get_verification_url()
-    )
+def get_certificate(request, certificate_id: str, response: HttpResponse):
+    """Get certificate details and artifact links (public)"""
+    key = CERTIFICATE_CACHE_KEY.format(certificate_id=certificate_id)
+    payload = cache.get(key)
+    if payload is None:
+        certificate = get_object_or_404(Certificate, certificate_id=certificate_id)
+        payload = CertificateSchema(
+            certificate_id=str(certificate.certificate_id),
+            user_name=certificate.user_name,
+            course_title=certificate.course_title,
+            completion_date=certificate.completion_date.isoformat(),
+            issued_date=certificate.issued_date,
+            final_score=certificate.final_score,
+            verification_url=certificate.verification_url or certificate.get_verification_url(),
+            render_status=certificate.render_status,
+            pdf_url=default_storage.url(certificate.pdf_path) if certificate.pdf_path else None,
+            png_url=default_storage.url(certificate.png_path) if certificate.png_path else None,
+        ).model_dump()
+        cache.set(key, payload, CERTIFICATE_CACHE_SECONDS)
+    
+    response['Cache-Control'] = 'public, max-age=300'
+    return payload
 
 
 # Helper functions
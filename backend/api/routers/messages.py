@@ -8,8 +8,11 @@ from ninja.errors import HttpError
 from pydantic import BaseModel
 
 from messaging.models import Conversation, Message, MessageReadStatus, ConversationRequest
+from notifications.dispatcher import notify
 from users.models import User
 from api.auth import jwt_auth
+from api.media import signed_url
+from api.ratelimit import rate_limit
 
 router = Router()
 
@@ -149,7 +152,7 @@ def list_conversations(request, page: int = 1, search: Optional[str] = None):
                 created_at=last_msg.created_at,
                 is_read=last_msg.is_read,
                 read_at=last_msg.read_at,
-                attachment=last_msg.attachment.url if last_msg.attachment else None,
+                attachment=signed_url(last_msg.attachment.name) if last_msg.attachment else None,
                 attachment_name=last_msg.attachment_name
             )
         
@@ -216,7 +219,7 @@ def get_messages(request, conversation_id: int, before_id: Optional[int] = None,
             created_at=msg.created_at,
             is_read=msg.is_read,
             read_at=msg.read_at,
-            attachment=msg.attachment.url if msg.attachment else None,
+            attachment=signed_url(msg.attachment.name) if msg.attachment else None,
             attachment_name=msg.attachment_name
         ))
     
@@ -253,6 +256,15 @@ def send_message(request, conversation_id: int, data: CreateMessageRequest):
         # Update conversation timestamp
         conversation.updated_at = message.created_at
         conversation.save()
+        
+        notify(
+            [p.id for p in conversation.participants.all() if p.id != user.id],
+            'new_message',
+            user.get_full_name() or user.username,
+            message.content[:200],
+            data={'conversation_id': conversation.id, 'message_id': message.id},
+            collapse_key=f"conversation:{conversation.id}",
+        )
     
     # Build response
     sender_info = UserInfo(
@@ -401,6 +413,7 @@ def mark_conversation_read(request, conversation_id: int):
 
 
 @router.get("/users/search", response=List[UserInfo], auth=jwt_auth)
+@rate_limit("user_search", "30/m", key="user")
 def search_users(request, q: str):
     """Search for users to start a conversation with"""
     user = request.auth
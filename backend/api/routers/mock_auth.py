@@ -110,8 +110,8 @@ def mock_login(request, data: LoginRequest):
         'iat': datetime.utcnow()
     }
     
-    # Use a simple secret for mock auth (in production, use settings.SECRET_KEY)
-    jwt_token = jwt.encode(payload, 'mock-secret-key', algorithm='HS256')
+    # Use a simple secret for mock auth - only accepted when JWT_ACCEPT_MOCK_TOKENS is on
+    jwt_token = jwt.encode(payload, settings.JWT_MOCK_SECRET_KEY, algorithm='HS256')
     
     return TokenResponse(
         access_token=jwt_token,
@@ -5,11 +5,13 @@ from pydantic import BaseModel
 from django.shortcuts import get_object_or_404
 from django.db.models import Count, Q, F, FloatField, Value
 from django.db.models.functions import Cast
-from opportunities.models import Opportunity, OpportunityHost, Role, RoleSkill
+from opportunities.models import Opportunity, Role, RoleSkill, Application, ProjectParticipant
 from users.models import Skill, UserSkill
 from ninja.responses import Response
 from django.db import transaction
 from api.auth import jwt_auth, optional_jwt_auth
+from api.ratelimit import rate_limit
+from api.exports import stream_export
 
 router = Router(tags=["Opportunities"])
 
@@ -48,7 +50,12 @@ class OpportunityListResponse(BaseModel):
     page_size: int
 
 
+def _is_search(request, search=None, skills=None, **kwargs):
+    return bool(search or skills)
+
+
 @router.get("/", response=OpportunityListResponse)
+@rate_limit("opportunity_search", "60/m", key="user_or_ip", when=_is_search)
 def list_opportunities(
     request,
     zip_code: Optional[str] = None,
@@ -360,10 +367,9 @@ def create_opportunity(request, data: CreateOpportunityRequest):
     if user.user_type != 'host':
         return 403, {"error": "Only host users can create opportunities"}
     
-    # Get or create host profile
-    try:
-        host_profile = user.host_profile
-    except OpportunityHost.DoesNotExist:
+    # Host profile id comes from the cached principal
+    host_profile_id = request.principal.host_profile_id
+    if host_profile_id is None:
         return 400, {"error": "Host profile not found. Please complete your organization profile first."}
     
     # Validate dates
@@ -374,7 +380,7 @@ def create_opportunity(request, data: CreateOpportunityRequest):
         with transaction.atomic():
             # Create opportunity
             opportunity = Opportunity.objects.create(
-                host=host_profile,
+                host_id=host_profile_id,
                 title=data.title,
                 description=data.description,
                 cause_area=data.cause_area,
@@ -596,4 +602,73 @@ def get_match_score(request, opportunity_id: str):
         "matched_skills": list(set(matched_skills)),
         "missing_skills": list(set(missing_skills)),
         "user_has_skills": len(user_skills_set) > 0
-    }
\ No newline at end of file
+    }
+
+
+APPLICATION_EXPORT_COLUMNS = [
+    ('application_id', 'id'),
+    ('username', 'volunteer__username'),
+    ('first_name', 'volunteer__first_name'),
+    ('last_name', 'volunteer__last_name'),
+    ('email', 'volunteer__email'),
+    ('role', 'role__title'),
+    ('status', 'status'),
+    ('submitted_at', 'submitted_at'),
+    ('reviewed_at', 'reviewed_at'),
+    ('reviewed_by', 'reviewed_by__username'),
+    ('availability_notes', 'availability_notes'),
+    ('cover_letter', 'cover_letter'),
+    ('rejection_reason', 'rejection_reason'),
+]
+
+PARTICIPANT_EXPORT_COLUMNS = [
+    ('participant_id', 'id'),
+    ('username', 'volunteer__username'),
+    ('first_name', 'volunteer__first_name'),
+    ('last_name', 'volunteer__last_name'),
+    ('email', 'volunteer__email'),
+    ('role', 'role__title'),
+    ('status', 'status'),
+    ('hours_logged', 'hours_logged'),
+    ('joined_at', 'joined_at'),
+    ('completed_at', 'completed_at'),
+    ('rating', 'rating'),
+    ('impact_statement', 'impact_statement'),
+    ('feedback', 'feedback'),
+]
+
+
+@router.get("{opportunity_id}/export/applications", auth=jwt_auth)
+@rate_limit("export", "10/m", key="user")
+def export_applications(request, opportunity_id: str, format: str = Query('csv', pattern='^(csv|ndjson)$')):
+    """Stream all applications for an opportunity as CSV or NDJSON (host only)"""
+    
+    opportunity = get_object_or_404(Opportunity.objects.select_related('host'), id=opportunity_id)
+    
+    if opportunity.host.user_id != request.auth.id:
+        return Response({"error": "You don't have permission to export this opportunity"}, status=403)
+    
+    return stream_export(
+        Application.objects.filter(opportunity=opportunity).order_by('submitted_at'),
+        APPLICATION_EXPORT_COLUMNS,
+        filename=f"opportunity-{opportunity.id}-applications",
+        format=format,
+    )
+
+
+@router.get("{opportunity_id}/export/participants", auth=jwt_auth)
+@rate_limit("export", "10/m", key="user")
+def export_participants(request, opportunity_id: str, format: str = Query('csv', pattern='^(csv|ndjson)$')):
+    """Stream all participants of an opportunity as CSV or NDJSON (host only)"""
+    
+    opportunity = get_object_or_404(Opportunity.objects.select_related('host'), id=opportunity_id)
+    
+    if opportunity.host.user_id != request.auth.id:
+        return Response({"error": "You don't have permission to export this opportunity"}, status=403)
+    
+    return stream_export(
+        ProjectParticipant.objects.filter(opportunity=opportunity).order_by('joined_at'),
+        PARTICIPANT_EXPORT_COLUMNS,
+        filename=f"opportunity-{opportunity.id}-participants",
+        format=format,
+    )
@@ -12,6 +12,7 @@ from botocore.exceptions import ClientError
 
 from users.models import User
 from api.auth import jwt_auth  # Use the existing JWT auth
+from api.ratelimit import rate_limit
 
 logger = logging.getLogger(__name__)
 
@@ -120,6 +121,7 @@ def process_image(uploaded_file: UploadedFile, max_size: int = 5242880) -> bytes
 
 
 @router.post("/verify-identity", response=VerificationResponse, auth=jwt_auth)
+@rate_limit("verify_identity", "5/h", key="user")
 def verify_identity(
     request,
     id_image: UploadedFile = File(...),
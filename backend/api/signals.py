@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from api.principal import invalidate_principal
+from opportunities.models import OpportunityHost
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    """Drop the cached principal whenever the user row changes"""
+    invalidate_principal(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=OpportunityHost)
+@receiver(post_delete, sender=OpportunityHost)
+def invalidate_related_principal(sender, instance, **kwargs):
+    """Profile and host profile changes affect verification and host access"""
+    invalidate_principal(instance.user_id)
@@ -0,0 +1,127 @@
+"""
+Access and refresh token issuance.
+
+Access tokens are short-lived JWTs verified without touching the database.
+Each login starts a session; the session id travels in the access token's
+`sid` claim and is shared by every refresh token minted for that login.
+Refresh tokens are opaque, stored only as SHA-256 hashes and rotated on every
+use. Presenting an already-rotated refresh token is treated as theft and
+revokes the whole session.
+"""
+
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+import jwt
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.revocation import revocation_filter
+from users.models import RefreshToken
+
+
+class RefreshTokenError(Exception):
+    """Raised when a refresh token cannot be exchanged"""
+
+
+def hash_token(raw_token):
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+def create_access_token(user, session_id):
+    """Generate a short-lived JWT access token for user"""
+    now = datetime.utcnow()
+    payload = {
+        'user_id': str(user.id),
+        'username': user.username,
+        'sid': str(session_id),
+        'jti': uuid.uuid4().hex,
+        'exp': now + timedelta(seconds=settings.ACCESS_TOKEN_LIFETIME_SECONDS),
+        'iat': now,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+
+def _create_refresh_token(user, session_id, request=None):
+    raw_token = secrets.token_urlsafe(48)
+    RefreshToken.objects.create(
+        user=user,
+        token_hash=hash_token(raw_token),
+        session_id=session_id,
+        expires_at=timezone.now() + timedelta(days=settings.REFRESH_TOKEN_LIFETIME_DAYS),
+        user_agent=(request.META.get('HTTP_USER_AGENT', '') if request else '')[:255],
+    )
+    return raw_token
+
+
+def _token_pair(user, session_id, refresh_token):
+    return {
+        'access_token': create_access_token(user, session_id),
+        'refresh_token': refresh_token,
+        'expires_in': settings.ACCESS_TOKEN_LIFETIME_SECONDS,
+    }
+
+
+def issue_tokens(user, request=None):
+    """Start a new session for user and return its first token pair"""
+    session_id = uuid.uuid4()
+    refresh_token = _create_refresh_token(user, session_id, request)
+    return _token_pair(user, session_id, refresh_token)
+
+
+def rotate_refresh_token(raw_token, request=None):
+    """
+    Exchange a refresh token for a new token pair.
+
+    Returns (user, tokens). Raises RefreshTokenError if the token is unknown,
+    expired or revoked; reuse of a rotated token also revokes its session.
+    """
+    with transaction.atomic():
+        try:
+            stored = (
+                RefreshToken.objects.select_for_update()
+                .select_related('user')
+                .get(token_hash=hash_token(raw_token))
+            )
+        except RefreshToken.DoesNotExist:
+            raise RefreshTokenError("Invalid refresh token")
+
+        if stored.rotated_at is not None and stored.revoked_at is None:
+            reused_session = stored.session_id
+        else:
+            reused_session = None
+            if not stored.is_usable() or not stored.user.is_active:
+                raise RefreshTokenError("Refresh token expired or revoked")
+
+            stored.rotated_at = timezone.now()
+            stored.save(update_fields=['rotated_at'])
+            refresh_token = _create_refresh_token(stored.user, stored.session_id, request)
+
+    if reused_session:
+        # Revoke outside the row lock; the failed exchange must not roll it back
+        revoke_session(reused_session)
+        raise RefreshTokenError("Refresh token reuse detected")
+
+    return stored.user, _token_pair(stored.user, stored.session_id, refresh_token)
+
+
+def revoke_session(session_id):
+    """Revoke a session's refresh tokens and any access tokens still in flight"""
+    RefreshToken.objects.filter(
+        session_id=session_id,
+        revoked_at__isnull=True,
+    ).update(revoked_at=timezone.now())
+    revocation_filter.revoke(session_id)
+
+
+def revoke_user_sessions(user):
+    """Sign user out everywhere"""
+    active = RefreshToken.objects.filter(user=user, revoked_at__isnull=True)
+    session_ids = set(active.values_list('session_id', flat=True))
+    active.update(revoked_at=timezone.now())
+    for session_id in session_ids:
+        revocation_filter.revoke(session_id)
+    return len(session_ids)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""Microbenchmark: check-in QR rendering, legacy PIL path vs events.qr"""
+
+import base64
+import io
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mishmob.settings')
+django.setup()
+
+import qrcode
+
+from events import qr
+from events.utils import SecureTokenGenerator
+
+
+def legacy_render(token):
+    """What generate_qr_code did before events.qr"""
+    code = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=10,
+        border=4,
+    )
+    code.add_data(token)
+    code.make(fit=True)
+    img = code.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def bench(name, fn, tokens):
+    fn(tokens[0])  # warm up
+    start = time.perf_counter()
+    for token in tokens:
+        output = fn(token)
+    elapsed = time.perf_counter() - start
+    size = len(output) if isinstance(output, str) else len(output.get('data_uri') or output['modules'])
+    print(f"{name:<28} {len(tokens) / elapsed:9.0f} renders/s  {elapsed / len(tokens) * 1000:7.2f} ms  {size:6d} bytes")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    # Real tokens; lift the per-user generation limit for the run
+    SecureTokenGenerator.MAX_GENERATION_PER_MINUTE = iterations * 10
+    tokens = [
+        SecureTokenGenerator.generate_qr_token(f"ticket-{i:08d}", f"benchmark-{time.time()}")['token']
+        for i in range(iterations)
+    ]
+
+    print(f"{iterations} tokens, {len(tokens[0])} chars each\n")
+    bench("legacy PIL png", legacy_render, tokens)
+    for format in qr.FORMATS:
+        bench(f"events.qr {format}", lambda token: qr.render(token, format, ttl=0), tokens)
+    bench("events.qr png (cache hit)", lambda token: qr.render(tokens[0], 'png'), tokens)
+
+
+if __name__ == '__main__':
+    main()
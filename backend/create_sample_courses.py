@@ -6,7 +6,8 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mishmob.settings')
 django.setup()
 
-from lms.models import Course, Module
+from lms.models import Course
+from lms.packages import load_packages
 from users.models import User
 
 # Get or create a staff user
@@ -108,28 +109,12 @@ sample_courses = [
     }
 ]
 
-# Create courses
-for course_data in sample_courses:
-    modules = course_data.pop('modules')
-    
-    # Check if course already exists
-    course, created = Course.objects.get_or_create(
-        slug=course_data['slug'],
-        defaults={**course_data, 'created_by': staff_user, 'is_published': True}
-    )
-    
-    if created:
-        print(f"Created course: {course.title}")
-        
-        # Create modules
-        for module_data in modules:
-            module = Module.objects.create(
-                course=course,
-                **module_data
-            )
-            print(f"  - Added module: {module.title}")
-    else:
-        print(f"Course already exists: {course.title}")
+# Create or update courses (see lms.packages for the format)
+reports = load_packages([(course['slug'], course) for course in sample_courses], created_by=staff_user)
+for report in reports:
+    print(f"{report['slug']}: {report['status']}")
+    for error in report['errors']:
+        print(f"  - {error}")
 
 print(f"\nTotal courses: {Course.objects.count()}")
 print(f"Published courses: {Course.objects.filter(is_published=True).count()}")
\ No newline at end of file
@@ -1,7 +1,14 @@
+from datetime import timedelta
+from functools import partial
+
 from django.contrib import admin
+from django.shortcuts import redirect
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Count, Q
-from .models import Event, EventTicket, DeviceRegistration, CheckIn
+from . import counters
+from .registration import promote_waitlist
+from .models import Event, EventTicket, EventWaitlistEntry, DeviceRegistration, CheckIn, CheckInDailySummary
 
 
 @admin.register(Event)
@@ -71,10 +78,29 @@ class EventAdmin(admin.ModelAdmin):
         return f"{checked_in}/{total}"
     attendee_count.short_description = 'Attendance'
     
+    actions = ['promote_waitlists']
+    
+    def promote_waitlists(self, request, queryset):
+        promoted = sum(promote_waitlist(event_id) for event_id in queryset.values_list('id', flat=True))
+        self.message_user(request, f"{promoted} waitlist entries promoted to tickets.")
+    promote_waitlists.short_description = "Promote waitlist into free seats"
+    
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('opportunity')
 
 
+@admin.register(EventWaitlistEntry)
+class EventWaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'event', 'status', 'created_at', 'promoted_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__username', 'user__email', 'event__opportunity__title']
+    readonly_fields = ['created_at', 'promoted_at', 'ticket']
+    raw_id_fields = ['user', 'event']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'event__opportunity')
+
+
 @admin.register(EventTicket)
 class EventTicketAdmin(admin.ModelAdmin):
     list_display = [
@@ -152,13 +178,27 @@ class EventTicketAdmin(admin.ModelAdmin):
     is_checked_in.short_description = 'Checked In'
     is_checked_in.admin_order_field = 'checked_in_at'
     
+    def _set_status(self, queryset, status):
+        # Keep the live 'registered' counters in step with active tickets
+        with transaction.atomic():
+            if status == 'active':
+                changing, sign = queryset.exclude(status='active'), 1
+            else:
+                changing, sign = queryset.filter(status='active'), -1
+            changes = dict(changing.values_list('event_id').annotate(n=Count('id')))
+            queryset.update(status=status)
+            for event_id, n in changes.items():
+                counters.increment(event_id, {counters.REGISTERED: sign * n})
+                if sign < 0:
+                    transaction.on_commit(partial(promote_waitlist, event_id))
+    
     def mark_as_cancelled(self, request, queryset):
-        queryset.update(status='cancelled')
+        self._set_status(queryset, 'cancelled')
         self.message_user(request, f"{queryset.count()} tickets marked as cancelled.")
     mark_as_cancelled.short_description = "Mark selected tickets as cancelled"
     
     def mark_as_active(self, request, queryset):
-        queryset.update(status='active')
+        self._set_status(queryset, 'active')
         self.message_user(request, f"{queryset.count()} tickets marked as active.")
     mark_as_active.short_description = "Mark selected tickets as active"
     
@@ -257,7 +297,11 @@ class CheckInAdmin(admin.ModelAdmin):
     ]
     raw_id_fields = ['scanner_user', 'scanner_device', 'ticket', 'event']
     
-    date_hierarchy = 'created_at'
+    # No date_hierarchy or full-table result count: both scan the whole log
+    show_full_result_count = False
+    
+    # The changelist opens on recent attempts, i.e. the hot partition
+    DEFAULT_WINDOW_DAYS = 7
     
     fieldsets = (
         ('Check-in Information', {
@@ -300,10 +344,36 @@ class CheckInAdmin(admin.ModelAdmin):
             'ticket__user'
         )
     
+    def changelist_view(self, request, extra_context=None):
+        if not any(param.startswith('created_at') for param in request.GET):
+            params = request.GET.copy()
+            since = timezone.now() - timedelta(days=self.DEFAULT_WINDOW_DAYS)
+            params['created_at__gte'] = since.replace(microsecond=0).isoformat()
+            return redirect(f"{request.path}?{params.urlencode()}")
+        return super().changelist_view(request, extra_context)
+    
     def has_add_permission(self, request):
         # Check-ins are created automatically, not manually
         return False
     
     def has_change_permission(self, request, obj=None):
         # Check-ins are immutable audit logs
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(CheckInDailySummary)
+class CheckInDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'event', 'result', 'attempts', 'tickets']
+    list_filter = ['result', 'date']
+    search_fields = ['event__opportunity__title']
+    raw_id_fields = ['event']
+    date_hierarchy = 'date'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('event__opportunity')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
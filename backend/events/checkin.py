@@ -0,0 +1,305 @@
+"""
+Set-based check-in processing.
+
+Both the batch check-in endpoint and offline scanner sync funnel through
+`process_scans`: the batch's scan ids are claimed, every token is decoded
+up front, the referenced tickets are loaded (and locked) with one IN query,
+each scan is judged in memory, and the outcome is written with one
+bulk_create of CheckIn rows and one bulk_update of tickets inside a single
+transaction.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+import jwt
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from events import counters
+from events.models import EventTicket, CheckIn, CheckInScanReceipt
+from events.utils import SecureTokenGenerator, RotatingTicketCode, qr_replay_guard
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on scans accepted in one request
+MAX_BATCH_SCANS = 500
+
+# Scans stamped further in the future than this are rejected
+MAX_CLOCK_DRIFT = timedelta(minutes=5)
+
+
+def decode_scan(qr_token, scanned_at, live):
+    """
+    Work out which ticket a scan refers to.
+
+    Returns (ticket_id, code, token, error). `code` is set for rotating codes,
+    whose validity is checked against the ticket secret once it is loaded.
+    `token` is the (jti, exp) pair of a JWT, for replay tracking. JWT tokens
+    are judged at `scanned_at`; `live` scans must also carry a jti.
+    """
+    if RotatingTicketCode.is_code_payload(qr_token):
+        ticket_id, code = RotatingTicketCode.parse_payload(qr_token)
+        if not ticket_id:
+            return None, None, None, "Invalid token format"
+        return ticket_id, code, None, None
+
+    try:
+        payload = jwt.decode(
+            qr_token,
+            settings.SECRET_KEY,
+            algorithms=['HS256'],
+            options={'verify_exp': False},
+        )
+    except jwt.InvalidTokenError:
+        return None, None, None, "Invalid token"
+    if not SecureTokenGenerator.is_ticket_payload(payload):
+        # Signed with our key but not a ticket QR token (e.g. an access token)
+        return None, None, None, "Invalid token"
+
+    iat = payload.get('iat')
+    if iat and scanned_at.timestamp() < iat - MAX_CLOCK_DRIFT.total_seconds():
+        # Scanned before the token existed: the timestamp was forged or the clock is off
+        return None, None, None, "Invalid token"
+
+    jti = payload.get('jti')
+    if live and not jti:
+        return None, None, None, "Invalid token format"
+
+    exp = payload.get('exp')
+    token = (jti, exp) if jti and exp else None
+    if not exp or scanned_at.timestamp() > exp + SecureTokenGenerator.GRACE_PERIOD_SECONDS:
+        return payload.get('ticket_id'), None, token, "Token expired"
+    return payload.get('ticket_id'), None, token, None
+
+
+def _as_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _recorded(scan_ids):
+    """Results of scans already in the CheckIn log, by scan id"""
+    return {
+        scan_id: _result(scan_id, result, message, ticket_id, duplicate=True)
+        for scan_id, result, message, ticket_id in CheckIn.objects.filter(id__in=scan_ids).values_list(
+            'id', 'result', 'result_message', 'ticket_id'
+        )
+    }
+
+
+def _claim(scan_ids):
+    """
+    Take receipts for scan ids inside the current transaction; returns the
+    ids this call owns. CheckIn itself can't enforce one row per scan id,
+    since its primary key on the partitioned table includes created_at.
+    """
+    if not scan_ids:
+        return set()
+    claim = uuid.uuid4()
+    CheckInScanReceipt.objects.bulk_create(
+        [CheckInScanReceipt(scan_id=scan_id, claim=claim) for scan_id in scan_ids],
+        ignore_conflicts=True,
+    )
+    return set(
+        CheckInScanReceipt.objects.filter(scan_id__in=scan_ids, claim=claim).values_list('scan_id', flat=True)
+    )
+
+
+def process_scans(scans, scanner_user, tickets, request_meta=None, live=True, default_event=None):
+    """
+    Judge and record a batch of scans.
+
+    `scans` are dicts with scan_id, qr_token, scanned_at and optional
+    latitude/longitude; scan_id becomes the CheckIn id and is claimed with a
+    CheckInScanReceipt, so re-submitting a batch, even concurrently, records
+    each scan once. `tickets` is the EventTicket queryset the scanner may
+    check in against. `live` scans are happening now and get JWT replay
+    protection; offline scans are judged at the time they were taken. Scans that resolve to no ticket are recorded against
+    `default_event`, or only logged if there is none.
+
+    A ticket checked in before this batch stays checked in; within the batch
+    the earliest scan wins. Returns one result dict per scan, in input order.
+    """
+    request_meta = request_meta or {}
+    now = timezone.now()
+    results = {}
+
+    # Scans submitted before (retries after a dropped connection)
+    scan_ids = [scan['scan_id'] for scan in scans]
+    results.update(_recorded(scan_ids))
+
+    records = []
+    checked_in = {}
+
+    with transaction.atomic():
+        # Claim the new scan ids. A concurrent retry of the same scan blocks
+        # here until the first commits, then finds the id taken and reports
+        # the first one's outcome instead of recording the scan twice.
+        unseen = [scan_id for scan_id in dict.fromkeys(scan_ids) if scan_id not in results]
+        claimed = _claim(unseen)
+        lost = [scan_id for scan_id in unseen if scan_id not in claimed]
+        if lost:
+            results.update(_recorded(lost))
+            for scan_id in lost:
+                results.setdefault(
+                    scan_id, _result(scan_id, 'invalid_token', "Scan was already processed", None, duplicate=True)
+                )
+
+        # Decode every token in one pass
+        pending = []
+        for scan in sorted(scans, key=lambda s: s['scanned_at']):
+            if scan['scan_id'] not in claimed:
+                continue
+            claimed.discard(scan['scan_id'])
+            scanned_at = scan['scanned_at']
+            if scanned_at > now + MAX_CLOCK_DRIFT:
+                decoded = (None, None, None, "Scan timestamp is in the future")
+            else:
+                decoded = decode_scan(scan['qr_token'], scanned_at, live)
+            pending.append([scan, *decoded])
+
+        # Replay check for live JWT scans: one atomic check-and-mark for the batch
+        if live:
+            tokens = [entry for entry in pending if entry[3] and not entry[4]]
+            for entry, fresh in zip(tokens, qr_replay_guard.claim_many([entry[3] for entry in tokens])):
+                if not fresh:
+                    entry[4] = "Token already used"
+
+        ticket_ids = {_as_uuid(entry[1]) for entry in pending if entry[1]} - {None}
+
+        loaded = {
+            ticket.id: ticket
+            for ticket in tickets.select_for_update(of=('self',))
+            .select_related('event__opportunity', 'user__profile')
+            .filter(id__in=ticket_ids)
+        }
+
+        # Current attendance for capped events, one grouped query
+        capped = {t.event_id for t in loaded.values() if t.event.max_attendees}
+        attendance = dict(
+            EventTicket.objects.filter(event_id__in=capped, checked_in_at__isnull=False)
+            .values_list('event_id')
+            .annotate(n=Count('id'))
+        ) if capped else {}
+
+        for scan, ticket_id, code, _, error in pending:
+            ticket = loaded.get(_as_uuid(ticket_id)) if ticket_id else None
+            if not ticket and not error:
+                error = "Ticket not found" if ticket_id else "Invalid token"
+
+            # Anything not judged against a ticket is an invalid scan
+            result = 'invalid_token'
+            if ticket and not error:
+                result, error = _judge(ticket, scan['scanned_at'], code, attendance)
+                if result == 'success':
+                    ticket.checked_in_at = scan['scanned_at']
+                    ticket.checked_in_by = scanner_user
+                    checked_in[ticket.id] = ticket
+                    if ticket.event_id in capped:
+                        attendance[ticket.event_id] = attendance.get(ticket.event_id, 0) + 1
+
+            message = error or "Successfully checked in"
+            event = ticket.event if ticket else default_event
+            if event is not None:
+                records.append(CheckIn(
+                    id=scan['scan_id'],
+                    scanned_data=scan['qr_token'][:500],
+                    scanner_user=scanner_user,
+                    ticket=ticket,
+                    event=event,
+                    result=result,
+                    result_message=message,
+                    latitude=scan.get('latitude'),
+                    longitude=scan.get('longitude'),
+                    ip_address=request_meta.get('REMOTE_ADDR'),
+                    user_agent=request_meta.get('HTTP_USER_AGENT', ''),
+                    scanned_at=None if live else scan['scanned_at'],
+                ))
+            else:
+                logger.warning(f"Unresolved check-in scan by user {scanner_user.id}: {message}")
+
+            results[scan['scan_id']] = _result(
+                scan['scan_id'], result, message, ticket.id if ticket else None,
+                attendee=ticket.user if ticket and result == 'success' else None,
+                event=ticket.event if ticket and result == 'success' else None,
+            )
+
+        CheckIn.objects.bulk_create(records)
+        by_event = {}
+        for record in records:
+            by_event.setdefault(record.event_id, []).append(record.result)
+        for event_id, event_results in by_event.items():
+            counters.increment(event_id, counters.check_in_deltas(event_results))
+        if checked_in:
+            EventTicket.objects.bulk_update(
+                checked_in.values(),
+                ['checked_in_at', 'checked_in_by', 'code_last_step'],
+            )
+
+    if checked_in:
+        logger.info(f"Batch check-in by {scanner_user.username}: {len(checked_in)} of {len(scans)} scans checked in")
+
+    return [results[scan_id] for scan_id in scan_ids]
+
+
+def _judge(ticket, scanned_at, code, attendance):
+    """Validate one scan against its ticket; returns (result, error)"""
+    event = ticket.event
+    if ticket.status != 'active':
+        return 'ticket_cancelled', "Ticket is not active"
+
+    step = None
+    if code is not None:
+        if not ticket.code_secret_issued_at:
+            return 'invalid_token', "Invalid ticket"
+        step = RotatingTicketCode.match_step(
+            ticket.server_token, code, event.qr_rotation_seconds, now=scanned_at.timestamp()
+        )
+        if step is None:
+            return 'invalid_token', "Invalid or expired code"
+
+    if ticket.checked_in_at:
+        return 'already_checked_in', f"Already checked in at {ticket.checked_in_at.isoformat()}"
+
+    if step is not None and ticket.code_last_step is not None and step <= ticket.code_last_step:
+        return 'invalid_token', "Token already used"
+
+    if not event.check_in_opens_at <= scanned_at <= event.check_in_closes_at:
+        return 'check_in_closed', "Check-in is not open for this event"
+
+    try:
+        verified = ticket.user.profile.is_verified
+    except Exception:
+        verified = False
+    if not verified:
+        return 'user_not_verified', "User verification required"
+
+    if event.max_attendees and attendance.get(event.id, 0) >= event.max_attendees:
+        return 'unknown_error', "Event is at capacity"
+
+    if step is not None:
+        ticket.code_last_step = step
+    return 'success', None
+
+
+def _result(scan_id, result, message, ticket_id, duplicate=False, attendee=None, event=None):
+    data = {
+        'scan_id': str(scan_id),
+        'success': result == 'success',
+        'result': result,
+        'message': message,
+        'ticket_id': str(ticket_id) if ticket_id else None,
+        'duplicate': duplicate,
+    }
+    if attendee:
+        data['user_name'] = attendee.get_full_name() or attendee.username
+        data['user_email'] = attendee.email
+    if event:
+        data['event_title'] = event.opportunity.title
+    return data
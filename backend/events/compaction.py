@@ -0,0 +1,124 @@
+"""
+Retention compaction for the CheckIn audit log.
+
+Raw attempts older than CHECKIN_RETENTION_DAYS are compacted one day at a
+time: the day's rows are streamed into a gzipped NDJSON archive in default
+storage, rolled up into CheckInDailySummary rows (attempts and distinct
+tickets per event and result), and deleted in the same transaction that
+writes the summaries. Scan receipts older than the window are pruned too,
+and on PostgreSQL the emptied monthly partitions are then dropped (see
+events.partitions).
+"""
+
+import gzip
+import json
+import logging
+import tempfile
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from events import partitions
+from events.models import CheckIn, CheckInDailySummary, CheckInScanReceipt
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = [
+    'id', 'created_at', 'scanned_at', 'event_id', 'ticket_id', 'scanner_user_id',
+    'scanner_device_id', 'result', 'result_message', 'scanned_data', 'latitude',
+    'longitude', 'ip_address', 'user_agent',
+]
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def archive_path(day):
+    return f"{settings.CHECKIN_ARCHIVE_PATH}/{day:%Y/%m}/checkins-{day.isoformat()}.ndjson.gz"
+
+
+def compact_day(day, storage=None, chunk_size=2000):
+    """
+    Archive, summarize and delete one day of raw check-in attempts.
+
+    Safe to re-run: the archive is rewritten from the rows still present and
+    summaries are upserted, so a crash before the delete loses nothing.
+    Returns the number of rows compacted.
+    """
+    storage = storage or default_storage
+    start, end = _day_bounds(day)
+    rows = CheckIn.objects.filter(created_at__gte=start, created_at__lt=end)
+
+    path = archive_path(day)
+    archived = 0
+    with tempfile.TemporaryFile() as tmp:
+        with gzip.GzipFile(fileobj=tmp, mode='wb') as archive:
+            for row in rows.order_by().values(*ARCHIVE_FIELDS).iterator(chunk_size=chunk_size):
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n')
+                archived += 1
+        if not archived:
+            return 0
+        tmp.seek(0)
+        if storage.exists(path):
+            storage.delete(path)
+        path = storage.save(path, File(tmp))
+
+    summaries = [
+        CheckInDailySummary(
+            event_id=row['event_id'],
+            date=day,
+            result=row['result'],
+            attempts=row['attempts'],
+            tickets=row['tickets'],
+            archive_path=path,
+        )
+        for row in rows.order_by().values('event_id', 'result').annotate(
+            attempts=Count('id'),
+            tickets=Count('ticket_id', distinct=True),
+        )
+    ]
+
+    with transaction.atomic():
+        CheckInDailySummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['event', 'date', 'result'],
+            update_fields=['attempts', 'tickets', 'archive_path'],
+        )
+        deleted, _ = rows.delete()
+
+    if deleted != archived:
+        logger.warning(f"Check-in compaction for {day}: archived {archived} rows but deleted {deleted}")
+    return deleted
+
+
+def compact_check_ins(retention_days=None, storage=None):
+    """
+    Compact every day older than the retention window, oldest first.
+    Returns (days compacted, rows compacted, partitions dropped).
+    """
+    retention_days = settings.CHECKIN_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = timezone.localdate() - timedelta(days=retention_days)
+    cutoff_start, _ = _day_bounds(cutoff)
+
+    partitions.ensure_partitions()
+
+    days = CheckIn.objects.filter(created_at__lt=cutoff_start).dates('created_at', 'day')
+    compacted = 0
+    for day in days:
+        compacted += compact_day(day, storage=storage)
+        logger.info(f"Compacted check-in attempts for {day}")
+
+    # Retries of scans this old are no longer deduplicated against the raw log either
+    CheckInScanReceipt.objects.filter(created_at__lt=cutoff_start).delete()
+
+    dropped = partitions.drop_expired_partitions(cutoff)
+    return len(days), compacted, dropped
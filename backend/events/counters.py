@@ -0,0 +1,221 @@
+"""
+Live per-event check-in counters.
+
+Dashboards used to re-aggregate the whole CheckIn table on every refresh.
+Instead, every registration and check-in adjusts a handful of EventCounter
+rows with F() updates in the same transaction, and publishes the delta to a
+short-lived sequence log in the cache once the transaction commits. Host
+dashboards read the counters in one query and then poll the log for deltas
+since the last sequence number they saw, so each update costs O(1)
+regardless of event size.
+"""
+
+from itertools import chain
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from events.models import CheckIn, CheckInDailySummary, EventCounter, EventTicket
+
+REGISTERED = 'registered'
+CHECKED_IN = 'checked_in'
+SCANS = 'scans'
+RESULT_PREFIX = 'result:'
+
+SEQ_KEY = "event_live:{event_id}:seq"
+ENTRY_KEY = "event_live:{event_id}:{seq}"
+# Deltas older than this are gone; streams that fall behind resync from a snapshot
+LOG_TTL_SECONDS = 600
+
+# Dashboards poll the live endpoint about this often
+LIVE_POLL_SECONDS = 2
+# Catching up further back than this replays too much; send a snapshot instead
+LIVE_MAX_REPLAY = 1000
+
+
+def result_counter(result):
+    return f"{RESULT_PREFIX}{result}"
+
+
+def check_in_deltas(results):
+    """Counter deltas for a sequence of CheckIn result codes"""
+    deltas = {}
+    for result in results:
+        deltas[SCANS] = deltas.get(SCANS, 0) + 1
+        key = result_counter(result)
+        deltas[key] = deltas.get(key, 0) + 1
+        if result == 'success':
+            deltas[CHECKED_IN] = deltas.get(CHECKED_IN, 0) + 1
+    return deltas
+
+
+def increment(event_id, deltas):
+    """
+    Apply counter deltas for one event in a single UPDATE.
+
+    Call inside the transaction that makes the counted change; the delta is
+    published to live streams only if that transaction commits.
+    """
+    deltas = {name: n for name, n in deltas.items() if n}
+    if not deltas:
+        return
+
+    names = list(deltas)
+    value = F('value') + Case(
+        *[When(name=name, then=Value(n)) for name, n in deltas.items()],
+        default=Value(0),
+    )
+    updated = EventCounter.objects.filter(event_id=event_id, name__in=names).update(
+        value=value, updated_at=timezone.now()
+    )
+    if updated < len(names):
+        # First time this event sees some of these counters
+        present = set(
+            EventCounter.objects.filter(event_id=event_id, name__in=names).values_list('name', flat=True)
+        )
+        missing = [name for name in names if name not in present]
+        EventCounter.objects.bulk_create(
+            [EventCounter(event_id=event_id, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        EventCounter.objects.filter(event_id=event_id, name__in=missing).update(
+            value=value, updated_at=timezone.now()
+        )
+
+    transaction.on_commit(lambda: publish(event_id, deltas))
+
+
+def reserve(event_id, limit, n=1):
+    """
+    Claim `n` registered seats if the total stays within `limit`.
+
+    The check and the increment are one conditional UPDATE on the event's
+    'registered' row, so concurrent registrations can't oversell; the row
+    stays locked until the caller's transaction ends. `limit` None means
+    unlimited (callers map Event.max_attendees 0 to None). Returns whether
+    the seats were claimed.
+    """
+    counter = EventCounter.objects.filter(event_id=event_id, name=REGISTERED)
+    claim = counter if limit is None else counter.filter(value__lte=limit - n)
+    for attempt in range(2):
+        if claim.update(value=F('value') + n, updated_at=timezone.now()):
+            transaction.on_commit(lambda: publish(event_id, {REGISTERED: n}))
+            return True
+        if attempt or counter.exists():
+            return False
+        EventCounter.objects.bulk_create(
+            [EventCounter(event_id=event_id, name=REGISTERED)], ignore_conflicts=True
+        )
+    return False
+
+
+def reserve_up_to(event_id, limit, wanted):
+    """Claim as many of `wanted` seats as `limit` allows; returns how many"""
+    EventCounter.objects.bulk_create(
+        [EventCounter(event_id=event_id, name=REGISTERED)], ignore_conflicts=True
+    )
+    counter = EventCounter.objects.select_for_update().get(event_id=event_id, name=REGISTERED)
+    n = wanted if limit is None else max(0, min(wanted, limit - counter.value))
+    if n:
+        EventCounter.objects.filter(pk=counter.pk).update(
+            value=F('value') + n, updated_at=timezone.now()
+        )
+        transaction.on_commit(lambda: publish(event_id, {REGISTERED: n}))
+    return n
+
+
+def publish(event_id, deltas):
+    seq_key = SEQ_KEY.format(event_id=event_id)
+    cache.add(seq_key, 0, None)
+    try:
+        seq = cache.incr(seq_key)
+    except ValueError:
+        cache.set(seq_key, 1, None)
+        seq = 1
+    cache.set(ENTRY_KEY.format(event_id=event_id, seq=seq), deltas, LOG_TTL_SECONDS)
+
+
+def current_seq(event_id):
+    return cache.get(SEQ_KEY.format(event_id=event_id), 0)
+
+
+def snapshot(event_id):
+    """Current counters for an event, shaped for dashboards"""
+    seq = current_seq(event_id)
+    values = dict(EventCounter.objects.filter(event_id=event_id).values_list('name', 'value'))
+    return _shape(values, seq)
+
+
+def _shape(values, seq):
+    failures = {
+        name[len(RESULT_PREFIX):]: n
+        for name, n in values.items()
+        if name.startswith(RESULT_PREFIX) and name != result_counter('success') and n
+    }
+    return {
+        'seq': seq,
+        'registered': values.get(REGISTERED, 0),
+        'checked_in': values.get(CHECKED_IN, 0),
+        'total_scans': values.get(SCANS, 0),
+        'successful_scans': values.get(result_counter('success'), 0),
+        'failed_scans': sum(failures.values()),
+        'failures': failures,
+    }
+
+
+def rebuild(event_id):
+    """
+    Recompute an event's counters from tickets and the CheckIn log.
+
+    Repairs drift (e.g. after bulk edits that bypassed the counters); locks
+    the counter rows so concurrent increments queue behind the rebuild.
+    """
+    with transaction.atomic():
+        list(EventCounter.objects.select_for_update().filter(event_id=event_id))
+        tickets = EventTicket.objects.filter(event_id=event_id).aggregate(
+            registered=Count('id', filter=Q(status='active')),
+            checked_in=Count('id', filter=Q(checked_in_at__isnull=False)),
+        )
+        values = {REGISTERED: tickets['registered'], CHECKED_IN: tickets['checked_in']}
+        # Raw attempts plus the daily summaries of compacted ones
+        attempts = chain(
+            CheckIn.objects.filter(event_id=event_id).values_list('result').annotate(n=Count('id')),
+            CheckInDailySummary.objects.filter(event_id=event_id).values_list('result', 'attempts'),
+        )
+        for result, n in attempts:
+            key = result_counter(result)
+            values[key] = values.get(key, 0) + n
+            values[SCANS] = values.get(SCANS, 0) + n
+
+        EventCounter.objects.filter(event_id=event_id).exclude(name__in=list(values)).delete()
+        EventCounter.objects.bulk_create(
+            [EventCounter(event_id=event_id, name=name, value=n) for name, n in values.items()],
+            update_conflicts=True,
+            unique_fields=['event', 'name'],
+            update_fields=['value', 'updated_at'],
+        )
+    return values
+
+
+def changes(event_id, since=None):
+    """
+    Counter changes after sequence number `since`, for dashboards polling the
+    live endpoint: {'seq', 'deltas': [{'seq', ...deltas}]} while the log
+    still covers the gap, else {'seq', 'snapshot'}. Never waits, so a poll
+    holds a worker thread only for a couple of cache reads.
+    """
+    seq = current_seq(event_id)
+    if since is not None and since <= seq and seq - since <= LIVE_MAX_REPLAY:
+        keys = [ENTRY_KEY.format(event_id=event_id, seq=n) for n in range(since + 1, seq + 1)]
+        entries = cache.get_many(keys)
+        if len(entries) == len(keys):
+            return {
+                'seq': seq,
+                'deltas': [{'seq': n, **entries[key]} for n, key in enumerate(keys, start=since + 1)],
+            }
+
+    # First poll, or fell behind the log: start over from the counters
+    data = snapshot(event_id)
+    return {'seq': data['seq'], 'snapshot': data}
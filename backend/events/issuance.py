@@ -0,0 +1,184 @@
+"""
+Bulk ticket issuance for hosts importing an attendee list.
+
+Instead of one registration per attendee (an existence check, a device
+lookup and a single-row insert each), a list of user ids and/or emails is
+resolved in one query, checked against existing tickets in one query,
+given seats in one counter update, and inserted with `bulk_create` using
+server tokens generated up front. Every input row gets a line in the
+report, in input order.
+
+Issuance respects max_attendees but not the waitlist: the host is choosing
+who gets the free seats. Waiting entries for issued users are marked
+promoted.
+"""
+
+import logging
+import secrets
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from events import counters
+from events.models import EventTicket, EventWaitlistEntry
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_ISSUE = 10000
+INSERT_BATCH_SIZE = 1000
+
+ISSUED = 'issued'
+ALREADY_REGISTERED = 'already_registered'
+NOT_FOUND = 'not_found'
+AMBIGUOUS = 'ambiguous'
+INVALID = 'invalid'
+DUPLICATE = 'duplicate'
+EVENT_FULL = 'event_full'
+
+MESSAGES = {
+    ISSUED: '',
+    ALREADY_REGISTERED: "User already has a ticket for this event",
+    NOT_FOUND: "No user with this id or email",
+    AMBIGUOUS: "Several users share this email; use the user id",
+    INVALID: "Not a user id or email address",
+    DUPLICATE: "Same user as an earlier row",
+    EVENT_FULL: "Event is at capacity",
+}
+
+
+def _parse(identifier):
+    """('email', value) / ('id', UUID) / (None, None) for one input row"""
+    value = str(identifier).strip()
+    if '@' in value:
+        return 'email', value.lower()
+    try:
+        return 'id', uuid.UUID(value)
+    except ValueError:
+        return None, None
+
+
+def _row(index, identifier, status, user_id=None, ticket_id=None, verified=None):
+    message = MESSAGES[status]
+    if status == ISSUED and verified is False:
+        message = "User is not identity-verified; check-in is refused until they are"
+    return {
+        'row': index,
+        'input': str(identifier),
+        'status': status,
+        'user_id': str(user_id) if user_id else None,
+        'ticket_id': str(ticket_id) if ticket_id else None,
+        'message': message,
+    }
+
+
+def _resolve(parsed):
+    """Map each parsed key to [(user_id, verified)] with one query"""
+    ids = {value for kind, value in parsed if kind == 'id'}
+    emails = {value for kind, value in parsed if kind == 'email'}
+    if not ids and not emails:
+        return {}
+
+    matches = {}
+    users = User.objects.annotate(email_lower=Lower('email')).filter(
+        Q(id__in=ids) | Q(email_lower__in=emails)
+    ).values_list('id', 'email_lower', 'profile__is_verified')
+    for user_id, email, verified in users:
+        if user_id in ids:
+            matches.setdefault(('id', user_id), []).append((user_id, verified))
+        if email in emails:
+            matches.setdefault(('email', email), []).append((user_id, verified))
+    return matches
+
+
+def issue_tickets(event, identifiers):
+    """
+    Issue tickets to the users named by `identifiers` (user ids or emails).
+
+    Returns (issued count, report) where the report has one dict per input
+    row: row, input, status, user_id, ticket_id, message.
+    """
+    identifiers = list(identifiers)
+    parsed = [_parse(identifier) for identifier in identifiers]
+    matches = _resolve(parsed)
+
+    report = [None] * len(identifiers)
+    candidates = []  # (row index, user id, verified) in input order
+    seen = set()
+    for index, (identifier, key) in enumerate(zip(identifiers, parsed)):
+        if key[0] is None:
+            report[index] = _row(index, identifier, INVALID)
+            continue
+        found = matches.get(key, [])
+        if not found:
+            report[index] = _row(index, identifier, NOT_FOUND)
+        elif len(found) > 1:
+            report[index] = _row(index, identifier, AMBIGUOUS)
+        elif found[0][0] in seen:
+            report[index] = _row(index, identifier, DUPLICATE, user_id=found[0][0])
+        else:
+            seen.add(found[0][0])
+            candidates.append((index, found[0][0], found[0][1]))
+
+    existing = dict(
+        EventTicket.objects.filter(event=event, user_id__in=seen).values_list('user_id', 'id')
+    )
+    wanted = []
+    for index, user_id, verified in candidates:
+        if user_id in existing:
+            report[index] = _row(index, identifiers[index], ALREADY_REGISTERED,
+                                 user_id=user_id, ticket_id=existing[user_id])
+        else:
+            wanted.append((index, user_id, verified))
+
+    issued = 0
+    if wanted:
+        with transaction.atomic():
+            n = counters.reserve_up_to(event.id, event.max_attendees or None, len(wanted))
+            for index, user_id, _ in wanted[n:]:
+                report[index] = _row(index, identifiers[index], EVENT_FULL, user_id=user_id)
+
+            tickets = [
+                EventTicket(
+                    event=event,
+                    user_id=user_id,
+                    server_token=secrets.token_urlsafe(48),
+                )
+                for _, user_id, _ in wanted[:n]
+            ]
+            # Registrations racing with the import lose nothing: their rows win
+            EventTicket.objects.bulk_create(tickets, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True)
+            created = set(
+                EventTicket.objects.filter(id__in=[t.id for t in tickets]).values_list('id', flat=True)
+            )
+
+            issued_by_user = {}
+            for (index, user_id, verified), ticket in zip(wanted, tickets):
+                if ticket.id in created:
+                    issued_by_user[user_id] = ticket
+                    report[index] = _row(index, identifiers[index], ISSUED,
+                                         user_id=user_id, ticket_id=ticket.id, verified=verified)
+                else:
+                    report[index] = _row(index, identifiers[index], ALREADY_REGISTERED, user_id=user_id)
+            issued = len(issued_by_user)
+
+            if issued < n:
+                counters.increment(event.id, {counters.REGISTERED: issued - n})
+
+            entries = list(EventWaitlistEntry.objects.filter(
+                event=event, status='waiting', user_id__in=issued_by_user
+            ))
+            now = timezone.now()
+            for entry in entries:
+                entry.status = 'promoted'
+                entry.promoted_at = now
+                entry.ticket = issued_by_user[entry.user_id]
+            EventWaitlistEntry.objects.bulk_update(entries, ['status', 'promoted_at', 'ticket'])
+
+    logger.info(f"Bulk issued {issued} of {len(identifiers)} tickets for event {event.id}")
+    return issued, report
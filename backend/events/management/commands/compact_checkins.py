@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.compaction import compact_check_ins
+
+
+class Command(BaseCommand):
+    help = 'Roll old check-in attempts into daily summaries and move the raw rows to compressed archives'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.CHECKIN_RETENTION_DAYS,
+            help='Keep raw attempts this many days'
+        )
+    
+    def handle(self, *args, **options):
+        days, rows, dropped = compact_check_ins(options['retention_days'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {rows} check-in attempts over {days} days; dropped {len(dropped)} partitions'
+        ))
@@ -0,0 +1,53 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.issuance import ISSUED, issue_tickets
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Issue tickets for an event to users listed (by id or email) in a file'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('event', type=int, help='Event id')
+        parser.add_argument(
+            'file',
+            help="CSV or text file with a user id or email in the first column ('-' for stdin)"
+        )
+        parser.add_argument(
+            '--skip-header',
+            action='store_true',
+            help='Ignore the first line of the file'
+        )
+        parser.add_argument(
+            '--report',
+            help='Write the per-row report to this CSV file'
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.get(id=options['event'])
+        except Event.DoesNotExist:
+            raise CommandError(f"Event {options['event']} does not exist")
+        
+        handle = sys.stdin if options['file'] == '-' else open(options['file'], newline='', encoding='utf-8-sig')
+        with handle:
+            rows = [row[0] for row in csv.reader(handle) if row and row[0].strip()]
+        if options['skip_header']:
+            rows = rows[1:]
+        
+        issued, report = issue_tickets(event, rows)
+        
+        if options['report']:
+            with open(options['report'], 'w', newline='') as out:
+                writer = csv.DictWriter(out, fieldnames=['row', 'input', 'status', 'user_id', 'ticket_id', 'message'])
+                writer.writeheader()
+                writer.writerows(report)
+        else:
+            for row in report:
+                if row['status'] != ISSUED:
+                    self.stdout.write(f"Row {row['row']} ({row['input']}): {row['status']} {row['message']}")
+        
+        self.stdout.write(self.style.SUCCESS(f'Issued {issued} of {len(report)} tickets for {event}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from events import counters
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Recompute live check-in counters from tickets and the check-in log'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event',
+            type=int,
+            action='append',
+            help='Only rebuild this event (may be repeated); defaults to all events'
+        )
+    
+    def handle(self, *args, **options):
+        events = Event.objects.all()
+        if options['event']:
+            events = events.filter(id__in=options['event'])
+        
+        rebuilt = 0
+        for event_id in events.values_list('id', flat=True).iterator():
+            counters.rebuild(event_id)
+            rebuilt += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {rebuilt} events'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventticket',
+            name='code_last_step',
+            field=models.BigIntegerField(blank=True, help_text='Time step of the last accepted rotating code (replay protection)', null=True),
+        ),
+        migrations.AddField(
+            model_name='eventticket',
+            name='code_secret_issued_at',
+            field=models.DateTimeField(blank=True, help_text="When the rotating-code secret was handed to the attendee's app", null=True),
+        ),
+    ]
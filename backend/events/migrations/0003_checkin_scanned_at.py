@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_ticket_rotating_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkin',
+            name='scanned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
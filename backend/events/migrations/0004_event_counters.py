@@ -0,0 +1,51 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    EventTicket = apps.get_model('events', 'EventTicket')
+    CheckIn = apps.get_model('events', 'CheckIn')
+    EventCounter = apps.get_model('events', 'EventCounter')
+
+    values = {}
+    for event_id, registered, checked_in in EventTicket.objects.values_list('event_id').annotate(
+        registered=Count('id', filter=Q(status='active')),
+        checked_in=Count('id', filter=Q(checked_in_at__isnull=False)),
+    ):
+        values[(event_id, 'registered')] = registered
+        values[(event_id, 'checked_in')] = checked_in
+    for event_id, result, n in CheckIn.objects.values_list('event_id', 'result').annotate(n=Count('id')):
+        values[(event_id, f'result:{result}')] = n
+        values[(event_id, 'scans')] = values.get((event_id, 'scans'), 0) + n
+
+    EventCounter.objects.bulk_create(
+        [EventCounter(event_id=event_id, name=name, value=n) for (event_id, name), n in values.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_checkin_scanned_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=40)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to='events.event')),
+            ],
+            options={
+                'unique_together': {('event', 'name')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
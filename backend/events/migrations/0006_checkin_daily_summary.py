@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_registration_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('result', models.CharField(choices=[('success', 'Success'), ('invalid_token', 'Invalid Token'), ('expired_token', 'Expired Token'), ('already_checked_in', 'Already Checked In'), ('invalid_device', 'Invalid Device'), ('ticket_cancelled', 'Ticket Cancelled'), ('user_not_verified', 'User Not Verified'), ('check_in_closed', 'Check-In Closed'), ('unknown_error', 'Unknown Error')], max_length=30)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('tickets', models.PositiveIntegerField(default=0, help_text='Distinct tickets scanned')),
+                ('archive_path', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='check_in_summaries', to='events.event')),
+            ],
+            options={
+                'verbose_name_plural': 'Check-in daily summaries',
+                'ordering': ['-date'],
+                'unique_together': {('event', 'date', 'result')},
+            },
+        ),
+    ]
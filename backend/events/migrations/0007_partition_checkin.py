@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from events.partitions import partition_existing_table
+
+
+def partition_checkins(apps, schema_editor):
+    partition_existing_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    # The table swap and each batch of copied rows commit separately, so the
+    # copy doesn't hold one long transaction (see partition_existing_table)
+    atomic = False
+
+    dependencies = [
+        ('events', '0006_checkin_daily_summary'),
+    ]
+
+    operations = [
+        # PostgreSQL only; other databases keep a plain table
+        migrations.RunPython(partition_checkins, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_partition_checkin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deviceregistration',
+            index=models.Index(fields=['push_token'], name='events_devi_push_to_4907e7_idx'),
+        ),
+    ]
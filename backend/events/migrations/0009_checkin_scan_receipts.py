@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_device_push_token_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInScanReceipt',
+            fields=[
+                ('scan_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('claim', models.UUIDField(help_text='Identifies the batch that claimed the scan')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
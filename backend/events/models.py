@@ -138,6 +138,21 @@ class EventTicket(models.Model):
         related_name='tickets_checked_in'
     )
     
+    # Rotating check-in codes derived on the attendee's device
+    code_secret_issued_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the rotating-code secret was handed to the attendee's app"
+    )
+    code_last_step = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Time step of the last accepted rotating code (replay protection)"
+    )
+    
+    # Client-supplied key so a retried registration returns the same ticket
+    idempotency_key = models.CharField(max_length=64, blank=True)
+    
     # Metadata
     notes = models.TextField(blank=True)
     
@@ -215,6 +230,7 @@ class DeviceRegistration(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_active']),
             models.Index(fields=['device_fingerprint_hash']),
+            models.Index(fields=['push_token']),
         ]
     
     def __str__(self):
@@ -293,6 +309,9 @@ class CheckIn(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     
+    # When the scan happened on the scanner, if it was synced later (offline mode)
+    scanned_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -305,3 +324,112 @@ class CheckIn(models.Model):
     
     def __str__(self):
         return f"{self.event} - {self.result} at {self.created_at}"
+
+
+class CheckInScanReceipt(models.Model):
+    """
+    One row per scan id processed by events.checkin.
+
+    On PostgreSQL the CheckIn primary key is (id, created_at), as the table is
+    partitioned by created_at, so it can't stop a retried scan from being
+    recorded twice; claiming the scan id here, in an unpartitioned table,
+    does. Receipts are pruned with the raw log (see events.compaction).
+    """
+    
+    scan_id = models.UUIDField(primary_key=True)
+    claim = models.UUIDField(help_text="Identifies the batch that claimed the scan")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"Scan {self.scan_id}"
+
+
+class EventWaitlistEntry(models.Model):
+    """
+    A place in an event's waitlist once it is at capacity.
+    Entries are promoted to tickets in FIFO (id) order as seats free up.
+    """
+    
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+        ('withdrawn', 'Withdrawn'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='event_waitlist_entries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    idempotency_key = models.CharField(max_length=64, blank=True)
+    ticket = models.OneToOneField(
+        EventTicket,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='waitlist_entry'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        unique_together = [['event', 'user']]
+        indexes = [
+            models.Index(fields=['event', 'status', 'id']),
+        ]
+        verbose_name_plural = 'Event waitlist entries'
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.event} ({self.status})"
+
+
+class CheckInDailySummary(models.Model):
+    """
+    Per-event, per-day attempt counts for CheckIn rows that were compacted
+    out of the raw log (see events.compaction).
+    """
+    
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='check_in_summaries'
+    )
+    date = models.DateField()
+    result = models.CharField(max_length=30, choices=CheckIn.RESULT_CHOICES)
+    attempts = models.PositiveIntegerField(default=0)
+    tickets = models.PositiveIntegerField(default=0, help_text="Distinct tickets scanned")
+    archive_path = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['event', 'date', 'result']
+        ordering = ['-date']
+        verbose_name_plural = 'Check-in daily summaries'
+    
+    def __str__(self):
+        return f"{self.event} - {self.date} {self.result}: {self.attempts}"
+
+
+class EventCounter(models.Model):
+    """
+    Incrementally maintained per-event totals for host dashboards.
+    
+    One row per (event, name): 'registered' (active tickets), 'checked_in',
+    'scans' and 'result:<code>' for every check-in result. Rows are updated
+    with F() expressions in the same transaction as the change they count.
+    """
+    
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='counters'
+    )
+    name = models.CharField(max_length=40)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['event', 'name']
+    
+    def __str__(self):
+        return f"{self.event} - {self.name}: {self.value}"
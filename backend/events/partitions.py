@@ -0,0 +1,197 @@
+"""
+Monthly range partitions for the CheckIn audit log.
+
+On PostgreSQL `events_checkin` is a native partitioned table (RANGE on
+created_at, one partition per month plus a default partition), so recent
+scans live in a small hot partition with small indexes and expired months
+are dropped rather than deleted row by row. On other databases (SQLite in
+development) the table stays a plain table and these helpers are no-ops;
+compaction still works through ordinary DELETEs.
+"""
+
+import logging
+from datetime import date
+
+from django.db import connection, transaction, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'events_checkin'
+DEFAULT_PARTITION = f'{TABLE}_default'
+LEGACY_TABLE = f'{TABLE}_unpartitioned'
+
+# Rows moved per transaction when partitioning an existing table
+COPY_BATCH_SIZE = 10000
+
+
+def _month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def ensure_partitions(months_ahead=2, today=None):
+    """Create the monthly partitions from this month to `months_ahead` ahead"""
+    if not is_partitioned():
+        return []
+
+    today = today or date.today()
+    created = []
+    for offset in range(months_ahead + 1):
+        start = _month_start(today, offset)
+        name = partition_name(start)
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" '
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_month_start(start, 1).isoformat()}')"
+                )
+        except DatabaseError:
+            # Rows for this month already landed in the default partition
+            logger.exception(f"Could not create check-in partition {name}")
+            continue
+        created.append(name)
+    return created
+
+
+def drop_expired_partitions(cutoff):
+    """
+    Drop monthly partitions that end on or before `cutoff` and are empty.
+    Compaction empties them first, so nothing is lost.
+    """
+    if not is_partitioned():
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s AND child.relname LIKE %s
+            """,
+            [TABLE, f'{TABLE}_p%'],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    dropped = []
+    for name in sorted(names):
+        year, month = name.rsplit('_p', 1)[1].split('_')
+        if _month_start(date(int(year), int(month), 1), 1) > cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM "{name}" LIMIT 1')
+            if cursor.fetchone():
+                continue
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        dropped.append(name)
+    return dropped
+
+
+def _relkind(cursor, name):
+    cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [name])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _swap_in_partitioned_table(cursor):
+    """Move the plain table aside and create the partitioned parent in its place"""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+        "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p')",
+        [TABLE, TABLE],
+    )
+    index_defs = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(f'SELECT MIN(created_at) FROM "{TABLE}"')
+    oldest = cursor.fetchone()[0]
+
+    cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+    # Index names are schema-wide, so free them (primary key included) for the new parent
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [LEGACY_TABLE])
+    for n, (name,) in enumerate(cursor.fetchall()):
+        cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{LEGACY_TABLE}_idx{n}"')
+
+    cursor.execute(
+        f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS) '
+        f'PARTITION BY RANGE (created_at)'
+    )
+    cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, created_at)')
+    cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+    today = date.today()
+    month = _month_start(oldest.date() if oldest else today)
+    while month <= _month_start(today, 2):
+        cursor.execute(
+            f'CREATE TABLE "{partition_name(month)}" PARTITION OF "{TABLE}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_month_start(month, 1).isoformat()}')"
+        )
+        month = _month_start(month, 1)
+
+    # Captured before the rename, so they already target the new parent
+    for index_def in index_defs:
+        cursor.execute(index_def)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+
+def partition_existing_table(schema_editor, batch_size=COPY_BATCH_SIZE):
+    """
+    Convert a plain events_checkin table into a partitioned one (PostgreSQL).
+
+    The primary key becomes (id, created_at) because PostgreSQL requires the
+    partition key in every unique constraint; CheckInScanReceipt keeps scan
+    ids unique instead. Indexes and foreign keys are recreated on the parent
+    so every partition inherits them.
+
+    Runs in steps rather than one transaction (migration 0007 is not atomic):
+    the swap is a single short transaction that holds an ACCESS EXCLUSIVE
+    lock on the table for the DDL only, after which new check-ins go to the
+    partitioned table. Existing rows are then moved across `batch_size` at a
+    time, each batch in its own transaction, so no lock is held for the whole
+    copy and an interrupted run resumes where it stopped. Until the move
+    finishes, older attempts are missing from history, exports and duplicate
+    scan lookups; the empty legacy table is dropped at the end.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if _relkind(cursor, TABLE) != 'p':
+            _swap_in_partitioned_table(cursor)
+
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            if _relkind(cursor, LEGACY_TABLE) is None:
+                return
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{LEGACY_TABLE}" WHERE ctid IN '
+                f'(SELECT ctid FROM "{LEGACY_TABLE}" LIMIT %s) RETURNING *) '
+                f'INSERT INTO "{TABLE}" SELECT * FROM moved',
+                [batch_size],
+            )
+            if cursor.rowcount:
+                logger.info(f"Moved {cursor.rowcount} check-in rows into the partitioned table")
+            else:
+                cursor.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+                return
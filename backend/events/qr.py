@@ -0,0 +1,170 @@
+"""
+QR code rendering for check-in tokens.
+
+Rendering used to build a PIL image at box size 10, run qrcode's best-mask
+search (eight full encodes) and PNG-encode through Pillow on every request.
+Here the module matrix is encoded once with a fixed mask and the smallest
+version that fits the token, then serialized straight into one of:
+
+- ``png``: a 1-bit grayscale PNG written directly with zlib;
+- ``svg``: a single stroked path in module units, scaled by the client;
+- ``matrix``: the raw modules, bit-packed and base64-encoded, for clients
+  that draw the code themselves.
+
+Renders are cached for a few seconds keyed by token and format, so retries
+and repeated refreshes of the same token cost one cache read.
+"""
+
+import base64
+import hashlib
+import struct
+import zlib
+
+import qrcode
+from django.core.cache import cache
+
+FORMATS = ('png', 'svg', 'matrix')
+
+RENDER_CACHE_KEY = "qr_render:{digest}:{format}"
+RENDER_CACHE_SECONDS = 30
+
+# Rendered PNGs aim for about this many pixels across (quiet zone included)
+TARGET_PIXELS = 240
+MIN_BOX_SIZE = 2
+BORDER = 4
+
+# Any mask scans; fixing it skips qrcode's eight-encode penalty search
+MASK_PATTERN = 0
+
+
+def build_matrix(data, border=BORDER):
+    """Module matrix (rows of bools, quiet zone included) at the smallest fitting version"""
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        border=border,
+        mask_pattern=MASK_PATTERN,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def box_size_for(modules):
+    return max(MIN_BOX_SIZE, TARGET_PIXELS // modules)
+
+
+def _png_chunk(kind, payload):
+    return (
+        struct.pack('>I', len(payload))
+        + kind
+        + payload
+        + struct.pack('>I', zlib.crc32(kind + payload) & 0xffffffff)
+    )
+
+
+def render_png(matrix, box_size=None):
+    """Encode a matrix as a 1-bit grayscale PNG, `box_size` pixels per module"""
+    modules = len(matrix)
+    box_size = box_size or box_size_for(modules)
+    width = modules * box_size
+
+    rows = []
+    for row in matrix:
+        # Dark modules are 0 bits; each module repeats box_size times
+        bits = ''.join(('0' if dark else '1') * box_size for dark in row)
+        bits += '1' * (-width % 8)
+        line = b'\x00' + int(bits, 2).to_bytes(len(bits) // 8, 'big')
+        rows.append(line * box_size)
+
+    header = struct.pack('>IIBBBBB', width, width, 1, 0, 0, 0, 0)
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + _png_chunk(b'IHDR', header)
+        + _png_chunk(b'IDAT', zlib.compress(b''.join(rows), 9))
+        + _png_chunk(b'IEND', b'')
+    )
+
+
+def render_svg(matrix):
+    """
+    Encode a matrix as a minimal SVG in module units: one stroked path,
+    one relative `h` segment per run of dark modules.
+    """
+    modules = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        pen = None
+        x = 0
+        while x < modules:
+            if row[x]:
+                start = x
+                while x < modules and row[x]:
+                    x += 1
+                # Absolute move for a row's first run, relative after that
+                move = f"M{start} {y}.5" if pen is None else f"m{start - pen} 0"
+                path.append(f"{move}h{x - start}")
+                pen = x
+            else:
+                x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {modules} {modules}" '
+        f'shape-rendering="crispEdges"><rect width="100%" height="100%" fill="#fff"/>'
+        f'<path stroke="#000" d="{"".join(path)}"/></svg>'
+    )
+
+
+def pack_matrix(matrix):
+    """Bit-pack a matrix row by row (1 = dark, MSB first, rows padded to whole bytes)"""
+    packed = bytearray()
+    for row in matrix:
+        bits = ''.join('1' if dark else '0' for dark in row)
+        bits += '0' * (-len(bits) % 8)
+        packed += int(bits, 2).to_bytes(len(bits) // 8, 'big')
+    return base64.b64encode(bytes(packed)).decode()
+
+
+def render(data, format='png', ttl=RENDER_CACHE_SECONDS):
+    """
+    Render `data` in the requested format, using the render cache.
+
+    Returns a dict: `format`, `data_uri` for png/svg, and `size` plus
+    `modules` (packed rows) for matrix.
+    """
+    digest = hashlib.sha256(data.encode()).hexdigest()
+    key = RENDER_CACHE_KEY.format(digest=digest, format=format)
+    rendered = cache.get(key)
+    if rendered is not None:
+        return rendered
+
+    matrix = build_matrix(data)
+    if format == 'svg':
+        svg = render_svg(matrix)
+        rendered = {
+            'format': 'svg',
+            'data_uri': f"data:image/svg+xml;base64,{base64.b64encode(svg.encode()).decode()}",
+        }
+    elif format == 'matrix':
+        rendered = {'format': 'matrix', 'size': len(matrix), 'modules': pack_matrix(matrix)}
+    else:
+        png = render_png(matrix)
+        rendered = {
+            'format': 'png',
+            'data_uri': f"data:image/png;base64,{base64.b64encode(png).decode()}",
+        }
+
+    if ttl > 0:
+        cache.set(key, rendered, ttl)
+    return rendered
+
+
+def negotiate_format(request, requested=None):
+    """Pick an output format from `?format=` or the Accept header; PNG by default"""
+    if requested in FORMATS:
+        return requested
+    accept = request.headers.get('Accept', '')
+    if 'image/svg+xml' in accept:
+        return 'svg'
+    if 'application/vnd.mishmob.qr-matrix' in accept:
+        return 'matrix'
+    return 'png'
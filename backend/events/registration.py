@@ -0,0 +1,181 @@
+"""
+Event registration with atomic capacity control and a FIFO waitlist.
+
+Seats are claimed with a conditional UPDATE on the event's 'registered'
+counter (see events.counters.reserve), so concurrent registrations never
+oversell and never read-then-write the ticket table. Registrants who don't
+get a seat join the waitlist; cancellations promote waiting entries in
+batches, oldest first.
+"""
+
+import logging
+import secrets
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from events import counters
+from events.models import Event, EventTicket, EventWaitlistEntry
+from notifications.dispatcher import notify
+
+logger = logging.getLogger(__name__)
+
+# Waitlist entries promoted per transaction
+PROMOTION_BATCH_SIZE = 200
+
+
+class RegistrationError(Exception):
+    pass
+
+
+def _existing_registration(event, user, idempotency_key):
+    """
+    Return (ticket, entry) for a retried registration, None if the user has
+    neither; raises RegistrationError for a duplicate with a different key.
+    """
+    ticket = EventTicket.objects.filter(event=event, user=user).first()
+    if ticket:
+        if idempotency_key and ticket.idempotency_key == idempotency_key:
+            return ticket, None
+        raise RegistrationError("Already registered for this event")
+
+    entry = EventWaitlistEntry.objects.filter(event=event, user=user, status='waiting').first()
+    if entry:
+        if idempotency_key and entry.idempotency_key == idempotency_key:
+            return None, entry
+        raise RegistrationError("Already on the waitlist for this event")
+
+    return None
+
+
+def register(event, user, device=None, idempotency_key=''):
+    """
+    Register a user for an event.
+
+    Returns (ticket, None) when a seat was claimed or (None, waitlist_entry)
+    when the event is full. Repeating a request with the same idempotency
+    key returns the original outcome instead of an error.
+    """
+    existing = _existing_registration(event, user, idempotency_key)
+    if existing:
+        return existing
+
+    try:
+        with transaction.atomic():
+            # max_attendees 0 means unlimited
+            limit = event.max_attendees or None
+            # Seats freed while others are waiting belong to the waitlist
+            queue_ahead = limit is not None and EventWaitlistEntry.objects.filter(
+                event=event, status='waiting'
+            ).exists()
+            if not queue_ahead and counters.reserve(event.id, limit):
+                ticket = EventTicket.objects.create(
+                    event=event,
+                    user=user,
+                    registered_device=device,
+                    idempotency_key=idempotency_key,
+                )
+                return ticket, None
+
+            # Rejoining after withdrawing goes to the back of the queue
+            EventWaitlistEntry.objects.filter(event=event, user=user).delete()
+            entry = EventWaitlistEntry.objects.create(
+                event=event,
+                user=user,
+                idempotency_key=idempotency_key,
+            )
+            return None, entry
+    except IntegrityError:
+        # A concurrent request from the same user won the race
+        existing = _existing_registration(event, user, idempotency_key)
+        if existing:
+            return existing
+        raise RegistrationError("Already registered for this event")
+
+
+def waitlist_position(entry):
+    """1-based position of a waiting entry"""
+    return EventWaitlistEntry.objects.filter(
+        event_id=entry.event_id, status='waiting', id__lte=entry.id
+    ).count()
+
+
+def cancel_ticket(ticket):
+    """Cancel an active ticket, free its seat and promote the waitlist"""
+    with transaction.atomic():
+        cancelled = EventTicket.objects.filter(pk=ticket.pk, status='active').update(status='cancelled')
+        if cancelled:
+            counters.increment(ticket.event_id, {counters.REGISTERED: -1})
+            event_id = ticket.event_id
+            transaction.on_commit(lambda: promote_waitlist(event_id))
+    if cancelled:
+        ticket.status = 'cancelled'
+    return bool(cancelled)
+
+
+def withdraw(entry):
+    """Leave the waitlist; returns False if the entry was no longer waiting"""
+    return bool(
+        EventWaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(status='withdrawn')
+    )
+
+
+def promote_waitlist(event_id, batch_size=PROMOTION_BATCH_SIZE):
+    """
+    Turn waiting entries into tickets while the event has free seats.
+
+    Each batch locks the oldest waiting entries, claims as many seats as are
+    free in one counter update, and bulk-creates the tickets. Returns the
+    number of entries promoted.
+    """
+    promoted = 0
+    while True:
+        with transaction.atomic():
+            max_attendees, title = Event.objects.values_list('max_attendees', 'opportunity__title').get(pk=event_id)
+            limit = max_attendees or None
+            waiting = list(
+                EventWaitlistEntry.objects.select_for_update()
+                .filter(event_id=event_id, status='waiting')
+                .order_by('id')[:batch_size]
+            )
+            if not waiting:
+                break
+
+            n = counters.reserve_up_to(event_id, limit, len(waiting))
+            if not n:
+                break
+
+            batch = waiting[:n]
+            tickets = [
+                EventTicket(
+                    event_id=event_id,
+                    user_id=entry.user_id,
+                    server_token=secrets.token_urlsafe(48),
+                    idempotency_key=entry.idempotency_key,
+                )
+                for entry in batch
+            ]
+            EventTicket.objects.bulk_create(tickets)
+
+            now = timezone.now()
+            for entry, ticket in zip(batch, tickets):
+                entry.status = 'promoted'
+                entry.promoted_at = now
+                entry.ticket = ticket
+            EventWaitlistEntry.objects.bulk_update(batch, ['status', 'promoted_at', 'ticket'])
+            notify(
+                [entry.user_id for entry in batch],
+                'waitlist_promoted',
+                "You're off the waitlist",
+                f"A spot opened up at {title}. Your ticket is ready.",
+                data={'event_id': event_id},
+                collapse_key=f"event:{event_id}",
+            )
+
+        promoted += n
+        if n < batch_size:
+            break
+
+    if promoted:
+        logger.info(f"Promoted {promoted} waitlist entries for event {event_id}")
+    return promoted
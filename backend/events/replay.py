@@ -0,0 +1,135 @@
+"""
+Replay prevention for QR check-in tokens.
+
+Every validated token id (jti) used to get its own cache key, which at one
+token per attendee per second means hundreds of thousands of short-lived
+keys per event. Instead, token ids are remembered in one Bloom filter per
+expiry window: a token can only be replayed until it expires, so the
+filter for a window is dropped as soon as the window's tokens are dead.
+
+With Redis as the shared cache each filter is a single bitmap string and a
+Lua script checks and sets a token's bits in one atomic step, for any
+number of tokens per round trip. Other cache backends (LocMem in
+development) are per-process anyway, so the guard keeps per-process sets
+there; it also falls back to them if Redis is unreachable.
+
+A Bloom filter can report a token it has never seen. With the defaults
+(128 KB per window) that is under one in a hundred million at 10k scans
+per window; the scanner would show "Token already used" and the
+attendee's next code scans normally.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEY = "qr_replay:{bucket}"
+
+# Check-and-set the bits of each token; returns 1 per token that was already present
+CLAIM_SCRIPT = """
+local k = tonumber(ARGV[2])
+local seen = {}
+for i = 3, #ARGV, k do
+  local present = 1
+  for j = 0, k - 1 do
+    if redis.call('SETBIT', KEYS[1], ARGV[i + j], 1) == 0 then
+      present = 0
+    end
+  end
+  seen[#seen + 1] = present
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return seen
+"""
+
+
+class LocalReplaySets:
+    """Per-process token sets, one per expiry window"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def claim(self, bucket, jtis, expires):
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (_, until) in self._buckets.items() if until <= now]:
+                del self._buckets[key]
+            seen, _ = self._buckets.setdefault(bucket, (set(), expires))
+            fresh = []
+            for jti in jtis:
+                fresh.append(jti not in seen)
+                seen.add(jti)
+            return fresh
+
+
+class ReplayGuard:
+    """
+    Atomic "first use" check for short-lived tokens.
+
+    `bucket_seconds` should match the token lifetime and `grace_seconds`
+    cover how long after `exp` a token is still accepted.
+    """
+
+    def __init__(self, bucket_seconds=30, grace_seconds=5, filter_bits=1 << 20, hashes=7):
+        self.bucket_seconds = bucket_seconds
+        self.grace_seconds = grace_seconds
+        self.filter_bits = filter_bits
+        self.hashes = hashes
+        self._local = LocalReplaySets()
+        self._script = None
+
+    def _positions(self, jti):
+        digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.filter_bits for i in range(self.hashes)]
+
+    def _redis_claim(self, backend, bucket, jtis, ttl):
+        key = backend.make_key(FILTER_KEY.format(bucket=bucket))
+        client = backend._cache.get_client(key, write=True)
+        if self._script is None:
+            self._script = client.register_script(CLAIM_SCRIPT)
+        args = [ttl, self.hashes]
+        for jti in jtis:
+            args.extend(self._positions(jti))
+        return [not present for present in self._script(keys=[key], args=args, client=client)]
+
+    def claim_many(self, tokens):
+        """
+        Record (jti, exp) pairs as used. Returns one bool per token: True the
+        first time a jti is claimed, False for a replay (including repeats
+        within the same call).
+        """
+        by_bucket = {}
+        for index, (jti, exp) in enumerate(tokens):
+            by_bucket.setdefault(int(exp) // self.bucket_seconds, []).append((index, jti))
+
+        backend = caches['default']
+        now = time.time()
+        results = [False] * len(tokens)
+        for bucket, entries in by_bucket.items():
+            jtis = [jti for _, jti in entries]
+            expires = (bucket + 1) * self.bucket_seconds + self.grace_seconds
+            ttl = max(1, int(expires - now) + 1)
+            fresh = None
+            if isinstance(backend, RedisCache):
+                try:
+                    fresh = self._redis_claim(backend, bucket, jtis, ttl)
+                except Exception as e:
+                    logger.warning(f"Replay filter cache unavailable, using local sets: {e}")
+            if fresh is None:
+                fresh = self._local.claim(bucket, jtis, now + ttl)
+            for (index, _), ok in zip(entries, fresh):
+                results[index] = ok
+        return results
+
+    def claim(self, jti, exp):
+        """True if this is the first use of the token"""
+        return self.claim_many([(jti, exp)])[0]
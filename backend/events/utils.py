@@ -3,15 +3,20 @@ Secure token generation and validation utilities for event check-ins.
 Implements defense against the vulnerabilities found in Ticketmaster's system.
 """
 
+import base64
 import hmac
 import hashlib
+import struct
 import time
+import uuid
 import jwt
 import secrets
 from datetime import datetime, timedelta, timezone as dt_timezone
 from typing import Optional, Dict, Tuple
 from django.conf import settings
-from django.core.cache import cache
+
+from api.ratelimit import hit as rate_limit_hit
+from events.replay import ReplayGuard
 
 
 class SecureTokenGenerator:
@@ -30,6 +35,10 @@ class SecureTokenGenerator:
     TOKEN_VALIDITY_SECONDS = 30
     GRACE_PERIOD_SECONDS = 5
     
+    # Set on every ticket QR token, so other JWTs signed with SECRET_KEY
+    # (access tokens) are never mistaken for one
+    TOKEN_TYPE = 'ticket_qr'
+    
     # Rate limiting - increased for mobile app auto-refresh
     MAX_GENERATION_PER_MINUTE = 60  # Allow 1 per second for auto-refresh
     MAX_VALIDATION_PER_MINUTE = 100
@@ -42,18 +51,16 @@ class SecureTokenGenerator:
         Returns a minimal JWT with only non-sensitive claims.
         The actual validation happens server-side using the ticket's server_token.
         """
-        # Rate limiting check
-        rate_key = f"qr_gen:{user_id}"
-        attempts = cache.get(rate_key, 0)
-        if attempts >= cls.MAX_GENERATION_PER_MINUTE:
-            raise ValueError(f"Rate limit exceeded. Generated {attempts} QR codes in last minute. Max allowed: {cls.MAX_GENERATION_PER_MINUTE}. Please wait.")
-        cache.set(rate_key, attempts + 1, 60)
+        # Rate limiting check (atomic sliding window on the shared cache)
+        limit = rate_limit_hit(f"qr_gen:{user_id}", cls.MAX_GENERATION_PER_MINUTE, 60)
+        if not limit.allowed:
+            raise ValueError(f"Rate limit exceeded. Max allowed: {cls.MAX_GENERATION_PER_MINUTE} QR codes per minute. Please wait {limit.retry_after}s.")
         
         # Log for debugging
-        if attempts > cls.MAX_GENERATION_PER_MINUTE * 0.8:  # Warn at 80% of limit
+        if limit.remaining < cls.MAX_GENERATION_PER_MINUTE * 0.2:  # Warn at 80% of limit
             import logging
             logger = logging.getLogger(__name__)
-            logger.warning(f"User {user_id} approaching QR generation rate limit: {attempts + 1}/{cls.MAX_GENERATION_PER_MINUTE}")
+            logger.warning(f"User {user_id} approaching QR generation rate limit: {limit.limit - limit.remaining}/{cls.MAX_GENERATION_PER_MINUTE}")
         
         # Generate expiration time
         now = datetime.now(dt_timezone.utc)
@@ -61,6 +68,7 @@ class SecureTokenGenerator:
         
         # Create minimal JWT payload
         payload = {
+            'typ': cls.TOKEN_TYPE,
             'ticket_id': str(ticket_id),
             'exp': int(expires_at.timestamp()),
             'iat': int(now.timestamp()),
@@ -74,15 +82,23 @@ class SecureTokenGenerator:
             algorithm='HS256'
         )
         
-        # Store token ID for replay prevention
-        cache.set(f"token_used:{payload['jti']}", True, cls.TOKEN_VALIDITY_SECONDS * 2)
-        
         return {
             'token': token,
             'expires_at': expires_at.isoformat(),
             'valid_seconds': cls.TOKEN_VALIDITY_SECONDS,
         }
     
+    @classmethod
+    def is_ticket_payload(cls, payload: Dict[str, any]) -> bool:
+        """Whether a decoded JWT is a ticket QR token naming a ticket"""
+        if payload.get('typ') != cls.TOKEN_TYPE:
+            return False
+        try:
+            uuid.UUID(str(payload.get('ticket_id')))
+        except ValueError:
+            return False
+        return True
+    
     @classmethod
     def validate_qr_token(cls, token: str, scanner_id: int) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -91,11 +107,8 @@ class SecureTokenGenerator:
         Returns: (ticket_id, error_message)
         """
         # Rate limiting for scanner
-        rate_key = f"qr_val:{scanner_id}"
-        attempts = cache.get(rate_key, 0)
-        if attempts >= cls.MAX_VALIDATION_PER_MINUTE:
+        if not rate_limit_hit(f"qr_val:{scanner_id}", cls.MAX_VALIDATION_PER_MINUTE, 60).allowed:
             return None, "Scanner rate limit exceeded"
-        cache.set(rate_key, attempts + 1, 60)
         
         try:
             # Decode and verify JWT
@@ -105,17 +118,18 @@ class SecureTokenGenerator:
                 algorithms=['HS256']
             )
             
+            if not cls.is_ticket_payload(payload):
+                return None, "Invalid token"
+            
             # Check for replay attack
             jti = payload.get('jti')
             if not jti:
                 return None, "Invalid token format"
             
-            if cache.get(f"token_validated:{jti}"):
+            # Check and mark in one atomic step
+            if not qr_replay_guard.claim(jti, payload['exp']):
                 return None, "Token already used"
             
-            # Mark token as used
-            cache.set(f"token_validated:{jti}", True, cls.TOKEN_VALIDITY_SECONDS * 2)
-            
             # Apply grace period for clock skew
             now = datetime.now(dt_timezone.utc)
             exp = datetime.fromtimestamp(payload['exp'], dt_timezone.utc)
@@ -167,6 +181,107 @@ class SecureTokenGenerator:
         return hmac.compare_digest(ticket.server_token, server_token)
 
 
+# Token ids seen by the check-in scanners, one filter per token expiry window
+qr_replay_guard = ReplayGuard(
+    bucket_seconds=SecureTokenGenerator.TOKEN_VALIDITY_SECONDS,
+    grace_seconds=SecureTokenGenerator.GRACE_PERIOD_SECONDS,
+)
+
+
+class RotatingTicketCode:
+    """
+    TOTP-style check-in codes computed on the attendee's device.
+
+    The attendee's app receives a per-ticket secret once and derives a new
+    code every `period` seconds (RFC 6238, HMAC-SHA1), so displaying a
+    rotating QR code needs no server round trip. The secret is itself
+    derived from the ticket's server_token, which never leaves the server;
+    rotating the server_token revokes the secret.
+
+    QR payload: "MT1:<ticket uuid hex>:<code>"
+    """
+
+    PAYLOAD_PREFIX = 'MT1'
+    DIGITS = 8
+    ALGORITHM = 'SHA1'
+    # Accept codes from this many steps either side of now for clock skew
+    SKEW_STEPS = 1
+
+    @classmethod
+    def derive_secret(cls, server_token: str) -> bytes:
+        """160-bit TOTP key for the ticket, the length RFC 4226 recommends"""
+        return hmac.new(
+            server_token.encode(),
+            b'mishmob-ticket-code-v1',
+            hashlib.sha256
+        ).digest()[:20]
+
+    @classmethod
+    def encode_secret(cls, secret: bytes) -> str:
+        return base64.b32encode(secret).decode().rstrip('=')
+
+    @classmethod
+    def code_at(cls, secret: bytes, step: int) -> str:
+        """HOTP value (RFC 4226) for a time step"""
+        digest = hmac.new(secret, struct.pack('>Q', step), hashlib.sha1).digest()
+        offset = digest[-1] & 0x0F
+        binary = struct.unpack('>I', digest[offset:offset + 4])[0] & 0x7FFFFFFF
+        return str(binary % (10 ** cls.DIGITS)).zfill(cls.DIGITS)
+
+    @classmethod
+    def current_step(cls, period: int, now: Optional[float] = None) -> int:
+        return int((now if now is not None else time.time()) // period)
+
+    @classmethod
+    def is_code_payload(cls, scanned: str) -> bool:
+        return scanned.startswith(cls.PAYLOAD_PREFIX + ':')
+
+    @classmethod
+    def parse_payload(cls, scanned: str) -> Tuple[Optional[str], Optional[str]]:
+        """Split a scanned payload into (ticket_id, code)"""
+        parts = scanned.strip().split(':')
+        if len(parts) != 3 or parts[0] != cls.PAYLOAD_PREFIX:
+            return None, None
+        ticket_hex, code = parts[1], parts[2]
+        if len(code) != cls.DIGITS or not code.isdigit():
+            return None, None
+        try:
+            ticket_id = str(uuid.UUID(hex=ticket_hex))
+        except ValueError:
+            return None, None
+        return ticket_id, code
+
+    @classmethod
+    def format_payload(cls, ticket_id, code: str) -> str:
+        return f"{cls.PAYLOAD_PREFIX}:{uuid.UUID(str(ticket_id)).hex}:{code}"
+
+    @classmethod
+    def match_step(cls, server_token: str, code: str, period: int, now: Optional[float] = None) -> Optional[int]:
+        """Return the time step the code belongs to, or None if it matches none in the skew window"""
+        secret = cls.derive_secret(server_token)
+        current = cls.current_step(period, now)
+        for step in range(current - cls.SKEW_STEPS, current + cls.SKEW_STEPS + 1):
+            if hmac.compare_digest(cls.code_at(secret, step), code):
+                return step
+        return None
+
+    @classmethod
+    def provisioning_data(cls, ticket, period: int) -> Dict[str, any]:
+        """What the attendee's app needs to generate codes offline"""
+        secret = cls.encode_secret(cls.derive_secret(ticket.server_token))
+        return {
+            'secret': secret,
+            'algorithm': cls.ALGORITHM,
+            'digits': cls.DIGITS,
+            'period': period,
+            'payload_prefix': f"{cls.PAYLOAD_PREFIX}:{uuid.UUID(str(ticket.id)).hex}:",
+            'otpauth_uri': (
+                f"otpauth://totp/MishMob:{ticket.id}?secret={secret}"
+                f"&algorithm={cls.ALGORITHM}&digits={cls.DIGITS}&period={period}"
+            ),
+        }
+
+
 class CheckInValidator:
     """
     Validates check-in attempts with comprehensive security checks.
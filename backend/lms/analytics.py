@@ -0,0 +1,322 @@
+"""
+Learning analytics rollups.
+
+Dashboards read per-course and per-module daily rows (CourseDailyStats,
+ModuleDailyStats) instead of aggregating Enrollment, ModuleProgress and
+QuizAttempt live. `manage.py rollup_learning_analytics` keeps them current:
+it finds the (course, day) and (module, day) pairs touched by rows whose
+event timestamp (enrolled, completed, attempt submitted) falls after the
+stored watermark, recomputes just those days from the source rows and
+upserts them, then advances the watermark. The watermark trails the clock
+by ROLLUP_LAG so rows committed late by long transactions are still seen.
+
+Changes that remove an event after the fact (a module marked not done
+again) are picked up by `rebuild`, which recomputes a whole date range.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from statistics import median
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from lms.models import (
+    CourseDailyStats, Enrollment, Module, ModuleDailyStats, ModuleProgress, QuizAttempt, RollupWatermark,
+)
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'lms_daily_rollups'
+WATERMARK_START = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ROLLUP_LAG = timedelta(minutes=5)
+
+SCORE_BUCKET_SIZE = 10
+MAX_REPORT_DAYS = 366
+
+COURSE_STAT_FIELDS = ['enrollments', 'completions', 'module_completions', 'quiz_attempts', 'quiz_passes']
+MODULE_STAT_FIELDS = [
+    'completions', 'median_time_spent', 'quiz_attempts', 'quiz_passes', 'average_score',
+    'score_histogram', 'attempt_histogram',
+]
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _touched(queryset, field, since, until, *keys):
+    return queryset.filter(**{f'{field}__gt': since, f'{field}__lte': until}).annotate(
+        day=TruncDate(field)
+    ).order_by().values_list(*keys, 'day').distinct()
+
+
+def dirty_days(since, until):
+    """{day: (course ids, module ids)} with activity in (since, until]"""
+    days = defaultdict(lambda: (set(), set()))
+    for field in ('enrollment_date', 'completion_date'):
+        for course_id, day in _touched(Enrollment.objects, field, since, until, 'course_id'):
+            days[day][0].add(course_id)
+    for module_id, course_id, day in _touched(
+        ModuleProgress.objects, 'completed_at', since, until, 'module_id', 'module__course_id'
+    ):
+        days[day][0].add(course_id)
+        days[day][1].add(module_id)
+    for module_id, course_id, day in _touched(
+        QuizAttempt.objects, 'completed_at', since, until, 'quiz__module_id', 'quiz__module__course_id'
+    ):
+        days[day][0].add(course_id)
+        days[day][1].add(module_id)
+    return days
+
+
+def _counts(queryset, key):
+    return dict(queryset.order_by().values(key).annotate(n=Count('id')).values_list(key, 'n'))
+
+
+def _bucket(score):
+    if score is None:
+        return None
+    low = min(int(score) // SCORE_BUCKET_SIZE * SCORE_BUCKET_SIZE, 100 - SCORE_BUCKET_SIZE)
+    return f"{low}-{low + SCORE_BUCKET_SIZE}"
+
+
+def rebuild_day(day, course_ids, module_ids):
+    """Recompute and upsert one day's rows for the given courses and modules"""
+    start, end = _day_bounds(day)
+    course_ids, module_ids = set(course_ids), set(module_ids)
+
+    # Course level
+    enrollments = Enrollment.objects.filter(course_id__in=course_ids)
+    module_progress = ModuleProgress.objects.filter(
+        completed=True, completed_at__gte=start, completed_at__lt=end
+    )
+    attempts = QuizAttempt.objects.filter(completed_at__gte=start, completed_at__lt=end)
+
+    enrolled = _counts(enrollments.filter(enrollment_date__gte=start, enrollment_date__lt=end), 'course_id')
+    completed = _counts(enrollments.filter(completion_date__gte=start, completion_date__lt=end), 'course_id')
+    module_completions = _counts(module_progress.filter(module__course_id__in=course_ids), 'module__course_id')
+    quiz_counts = {
+        course_id: (n, passes)
+        for course_id, n, passes in attempts.filter(quiz__module__course_id__in=course_ids).order_by()
+        .values('quiz__module__course_id')
+        .annotate(n=Count('id'), passes=Count('id', filter=Q(passed=True)))
+        .values_list('quiz__module__course_id', 'n', 'passes')
+    }
+    CourseDailyStats.objects.bulk_create(
+        [
+            CourseDailyStats(
+                course_id=course_id,
+                date=day,
+                enrollments=enrolled.get(course_id, 0),
+                completions=completed.get(course_id, 0),
+                module_completions=module_completions.get(course_id, 0),
+                quiz_attempts=quiz_counts.get(course_id, (0, 0))[0],
+                quiz_passes=quiz_counts.get(course_id, (0, 0))[1],
+            )
+            for course_id in course_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['course', 'date'],
+        update_fields=COURSE_STAT_FIELDS + ['updated_at'],
+    )
+
+    if not module_ids:
+        return
+
+    # Module level
+    times = defaultdict(list)
+    for module_id, time_spent in module_progress.filter(module_id__in=module_ids).values_list(
+        'module_id', 'time_spent'
+    ):
+        times[module_id].append(time_spent)
+
+    # Which try each attempt was for its learner (1st, 2nd, ...)
+    attempt_number = Subquery(
+        QuizAttempt.objects.filter(
+            enrollment_id=OuterRef('enrollment_id'),
+            quiz_id=OuterRef('quiz_id'),
+            started_at__lte=OuterRef('started_at'),
+        ).order_by().values('enrollment_id').annotate(n=Count('id')).values('n')
+    )
+    quizzes = defaultdict(list)
+    for module_id, score, passed, number in attempts.filter(quiz__module_id__in=module_ids).annotate(
+        number=attempt_number
+    ).values_list('quiz__module_id', 'score', 'passed', 'number'):
+        quizzes[module_id].append((score, passed, number))
+
+    rows = []
+    for module_id, course_id in Module.objects.filter(id__in=module_ids).values_list('id', 'course_id'):
+        spent = times.get(module_id, [])
+        tries = quizzes.get(module_id, [])
+        scores = [score for score, _, _ in tries if score is not None]
+        score_histogram = defaultdict(int)
+        attempt_histogram = defaultdict(int)
+        for score, _, number in tries:
+            if score is not None:
+                score_histogram[_bucket(score)] += 1
+            attempt_histogram[str(number)] += 1
+        rows.append(ModuleDailyStats(
+            module_id=module_id,
+            course_id=course_id,
+            date=day,
+            completions=len(spent),
+            median_time_spent=int(median(spent)) if spent else None,
+            quiz_attempts=len(tries),
+            quiz_passes=sum(1 for _, passed, _ in tries if passed),
+            average_score=(sum(scores) / len(scores)).quantize(Decimal('0.01')) if scores else None,
+            score_histogram=dict(score_histogram),
+            attempt_histogram=dict(attempt_histogram),
+        ))
+    ModuleDailyStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['module', 'date'],
+        update_fields=MODULE_STAT_FIELDS + ['updated_at'],
+    )
+
+
+def _rebuild_days(days):
+    for day in sorted(days):
+        course_ids, module_ids = days[day]
+        rebuild_day(day, course_ids, module_ids)
+    return {
+        'days': len(days),
+        'courses': sum(len(course_ids) for course_ids, _ in days.values()),
+        'modules': sum(len(module_ids) for _, module_ids in days.values()),
+    }
+
+
+def run(until=None):
+    """Roll up activity since the watermark; returns counts of what was rebuilt"""
+    until = until or timezone.now() - ROLLUP_LAG
+    with transaction.atomic():
+        # Locking the watermark keeps concurrent runs from interleaving
+        RollupWatermark.objects.get_or_create(name=WATERMARK_NAME, defaults={'position': WATERMARK_START})
+        watermark = RollupWatermark.objects.select_for_update().get(name=WATERMARK_NAME)
+        if until <= watermark.position:
+            return {'days': 0, 'courses': 0, 'modules': 0}
+
+        stats = _rebuild_days(dirty_days(watermark.position, until))
+        watermark.position = until
+        watermark.save(update_fields=['position', 'updated_at'])
+
+    logger.info(f"Learning analytics rolled up to {until}: {stats}")
+    return stats
+
+
+def rebuild(start_date, end_date, courses=None):
+    """
+    Recompute every day in [start_date, end_date], including rows whose
+    activity has since disappeared. `courses` narrows the rebuild.
+    """
+    since, _ = _day_bounds(start_date)
+    _, until = _day_bounds(end_date)
+    days = dirty_days(since - timedelta(microseconds=1), until - timedelta(microseconds=1))
+
+    existing_courses = CourseDailyStats.objects.filter(date__gte=start_date, date__lte=end_date)
+    existing_modules = ModuleDailyStats.objects.filter(date__gte=start_date, date__lte=end_date)
+    for course_id, day in existing_courses.values_list('course_id', 'date'):
+        days[day][0].add(course_id)
+    for module_id, course_id, day in existing_modules.values_list('module_id', 'course_id', 'date'):
+        days[day][0].add(course_id)
+        days[day][1].add(module_id)
+
+    if courses is not None:
+        course_ids = set(courses.values_list('id', flat=True))
+        module_ids = set(Module.objects.filter(course_id__in=course_ids).values_list('id', flat=True))
+        days = {day: (c & course_ids, m & module_ids) for day, (c, m) in days.items() if c & course_ids}
+
+    with transaction.atomic():
+        return _rebuild_days(days)
+
+
+# Reporting
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def _weighted_median(pairs):
+    """Median of values weighted by counts, from [(value, weight)]"""
+    pairs = sorted((value, weight) for value, weight in pairs if value is not None and weight)
+    total = sum(weight for _, weight in pairs)
+    seen = 0
+    for value, weight in pairs:
+        seen += weight
+        if seen * 2 >= total:
+            return value
+    return None
+
+
+def _sorted_histogram(histogram):
+    """Histogram keys ('40-50', '2') in numeric order"""
+    return dict(sorted(histogram.items(), key=lambda item: int(item[0].split('-')[0])))
+
+
+def course_report(course, start_date, end_date):
+    """Dashboard payload for a course over [start_date, end_date], from the rollup tables"""
+    daily = list(
+        CourseDailyStats.objects.filter(course=course, date__gte=start_date, date__lte=end_date)
+        .values('date', *COURSE_STAT_FIELDS)
+    )
+    totals = {field: sum(row[field] for row in daily) for field in COURSE_STAT_FIELDS}
+
+    by_module = defaultdict(list)
+    for row in ModuleDailyStats.objects.filter(
+        course=course, date__gte=start_date, date__lte=end_date
+    ).values('module_id', *MODULE_STAT_FIELDS):
+        by_module[row['module_id']].append(row)
+
+    modules = []
+    for module_id, title in Module.objects.filter(course=course).order_by('display_order').values_list(
+        'id', 'title'
+    ):
+        rows = by_module.get(module_id, [])
+        attempts = sum(row['quiz_attempts'] for row in rows)
+        passes = sum(row['quiz_passes'] for row in rows)
+        score_histogram = defaultdict(int)
+        attempt_histogram = defaultdict(int)
+        for row in rows:
+            for bucket, n in row['score_histogram'].items():
+                score_histogram[bucket] += n
+            for number, n in row['attempt_histogram'].items():
+                attempt_histogram[number] += n
+        scored = [(row['average_score'], row['quiz_attempts']) for row in rows if row['average_score'] is not None]
+        scored_attempts = sum(n for _, n in scored)
+        modules.append({
+            'module_id': module_id,
+            'title': title,
+            'completions': sum(row['completions'] for row in rows),
+            'median_time_spent': _weighted_median(
+                (row['median_time_spent'], row['completions']) for row in rows
+            ),
+            'quiz_attempts': attempts,
+            'quiz_passes': passes,
+            'quiz_pass_rate': _rate(passes, attempts),
+            'average_score': (
+                float(sum(score * n for score, n in scored) / scored_attempts) if scored_attempts else None
+            ),
+            'score_histogram': _sorted_histogram(score_histogram),
+            'attempt_histogram': _sorted_histogram(attempt_histogram),
+        })
+
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list('position', flat=True).first()
+    return {
+        'course_id': str(course.id),
+        'start': start_date,
+        'end': end_date,
+        'as_of': watermark,
+        'totals': {
+            **totals,
+            'completion_rate': _rate(totals['completions'], totals['enrollments']),
+            'quiz_pass_rate': _rate(totals['quiz_passes'], totals['quiz_attempts']),
+        },
+        'daily': daily,
+        'modules': modules,
+    }
@@ -0,0 +1,89 @@
+"""
+Course catalog snapshot.
+
+The published catalog, with each course's module and enrollment counts, is
+built with one query and cached until a course, module or enrollment
+changes (see lms.signals) or CATALOG_CACHE_SECONDS pass. Listing filters
+the snapshot in memory and overlays the caller's enrollments from a single
+query, so a catalog page costs one query warm and two cold.
+"""
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from lms.models import Course, Enrollment
+
+CATALOG_CACHE_KEY = "lms_catalog"
+CATALOG_CACHE_SECONDS = 5 * 60
+
+
+def build_snapshot():
+    courses = Course.objects.filter(is_active=True, is_published=True).annotate(
+        enrolled_count=Count('enrollments')
+    ).order_by('title', 'id')
+
+    return [
+        {
+            'id': str(course.id),
+            'title': course.title,
+            'slug': course.slug,
+            'description': course.description,
+            'audience_type': course.audience_type,
+            'difficulty_level': course.difficulty_level,
+            'estimated_duration': course.estimated_duration,
+            'category': course.category,
+            'tags': course.tags,
+            'thumbnail_url': course.thumbnail.url if course.thumbnail else None,
+            'is_published': course.is_published,
+            'modules_count': course.modules_count,
+            'enrolled_count': course.enrolled_count,
+        }
+        for course in courses
+    ]
+
+
+def snapshot():
+    courses = cache.get(CATALOG_CACHE_KEY)
+    if courses is None:
+        courses = build_snapshot()
+        cache.set(CATALOG_CACHE_KEY, courses, CATALOG_CACHE_SECONDS)
+    return courses
+
+
+def invalidate():
+    cache.delete(CATALOG_CACHE_KEY)
+
+
+def _matches(course, audience_type, category, difficulty, search):
+    if audience_type and course['audience_type'] not in (audience_type, 'both'):
+        return False
+    if category and category.lower() not in (course['category'] or '').lower():
+        return False
+    if difficulty and course['difficulty_level'] != difficulty:
+        return False
+    if search:
+        term = search.lower()
+        return any(term in (course[field] or '').lower() for field in ('title', 'description', 'tags'))
+    return True
+
+
+def list_catalog(user=None, audience_type=None, category=None, difficulty=None, search=None):
+    """Filtered catalog entries, with `is_enrolled` / `progress_percentage` for `user`"""
+    enrollments = {}
+    if user is not None:
+        enrollments = {
+            str(course_id): progress
+            for course_id, progress in Enrollment.objects.filter(user=user).values_list(
+                'course_id', 'progress_percentage'
+            )
+        }
+
+    return [
+        {
+            **course,
+            'is_enrolled': course['id'] in enrollments,
+            'progress_percentage': enrollments.get(course['id']),
+        }
+        for course in snapshot()
+        if _matches(course, audience_type, category, difficulty, search)
+    ]
@@ -0,0 +1,253 @@
+"""
+Course certificates: issuance, rendering and verification.
+
+Issuing a certificate only writes its row; the PDF and PNG are drawn later
+by `manage.py render_certificates` (run with --loop as a worker), which
+leases pending rows, renders them with Pillow from the course's
+`certificate_template` and saves each artifact under the SHA-256 of its
+bytes, so a re-render of an unchanged certificate writes nothing new.
+
+Every certificate carries a signed token holding its public details.
+Verifying a token needs only SECRET_KEY, not the database, so the public
+verification endpoint is a pure function of its URL and can be cached by
+browsers and CDNs indefinitely.
+"""
+
+import hashlib
+import io
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+
+from events.qr import build_matrix
+from lms.models import Certificate, Enrollment
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = "lms.certificate"
+
+CERTIFICATE_CACHE_KEY = "certificate:{certificate_id}"
+CERTIFICATE_CACHE_SECONDS = 60 * 60
+
+RENDER_BATCH_SIZE = 20
+LEASE_SECONDS = 5 * 60
+MAX_RENDER_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 60
+
+# A4 landscape at 150 dpi
+PAGE_SIZE = (1754, 1240)
+PAGE_DPI = 150
+
+TEMPLATES = {
+    'default': {
+        'heading': "Certificate of Completion",
+        'background': '#fffdf7',
+        'accent': '#1f4e79',
+        'text': '#222222',
+    },
+    'formal': {
+        'heading': "Certificate of Achievement",
+        'background': '#ffffff',
+        'accent': '#7a5c1e',
+        'text': '#1a1a1a',
+    },
+}
+
+
+# Verification
+
+def make_token(certificate):
+    """Signed token with the certificate's public details (deterministic)"""
+    payload = {
+        'c': certificate.certificate_id.hex,
+        'n': certificate.user_name,
+        'k': certificate.course_title,
+        'd': certificate.completion_date.isoformat(),
+        's': str(certificate.final_score) if certificate.final_score is not None else None,
+    }
+    return signing.Signer(salt=TOKEN_SALT).sign_object(payload, compress=True)
+
+
+def load_token(token):
+    """Verify a certificate token without touching the database; None if forged"""
+    try:
+        payload = signing.Signer(salt=TOKEN_SALT).unsign_object(token)
+    except (signing.BadSignature, ValueError):
+        return None
+    return {
+        'certificate_id': str(uuid.UUID(payload['c'])),
+        'user_name': payload['n'],
+        'course_title': payload['k'],
+        'completion_date': payload['d'],
+        'final_score': float(payload['s']) if payload['s'] is not None else None,
+    }
+
+
+def verification_url(certificate):
+    return f"{settings.CERTIFICATE_VERIFY_URL.rstrip('/')}/{make_token(certificate)}"
+
+
+def issue_certificate(enrollment, user_name, final_score=None):
+    """Create the certificate row for a completed enrollment; rendering is deferred"""
+    certificate = Certificate(
+        enrollment=enrollment,
+        user_name=user_name,
+        course_title=enrollment.course.title,
+        completion_date=timezone.localdate(),
+        final_score=final_score,
+    )
+    certificate.verification_url = verification_url(certificate)
+    certificate.save()
+    Enrollment.objects.filter(pk=enrollment.pk).update(certificate_issued=True)
+    enrollment.certificate_issued = True
+    return certificate
+
+
+def invalidate(certificate):
+    cache.delete(CERTIFICATE_CACHE_KEY.format(certificate_id=certificate.certificate_id))
+
+
+# Rendering
+
+def _font(size):
+    return ImageFont.load_default(size=size)
+
+
+def _centered(draw, y, text, size, fill):
+    font = _font(size)
+    width = draw.textlength(text, font=font)
+    draw.text(((PAGE_SIZE[0] - width) / 2, y), text, font=font, fill=fill)
+
+
+def render_image(certificate, template_name='default'):
+    """Draw a certificate page as an RGB image"""
+    template = TEMPLATES.get(template_name)
+    if template is None:
+        logger.warning(f"Unknown certificate template {template_name!r}; using default")
+        template = TEMPLATES['default']
+
+    image = Image.new('RGB', PAGE_SIZE, template['background'])
+    draw = ImageDraw.Draw(image)
+    width, height = PAGE_SIZE
+    draw.rectangle([40, 40, width - 40, height - 40], outline=template['accent'], width=12)
+    draw.rectangle([70, 70, width - 70, height - 70], outline=template['accent'], width=3)
+
+    _centered(draw, 180, template['heading'], 84, template['accent'])
+    _centered(draw, 340, "This certifies that", 40, template['text'])
+    _centered(draw, 420, certificate.user_name, 96, template['text'])
+    _centered(draw, 580, "has successfully completed", 40, template['text'])
+    _centered(draw, 660, certificate.course_title, 64, template['accent'])
+    details = f"Completed {certificate.completion_date:%B %d, %Y}"
+    if certificate.final_score is not None:
+        details += f"  ·  Final score {certificate.final_score:.0f}%"
+    _centered(draw, 800, details, 36, template['text'])
+
+    # Verification QR code and certificate id, bottom right
+    matrix = build_matrix(certificate.verification_url or verification_url(certificate), border=2)
+    box = max(2, 220 // len(matrix))
+    left, top = width - 140 - len(matrix) * box, height - 140 - len(matrix) * box
+    for y, row in enumerate(matrix):
+        for x, dark in enumerate(row):
+            if dark:
+                draw.rectangle(
+                    [left + x * box, top + y * box, left + (x + 1) * box - 1, top + (y + 1) * box - 1],
+                    fill='#000000',
+                )
+    draw.text((140, height - 170), f"Certificate ID {certificate.certificate_id}", font=_font(26),
+              fill=template['text'])
+    return image
+
+
+def render_artifacts(certificate, template_name='default'):
+    """Rendered {'pdf': bytes, 'png': bytes} for a certificate"""
+    image = render_image(certificate, template_name)
+
+    png = io.BytesIO()
+    image.save(png, 'PNG', optimize=True)
+
+    # Fixed document dates keep the PDF bytes (and so its address) stable
+    pdf = io.BytesIO()
+    issued = (certificate.issued_date or timezone.now()).utctimetuple()
+    image.save(pdf, 'PDF', resolution=PAGE_DPI, title=f"{certificate.course_title} - {certificate.user_name}",
+               creationDate=issued, modDate=issued)
+    return {'pdf': pdf.getvalue(), 'png': png.getvalue()}
+
+
+def artifact_path(data, extension):
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{settings.CERTIFICATE_STORAGE_PATH}/{digest[:2]}/{digest}.{extension}"
+
+
+def store(data, extension, storage=None):
+    """Save bytes at their content address; returns the path"""
+    storage = storage or default_storage
+    path = artifact_path(data, extension)
+    if not storage.exists(path):
+        saved = storage.save(path, ContentFile(data))
+        if saved != path:
+            # Lost a race with an identical write; keep the canonical copy
+            storage.delete(saved)
+    return path
+
+
+def claim(batch_size=RENDER_BATCH_SIZE, now=None):
+    """Lease up to `batch_size` certificates awaiting rendering to this worker"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = Certificate.objects.filter(
+            render_status='pending', render_available_at__lte=now
+        ).order_by('render_available_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True, of=('self',))
+        batch = list(due.select_related('enrollment__course')[:batch_size])
+        Certificate.objects.filter(id__in=[c.id for c in batch]).update(
+            render_available_at=now + timedelta(seconds=LEASE_SECONDS)
+        )
+    return batch
+
+
+def render_pending(batch_size=RENDER_BATCH_SIZE, storage=None):
+    """Render one batch of pending certificates; returns stats"""
+    stats = {'claimed': 0, 'rendered': 0, 'retried': 0, 'failed': 0}
+    batch = claim(batch_size)
+    stats['claimed'] = len(batch)
+
+    for certificate in batch:
+        try:
+            artifacts = render_artifacts(certificate, certificate.enrollment.course.certificate_template)
+            paths = {extension: store(data, extension, storage) for extension, data in artifacts.items()}
+        except Exception as e:
+            attempts = certificate.render_attempts + 1
+            failed = attempts >= MAX_RENDER_ATTEMPTS
+            Certificate.objects.filter(id=certificate.id).update(
+                render_attempts=attempts,
+                render_status='failed' if failed else 'pending',
+                render_available_at=timezone.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** attempts),
+                render_error=str(e)[:1000],
+            )
+            logger.exception(f"Rendering certificate {certificate.certificate_id} failed")
+            stats['failed' if failed else 'retried'] += 1
+            continue
+
+        Certificate.objects.filter(id=certificate.id).update(
+            render_status='rendered',
+            render_attempts=certificate.render_attempts + 1,
+            render_error='',
+            rendered_at=timezone.now(),
+            pdf_path=paths['pdf'],
+            png_path=paths['png'],
+        )
+        invalidate(certificate)
+        stats['rendered'] += 1
+
+    return stats
+
@@ -0,0 +1,311 @@
+"""
+Quiz answer autosave.
+
+While an attempt is open the client sends answer deltas as the learner
+works. Deltas are merged into a per-attempt draft in the shared cache
+(`save_draft`), which also remembers who owns the attempt, its deadline and
+which answers are valid, so a warm autosave costs no database queries at
+all. Drafts reach the database as QuizAnswer rows of the open attempt:
+inline at most every FLUSH_SECONDS per attempt, and in bulk across attempts
+by `manage.py flush_quiz_drafts` (run with --loop as a worker) before the
+short cache TTL can drop them.
+
+Each draft carries a revision that every autosave bumps; the revision last
+written is kept under a separate key, so flushing never rewrites the draft
+itself and cannot clobber a delta that lands mid-flush.
+
+Timed quizzes are enforced here rather than in the client: autosaves after
+the deadline (plus TIME_LIMIT_GRACE_SECONDS for latency) are refused, a late
+submission is graded from the saved drafts alone, and the worker closes
+attempts whose deadline passed without a submission.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from lms.grading import GradingError, submit_attempt
+from lms.models import QuizAnswer, QuizAttempt
+from lms.progress import record_module_progress
+from lms.quizzes import CHOICE_TYPES, load_compiled_quiz
+
+logger = logging.getLogger(__name__)
+
+DRAFT_CACHE_KEY = "quiz_draft:{attempt_id}"
+DRAFT_FLUSHED_CACHE_KEY = "quiz_draft_flushed:{attempt_id}"
+DRAFT_CACHE_SECONDS = 5 * 60
+
+FLUSH_SECONDS = 30
+TIME_LIMIT_GRACE_SECONDS = 30
+
+# Open attempts older than this are not swept for cached drafts
+SWEEP_WINDOW = timedelta(days=1)
+SWEEP_BATCH_SIZE = 500
+
+
+class DraftError(Exception):
+    pass
+
+
+def _keys(attempt_id):
+    return DRAFT_CACHE_KEY.format(attempt_id=attempt_id), DRAFT_FLUSHED_CACHE_KEY.format(attempt_id=attempt_id)
+
+
+def is_expired(attempt, now=None):
+    deadline = attempt.deadline
+    now = now or timezone.now()
+    return deadline is not None and now > deadline + timedelta(seconds=TIME_LIMIT_GRACE_SECONDS)
+
+
+def _new_draft(attempt):
+    answer_key = load_compiled_quiz(attempt.quiz)['answer_key']
+    deadline = attempt.deadline
+    return {
+        'user_id': attempt.enrollment.user_id,
+        'deadline': deadline.timestamp() if deadline else None,
+        # Valid choices per question; None for free-text questions
+        'questions': {
+            question_id: entry['choices'] if entry['type'] in CHOICE_TYPES else None
+            for question_id, entry in answer_key.items()
+        },
+        'created_at': timezone.now().timestamp(),
+        'revision': 0,
+        'answers': {},
+    }
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise DraftError(f"Invalid id {value!r}")
+
+
+def _apply_deltas(draft, deltas):
+    """Merge deltas into the draft's answers; None records a cleared answer"""
+    for delta in deltas:
+        question_id = _as_id(delta.get('question_id'))
+        if question_id not in draft['questions']:
+            raise DraftError(f"Question {question_id} is not part of this quiz")
+        choices = draft['questions'][question_id]
+        answer_id = delta.get('answer_id')
+        text_answer = delta.get('text_answer') or ''
+
+        if choices is not None:
+            if answer_id is None:
+                draft['answers'][question_id] = None
+                continue
+            answer_id = _as_id(answer_id)
+            if answer_id not in choices:
+                raise DraftError(f"Answer {answer_id} is not a choice for question {question_id}")
+            draft['answers'][question_id] = {'answer_id': answer_id, 'text_answer': ''}
+        else:
+            draft['answers'][question_id] = {'answer_id': None, 'text_answer': text_answer} if text_answer else None
+
+
+def save_draft(attempt_id, user, deltas):
+    """
+    Merge answer deltas ([{'question_id', 'answer_id', 'text_answer'}]) into
+    an open attempt's draft. Returns {'revision', 'deadline', 'flushed'}.
+    Raises QuizAttempt.DoesNotExist for attempts that aren't the user's open
+    ones, and DraftError for invalid answers or an expired time limit.
+    """
+    draft_key, flushed_key = _keys(attempt_id)
+    cached = cache.get_many([draft_key, flushed_key])
+    draft, flushed = cached.get(draft_key), cached.get(flushed_key)
+
+    if draft is None or draft['user_id'] != user.id:
+        attempt = QuizAttempt.objects.select_related('quiz', 'enrollment').get(
+            id=attempt_id, enrollment__user=user, completed_at__isnull=True
+        )
+        draft = _new_draft(attempt)
+
+    now = timezone.now()
+    if draft['deadline'] is not None and now.timestamp() > draft['deadline'] + TIME_LIMIT_GRACE_SECONDS:
+        raise DraftError("The time limit for this attempt has expired")
+
+    _apply_deltas(draft, deltas)
+    draft['revision'] += 1
+    cache.set(draft_key, draft, DRAFT_CACHE_SECONDS)
+
+    last_flush = flushed['at'] if flushed else draft['created_at']
+    flushed_now = now.timestamp() - last_flush >= FLUSH_SECONDS
+    if flushed_now:
+        flush_drafts({attempt_id: draft})
+
+    deadline = datetime.fromtimestamp(draft['deadline'], tz=dt_timezone.utc) if draft['deadline'] else None
+    return {'revision': draft['revision'], 'deadline': deadline, 'flushed': flushed_now}
+
+
+def flush_drafts(drafts):
+    """
+    Write cached drafts ({attempt_id: draft}) to QuizAnswer rows in bulk.
+    Attempts closed in the meantime are skipped. Returns the attempts written.
+    """
+    if not drafts:
+        return 0
+
+    with transaction.atomic():
+        # Locking the open attempts orders this against a concurrent submit
+        open_ids = set(
+            QuizAttempt.objects.select_for_update().filter(
+                id__in=list(drafts), completed_at__isnull=True
+            ).values_list('id', flat=True)
+        )
+        rows = []
+        cleared = Q()
+        for attempt_id in open_ids:
+            answers = drafts[attempt_id]['answers']
+            removed = [question_id for question_id, answer in answers.items() if answer is None]
+            if removed:
+                cleared |= Q(attempt_id=attempt_id, question_id__in=removed)
+            rows.extend(
+                QuizAnswer(
+                    attempt_id=attempt_id,
+                    question_id=question_id,
+                    selected_answer_id=answer['answer_id'],
+                    text_answer=answer['text_answer'],
+                )
+                for question_id, answer in answers.items()
+                if answer is not None
+            )
+        if cleared:
+            QuizAnswer.objects.filter(cleared).delete()
+        QuizAnswer.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['selected_answer', 'text_answer'],
+        )
+
+    now = timezone.now().timestamp()
+    cache.set_many(
+        {
+            _keys(attempt_id)[1]: {'revision': drafts[attempt_id]['revision'], 'at': now}
+            for attempt_id in open_ids
+        },
+        DRAFT_CACHE_SECONDS,
+    )
+    return len(open_ids)
+
+
+def load_drafts(attempt):
+    """The attempt's saved answers: {question_id: {'answer_id', 'text_answer'}}"""
+    answers = {
+        question_id: {'answer_id': answer_id, 'text_answer': text_answer}
+        for question_id, answer_id, text_answer in QuizAnswer.objects.filter(attempt=attempt).values_list(
+            'question_id', 'selected_answer_id', 'text_answer'
+        )
+    }
+    draft = cache.get(DRAFT_CACHE_KEY.format(attempt_id=attempt.id))
+    if draft is not None:
+        for question_id, answer in draft['answers'].items():
+            if answer is None:
+                answers.pop(question_id, None)
+            else:
+                answers[question_id] = answer
+    return answers
+
+
+def discard(attempt_id):
+    cache.delete_many(list(_keys(attempt_id)))
+
+
+def merge_submission(attempt, submitted, now=None):
+    """
+    Answers to grade for a submission: the saved drafts with the submitted
+    answers on top, or the drafts alone once the time limit has expired.
+    Returns (answers, expired).
+    """
+    expired = is_expired(attempt, now)
+    answer_key = load_compiled_quiz(attempt.quiz)['answer_key']
+
+    merged = {}
+    for question_id, answer in load_drafts(attempt).items():
+        entry = answer_key.get(question_id)
+        # Skip drafts left invalid by an edit to the quiz mid-attempt
+        if entry is None or (entry['type'] in CHOICE_TYPES and answer['answer_id'] not in entry['choices']):
+            continue
+        merged[question_id] = {'question_id': question_id, **answer}
+
+    if not expired:
+        for answer in submitted:
+            try:
+                question_id = int(answer.get('question_id'))
+            except (TypeError, ValueError):
+                question_id = answer.get('question_id')
+            merged[question_id] = answer
+
+    return list(merged.values()), expired
+
+
+def close_attempt(attempt, submitted=()):
+    """
+    Grade an attempt from its drafts and `submitted` answers and record the
+    result on the learner's progress. Returns whether the time limit had
+    expired; raises GradingError if it was already submitted.
+    """
+    answers, expired = merge_submission(attempt, submitted)
+    with transaction.atomic():
+        submit_attempt(attempt, answers)
+        # Record the score; a pass completes the module
+        record_module_progress(
+            attempt.enrollment,
+            attempt.quiz.module,
+            completed=True if attempt.passed else None,
+            quiz_score=attempt.score,
+        )
+    discard(attempt.id)
+    return expired
+
+
+# Worker
+
+def flush_pending(batch_size=SWEEP_BATCH_SIZE):
+    """Flush every cached draft with unwritten revisions; returns attempts written"""
+    since = timezone.now() - SWEEP_WINDOW
+    open_ids = QuizAttempt.objects.filter(
+        completed_at__isnull=True, started_at__gte=since
+    ).order_by('id').values_list('id', flat=True)
+
+    written = 0
+    last_id = 0
+    while True:
+        batch = list(open_ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1]
+        cached = cache.get_many([key for attempt_id in batch for key in _keys(attempt_id)])
+        dirty = {}
+        for attempt_id in batch:
+            draft_key, flushed_key = _keys(attempt_id)
+            draft, flushed = cached.get(draft_key), cached.get(flushed_key)
+            if draft is not None and (flushed is None or flushed['revision'] < draft['revision']):
+                dirty[attempt_id] = draft
+        written += flush_drafts(dirty)
+    return written
+
+
+def close_expired(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """Grade open timed attempts whose deadline has passed; returns attempts closed"""
+    now = now or timezone.now()
+    attempts = QuizAttempt.objects.filter(
+        completed_at__isnull=True, quiz__time_limit_minutes__gt=0
+    ).select_related('quiz__module', 'enrollment').order_by('started_at')
+
+    closed = 0
+    for attempt in attempts[:batch_size]:
+        if not is_expired(attempt, now):
+            continue
+        try:
+            close_attempt(attempt)
+        except GradingError:
+            # Submitted by the learner while we were looking
+            continue
+        logger.info(f"Closed quiz attempt {attempt.id} after its time limit expired")
+        closed += 1
+    return closed
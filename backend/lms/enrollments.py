@@ -0,0 +1,106 @@
+"""
+Bulk course enrollment.
+
+Enrolls a whole set of users, described by a User queryset, in a course:
+users already enrolled are excluded in SQL and the remaining ids are
+inserted in batches with `bulk_create(ignore_conflicts=True)`, so a
+cohort of any size costs a handful of queries per course rather than an
+existence check and insert per user.
+
+Required courses (`Course.is_required`) are assigned by audience: every
+active user whose user_type matches the course's audience_type is
+enrolled. `manage.py assign_required_courses` runs this as a periodic job
+so new users pick up their required courses.
+"""
+
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from lms import catalog
+from lms.models import Course, Enrollment
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 1000
+
+AUDIENCE_USER_TYPES = {
+    'volunteer': ['volunteer'],
+    'host': ['host'],
+    'both': ['volunteer', 'host'],
+}
+
+
+def select_users(user_ids=None, emails=None, user_type=None, opportunity_id=None):
+    """
+    Active users matching a rule. Criteria combine with AND; ids and emails
+    are alternatives to each other (either list may match).
+    """
+    users = User.objects.filter(is_active=True)
+    named = Q()
+    if user_ids:
+        named |= Q(id__in=user_ids)
+    if emails:
+        named |= Q(email__in=emails)
+    if named:
+        users = users.filter(named)
+    if user_type:
+        users = users.filter(user_type=user_type)
+    if opportunity_id:
+        users = users.filter(
+            participations__opportunity_id=opportunity_id,
+            participations__status__in=['active', 'completed'],
+        )
+    return users.distinct()
+
+
+def enroll_users(course, users):
+    """
+    Enroll every user in the `users` queryset in `course`.
+    Returns {'course_id', 'title', 'matched', 'enrolled', 'already_enrolled'}.
+    """
+    matched = users.count()
+    enrolled_users = users.filter(enrollments__course=course)
+    already_enrolled = enrolled_users.count()
+    pending = list(users.exclude(enrollments__course=course).order_by().values_list('id', flat=True))
+
+    # bulk_create skips Enrollment.save, so seed the module total here
+    Enrollment.objects.bulk_create(
+        [Enrollment(user_id=user_id, course=course, modules_total=course.modules_count) for user_id in pending],
+        batch_size=INSERT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+    # ignore_conflicts hides which rows lost a race, so count what landed
+    enrolled = enrolled_users.count() - already_enrolled if pending else 0
+    if enrolled:
+        catalog.invalidate()
+        logger.info(f"Bulk enrolled {enrolled} users in course {course.id}")
+
+    return {
+        'course_id': str(course.id),
+        'title': course.title,
+        'matched': matched,
+        'enrolled': enrolled,
+        'already_enrolled': matched - enrolled,
+    }
+
+
+def assign_required_courses(courses=None, users=None):
+    """
+    Enroll users in the required courses meant for their user type.
+    `courses` / `users` narrow the run; returns one report per course.
+    """
+    if courses is None:
+        courses = Course.objects.all()
+    courses = courses.filter(is_required=True, is_active=True, is_published=True)
+    if users is None:
+        users = User.objects.filter(is_active=True)
+
+    return [
+        enroll_users(course, users.filter(user_type__in=AUDIENCE_USER_TYPES[course.audience_type]))
+        for course in courses
+    ]
@@ -0,0 +1,95 @@
+"""
+Quiz grading.
+
+Submissions are graded in memory against the answer key of the compiled
+quiz (see lms.quizzes), so grading needs no per-question reads, and every
+answer is written with one bulk_create.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from lms.models import QuizAnswer, QuizAttempt
+from lms.quizzes import CHOICE_TYPES, normalize_text, load_compiled_quiz
+
+
+class GradingError(Exception):
+    pass
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def grade(answer_key, submitted):
+    """
+    Grade submitted answers ([{'question_id', 'answer_id', 'text_answer'}])
+    against an answer key. Returns (results, earned points, total points);
+    unanswered questions score zero. Raises GradingError for answers that
+    don't belong to the quiz.
+    """
+    results = {}
+    for answer in submitted:
+        question_id = _as_id(answer.get('question_id'))
+        entry = answer_key.get(question_id)
+        if entry is None:
+            raise GradingError(f"Question {question_id} is not part of this quiz")
+        if question_id in results:
+            raise GradingError(f"Question {question_id} was answered more than once")
+
+        result = {'selected_answer_id': None, 'text_answer': '', 'is_correct': False}
+        if entry['type'] in CHOICE_TYPES:
+            answer_id = _as_id(answer.get('answer_id'))
+            if answer_id not in entry['choices']:
+                raise GradingError(f"Answer {answer_id} is not a choice for question {question_id}")
+            result['selected_answer_id'] = answer_id
+            result['is_correct'] = answer_id in entry['correct']
+        else:
+            result['text_answer'] = answer.get('text_answer') or ''
+            if entry['type'] == 'short_answer':
+                result['is_correct'] = normalize_text(result['text_answer']) in entry['accepted']
+
+        result['points_earned'] = entry['points'] if result['is_correct'] else 0
+        results[question_id] = result
+
+    total = sum(entry['points'] for entry in answer_key.values())
+    earned = sum(result['points_earned'] for result in results.values())
+    return results, earned, total
+
+
+def submit_attempt(attempt, submitted):
+    """
+    Grade and record a quiz attempt. The attempt is closed with a
+    conditional UPDATE, so a concurrent duplicate submission fails with
+    GradingError instead of writing answers twice.
+    """
+    results, earned, total = grade(load_compiled_quiz(attempt.quiz)['answer_key'], submitted)
+    attempt.set_score(earned, total, timezone.now())
+
+    with transaction.atomic():
+        closed = QuizAttempt.objects.filter(id=attempt.id, completed_at__isnull=True).update(
+            score=attempt.score,
+            passed=attempt.passed,
+            completed_at=attempt.completed_at,
+        )
+        if not closed:
+            raise GradingError("This attempt has already been submitted")
+
+        # Graded answers replace the attempt's autosaved drafts (see lms.drafts)
+        QuizAnswer.objects.filter(attempt_id=attempt.id).delete()
+        QuizAnswer.objects.bulk_create([
+            QuizAnswer(
+                attempt_id=attempt.id,
+                question_id=question_id,
+                selected_answer_id=result['selected_answer_id'],
+                text_answer=result['text_answer'],
+                is_correct=result['is_correct'],
+                points_earned=result['points_earned'],
+            )
+            for question_id, result in results.items()
+        ])
+
+    return results
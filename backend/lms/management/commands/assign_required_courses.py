@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from lms.enrollments import assign_required_courses
+from lms.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Enroll users in the required courses for their user type (run periodically)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            action='append',
+            help='Only assign this course id (may be repeated); defaults to all required courses'
+        )
+    
+    def handle(self, *args, **options):
+        courses = None
+        if options['course']:
+            courses = Course.objects.filter(id__in=options['course'])
+        
+        reports = assign_required_courses(courses=courses)
+        
+        for report in reports:
+            self.stdout.write(
+                f"{report['title']}: {report['enrolled']} enrolled, "
+                f"{report['already_enrolled']} already enrolled"
+            )
+        total = sum(report['enrolled'] for report in reports)
+        self.stdout.write(self.style.SUCCESS(f'Enrolled {total} users in {len(reports)} required courses'))
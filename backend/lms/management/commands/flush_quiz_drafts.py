@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms import drafts
+
+
+class Command(BaseCommand):
+    help = 'Write autosaved quiz answers to the database and close timed-out attempts (run with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, sweeping every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help=f'Seconds between sweeps; keep below the draft TTL of {drafts.DRAFT_CACHE_SECONDS}s (default: 60)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=drafts.SWEEP_BATCH_SIZE,
+            help=f'Attempts checked per query (default: {drafts.SWEEP_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                flushed = drafts.flush_pending(options['batch_size'])
+                closed = drafts.close_expired(options['batch_size'])
+                if flushed or closed:
+                    self.stdout.write(f"Flushed drafts of {flushed} attempts, closed {closed} expired attempts")
+
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import packages
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Create or update courses from course package files (JSON/YAML) or directories of them'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Package files or directories')
+        parser.add_argument(
+            '--owner',
+            help='Username recorded as created_by on new courses'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and report what would change without writing'
+        )
+    
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            owner = User.objects.filter(username=options['owner']).first()
+            if owner is None:
+                raise CommandError(f"No user named {options['owner']}")
+        
+        try:
+            raw = list(packages.read_packages(*options['paths']))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read packages: {e}")
+        
+        reports = packages.load_packages(raw, created_by=owner, dry_run=options['dry_run'])
+        
+        counts = {}
+        for report in reports:
+            counts[report['status']] = counts.get(report['status'], 0) + 1
+            if report['status'] == packages.INVALID:
+                self.stderr.write(f"{report['source']}: invalid")
+                for error in report['errors']:
+                    self.stderr.write(f"  {error}")
+            elif report['status'] != packages.UNCHANGED:
+                self.stdout.write(f"{report['slug']}: {report['status']}")
+        
+        prefix = 'Would load' if options['dry_run'] else 'Loaded'
+        summary = (
+            f"{prefix} {len(reports)} packages: {counts.get(packages.CREATED, 0)} created, "
+            f"{counts.get(packages.UPDATED, 0)} updated, {counts.get(packages.UNCHANGED, 0)} unchanged"
+        )
+        if counts.get(packages.INVALID):
+            raise CommandError(f"{summary}, {counts[packages.INVALID]} invalid")
+        self.stdout.write(self.style.SUCCESS(summary))
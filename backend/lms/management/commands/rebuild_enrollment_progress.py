@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from lms import progress
+from lms.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Recompute course module totals and enrollment progress from module progress rows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            action='append',
+            help='Only rebuild this course id (may be repeated); defaults to all courses'
+        )
+    
+    def handle(self, *args, **options):
+        courses = None
+        if options['course']:
+            courses = Course.objects.filter(id__in=options['course'])
+        
+        rebuilt = progress.recount(courses=courses)
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt progress for {rebuilt} enrollments'))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms import certificates
+
+
+class Command(BaseCommand):
+    help = 'Render pending course certificates to PDF and PNG (run with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for newly issued certificates',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when nothing is pending (default: 5)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=certificates.RENDER_BATCH_SIZE,
+            help=f'Certificates claimed per pass (default: {certificates.RENDER_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                stats = certificates.render_pending(options['batch_size'])
+                if stats['claimed']:
+                    self.stdout.write(
+                        f"Claimed {stats['claimed']}: {stats['rendered']} rendered, "
+                        f"{stats['retried']} retrying, {stats['failed']} failed"
+                    )
+
+                if stats['claimed'] < options['batch_size']:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import analytics
+from lms.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Roll learning activity since the last run into the daily analytics tables (run periodically)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-from',
+            help='Recompute every day from this date (YYYY-MM-DD) instead of only new activity'
+        )
+        parser.add_argument(
+            '--rebuild-to',
+            help='Last day to recompute with --rebuild-from (default: today)'
+        )
+        parser.add_argument(
+            '--course',
+            action='append',
+            help='Only rebuild this course id (may be repeated; with --rebuild-from)'
+        )
+    
+    def handle(self, *args, **options):
+        if options['rebuild_from']:
+            try:
+                start = date.fromisoformat(options['rebuild_from'])
+                end = date.fromisoformat(options['rebuild_to']) if options['rebuild_to'] else date.today()
+            except ValueError as e:
+                raise CommandError(f"Invalid date: {e}")
+            courses = Course.objects.filter(id__in=options['course']) if options['course'] else None
+            stats = analytics.rebuild(start, end, courses=courses)
+            verb = 'Rebuilt'
+        else:
+            stats = analytics.run()
+            verb = 'Rolled up'
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['days']} days ({stats['courses']} course-days, {stats['modules']} module-days)"
+        ))
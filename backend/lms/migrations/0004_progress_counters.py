@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:01
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('lms', 'Course')
+    Module = apps.get_model('lms', 'Module')
+    Enrollment = apps.get_model('lms', 'Enrollment')
+    ModuleProgress = apps.get_model('lms', 'ModuleProgress')
+
+    def module_count(course_ref):
+        return Coalesce(Subquery(
+            Module.objects.filter(course=OuterRef(course_ref)).order_by().values('course')
+            .annotate(n=Count('id')).values('n')
+        ), 0)
+
+    Course.objects.update(modules_count=module_count('pk'))
+    Enrollment.objects.update(
+        modules_total=module_count('course_id'),
+        completed_modules=Coalesce(Subquery(
+            ModuleProgress.objects.filter(enrollment=OuterRef('pk'), completed=True).order_by()
+            .values('enrollment').annotate(n=Count('id')).values('n')
+        ), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0003_question_course_category_course_certificate_template_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='modules_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Maintained by lms.progress'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_modules',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='modules_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
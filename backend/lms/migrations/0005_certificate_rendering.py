@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0004_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='pdf_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='png_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='render_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='render_available_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='render_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='render_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('rendered', 'Rendered'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='rendered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['render_status', 'render_available_at'], name='lms_certifi_render__d43446_idx'),
+        ),
+    ]
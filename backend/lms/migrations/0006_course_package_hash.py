@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0005_certificate_rendering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='package_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Content hash of the course package last loaded (lms.packages)', max_length=64),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.1.3 on 2026-10-19 06:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0006_course_package_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('enrollments', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('module_completions', models.PositiveIntegerField(default=0)),
+                ('quiz_attempts', models.PositiveIntegerField(default=0)),
+                ('quiz_passes', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Course daily stats',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ModuleDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('median_time_spent', models.PositiveIntegerField(blank=True, help_text='Seconds, over modules completed that day', null=True)),
+                ('quiz_attempts', models.PositiveIntegerField(default=0)),
+                ('quiz_passes', models.PositiveIntegerField(default=0)),
+                ('average_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('score_histogram', models.JSONField(default=dict, help_text='Attempts per 10-point score bucket')),
+                ('attempt_histogram', models.JSONField(default=dict, help_text='Attempts by attempt number (1st, 2nd, ...)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Module daily stats',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['enrollment_date'], name='lms_enrollm_enrollm_f5d650_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['completion_date'], name='lms_enrollm_complet_ff826c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moduleprogress',
+            index=models.Index(fields=['completed_at'], name='lms_modulep_complet_e60a0d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['completed_at'], name='lms_quizatt_complet_b8f2fe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['enrollment', 'quiz'], name='lms_quizatt_enrollm_b46fcd_idx'),
+        ),
+        migrations.AddField(
+            model_name='coursedailystats',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='lms.course'),
+        ),
+        migrations.AddField(
+            model_name='moduledailystats',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='module_daily_stats', to='lms.course'),
+        ),
+        migrations.AddField(
+            model_name='moduledailystats',
+            name='module',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='lms.module'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='coursedailystats',
+            unique_together={('course', 'date')},
+        ),
+        migrations.AddIndex(
+            model_name='moduledailystats',
+            index=models.Index(fields=['course', 'date'], name='lms_moduled_course__1db911_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='moduledailystats',
+            unique_together={('module', 'date')},
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.utils.text import slugify
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
+from datetime import timedelta
+from decimal import Decimal
 
 User = get_user_model()
 
@@ -38,6 +40,9 @@ class Course(models.Model):
     thumbnail = models.ImageField(upload_to='course_thumbnails/', null=True, blank=True)
     category = models.CharField(max_length=100, blank=True)
     tags = models.CharField(max_length=200, blank=True, help_text="Comma-separated tags")
+    modules_count = models.PositiveIntegerField(default=0, editable=False, help_text="Maintained by lms.progress")
+    package_hash = models.CharField(max_length=64, blank=True, editable=False,
+                                    help_text="Content hash of the course package last loaded (lms.packages)")
     
     # Certificate settings
     provides_certificate = models.BooleanField(default=True)
@@ -63,6 +68,12 @@ class Course(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # modules_count only moves through lms.progress; a stale instance must not write it back
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'modules_count'
+            ]
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -113,32 +124,36 @@ class Enrollment(models.Model):
     progress_percentage = models.PositiveSmallIntegerField(default=0)
     certificate_issued = models.BooleanField(default=False)
     
+    # Counters maintained by lms.progress
+    modules_total = models.PositiveIntegerField(default=0)
+    completed_modules = models.PositiveIntegerField(default=0)
+    
     class Meta:
         unique_together = [['user', 'course']]
         indexes = [
             models.Index(fields=['user', 'completion_status']),
             models.Index(fields=['course']),
+            # Scanned by the analytics rollup (lms.analytics)
+            models.Index(fields=['enrollment_date']),
+            models.Index(fields=['completion_date']),
         ]
     
     def __str__(self):
         return f"{self.user.username} - {self.course.title}"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.modules_total:
+            self.modules_total = Course.objects.filter(pk=self.course_id).values_list(
+                'modules_count', flat=True
+            ).first() or 0
+        super().save(*args, **kwargs)
+    
     def update_progress(self):
-        """Calculate and update progress based on completed modules"""
-        total_modules = self.course.modules.count()
-        if total_modules == 0:
-            return
-        
-        completed_modules = self.module_progress.filter(completed=True).count()
-        self.progress_percentage = int((completed_modules / total_modules) * 100)
+        """Recount progress from the module tables (normally kept up to date incrementally)"""
+        from lms.progress import recount
         
-        if self.progress_percentage == 100:
-            self.completion_status = 'completed'
-            self.completion_date = models.functions.Now()
-        elif self.progress_percentage > 0:
-            self.completion_status = 'in_progress'
-        
-        self.save()
+        recount(enrollments=Enrollment.objects.filter(pk=self.pk))
+        self.refresh_from_db()
 
 
 class ModuleProgress(models.Model):
@@ -153,6 +168,9 @@ class ModuleProgress(models.Model):
     
     class Meta:
         unique_together = [['enrollment', 'module']]
+        indexes = [
+            models.Index(fields=['completed_at']),
+        ]
     
     def __str__(self):
         return f"{self.enrollment.user.username} - {self.module.title}"
@@ -177,6 +195,11 @@ class Quiz(models.Model):
     
     def __str__(self):
         return f"Quiz: {self.title}"
+    
+    @property
+    def cache_version(self):
+        """Changes whenever the quiz, its questions or answers are edited (see lms.signals)"""
+        return int(self.updated_at.timestamp() * 1000)
 
 
 class Question(models.Model):
@@ -227,26 +250,40 @@ class QuizAttempt(models.Model):
     
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['completed_at']),
+            models.Index(fields=['enrollment', 'quiz']),
+        ]
+    
+    @property
+    def deadline(self):
+        """When the quiz's time limit runs out, or None for untimed quizzes"""
+        if not self.quiz.time_limit_minutes:
+            return None
+        return self.started_at + timedelta(minutes=self.quiz.time_limit_minutes)
         
     def calculate_score(self):
         """Calculate the final score"""
         total_points = 0
         earned_points = 0
         
-        for answer in self.answers.all():
+        for answer in self.answers.select_related('question'):
             total_points += answer.question.points
             if answer.is_correct:
                 earned_points += answer.question.points
         
+        self.set_score(earned_points, total_points, timezone.now())
+        self.save()
+    
+    def set_score(self, earned_points, total_points, completed_at):
+        """Set score, pass/fail and completion time from point totals (not saved)"""
         if total_points > 0:
-            self.score = (earned_points / total_points) * 100
+            self.score = (Decimal(earned_points) * 100 / Decimal(total_points)).quantize(Decimal('0.01'))
             self.passed = self.score >= self.quiz.passing_score
         else:
-            self.score = 0
+            self.score = Decimal(0)
             self.passed = False
-            
-        self.completed_at = timezone.now()
-        self.save()
+        self.completed_at = completed_at
 
 
 class QuizAnswer(models.Model):
@@ -269,6 +306,12 @@ class QuizAnswer(models.Model):
 
 class Certificate(models.Model):
     """Course completion certificates"""
+    RENDER_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('rendered', 'Rendered'),
+        ('failed', 'Failed'),
+    ]
+    
     enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='certificate')
     certificate_id = models.UUIDField(default=uuid.uuid4, unique=True)
     issued_date = models.DateTimeField(auto_now_add=True)
@@ -282,19 +325,82 @@ class Certificate(models.Model):
     # Verification
     verification_url = models.URLField(max_length=500, blank=True)
     
+    # Rendered artifacts (content-addressed paths in default storage, see lms.certificates)
+    render_status = models.CharField(max_length=20, choices=RENDER_STATUS_CHOICES, default='pending')
+    render_attempts = models.PositiveSmallIntegerField(default=0)
+    render_available_at = models.DateTimeField(default=timezone.now)
+    render_error = models.TextField(blank=True)
+    rendered_at = models.DateTimeField(null=True, blank=True)
+    pdf_path = models.CharField(max_length=255, blank=True)
+    png_path = models.CharField(max_length=255, blank=True)
+    
     class Meta:
         indexes = [
             models.Index(fields=['certificate_id']),
+            models.Index(fields=['render_status', 'render_available_at']),
         ]
     
     def __str__(self):
         return f"Certificate for {self.user_name} - {self.course_title}"
     
     def get_verification_url(self):
-        """Generate verification URL"""
-        from django.urls import reverse
-        from django.contrib.sites.models import Site
+        """Public verification URL carrying the signed certificate token"""
+        from lms.certificates import verification_url
         
-        current_site = Site.objects.get_current()
-        path = reverse('verify-certificate', kwargs={'certificate_id': str(self.certificate_id)})
-        return f"https://{current_site.domain}{path}"
\ No newline at end of file
+        return verification_url(self)
+
+
+class CourseDailyStats(models.Model):
+    """Per-course, per-day learning activity rolled up by lms.analytics"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    enrollments = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    module_completions = models.PositiveIntegerField(default=0)
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_passes = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = [['course', 'date']]
+        ordering = ['date']
+        verbose_name_plural = 'Course daily stats'
+    
+    def __str__(self):
+        return f"{self.course} - {self.date}"
+
+
+class ModuleDailyStats(models.Model):
+    """Per-module, per-day learning activity rolled up by lms.analytics"""
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='daily_stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='module_daily_stats')
+    date = models.DateField()
+    completions = models.PositiveIntegerField(default=0)
+    median_time_spent = models.PositiveIntegerField(null=True, blank=True, help_text="Seconds, over modules completed that day")
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_passes = models.PositiveIntegerField(default=0)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    score_histogram = models.JSONField(default=dict, help_text="Attempts per 10-point score bucket")
+    attempt_histogram = models.JSONField(default=dict, help_text="Attempts by attempt number (1st, 2nd, ...)")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = [['module', 'date']]
+        ordering = ['date']
+        indexes = [
+            models.Index(fields=['course', 'date']),
+        ]
+        verbose_name_plural = 'Module daily stats'
+    
+    def __str__(self):
+        return f"{self.module} - {self.date}"
+
+
+class RollupWatermark(models.Model):
+    """How far an incremental rollup job has processed its source rows"""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.position}"
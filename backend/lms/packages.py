@@ -0,0 +1,431 @@
+"""
+Course packages: loading a course library from JSON/YAML files.
+
+A package describes one course with its modules, and each module may have a
+quiz with questions and answers:
+
+    slug: volunteer-orientation
+    title: Volunteer Orientation
+    description: Essential training for new volunteers.
+    estimated_duration: 60
+    audience_type: volunteer
+    modules:
+      - title: Safety Guidelines
+        content: <p>...</p>
+        duration: 20
+        quiz:
+          title: Safety check
+          questions:
+            - question_text: Who do you call first?
+              answers:
+                - {answer_text: Your site lead, is_correct: true}
+                - {answer_text: Nobody}
+
+A file holds one package, a list of them, or {courses: [...]}; a library is
+a directory of such files. Packages are validated and normalized (defaults
+filled in), hashed, and compared with `Course.package_hash` by slug, so an
+unchanged course costs nothing. New courses are inserted level by level
+with `bulk_create`; changed courses are diffed against their rows (matched
+by title or text, then by position) and brought up to date with
+`bulk_update` / `bulk_create` and a delete of leftovers, keeping the ids
+(and learner progress) of content that is still there. Each package is applied in its own transaction.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import yaml
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+
+from lms import catalog, progress
+from lms.models import Answer, Course, Module, Question, Quiz
+
+logger = logging.getLogger(__name__)
+
+# Bump when normalization changes, so every package is applied again
+PACKAGE_FORMAT = 1
+
+PACKAGE_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+CREATED = 'created'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+INVALID = 'invalid'
+
+CHOICE_TYPES = ('multiple_choice', 'true_false')
+
+UNIQUE_PARKING_OFFSET = 10000
+
+# Per level: model, required fields {name: type}, optional fields {name: (type, default)}
+COURSE_SPEC = (Course, {'title': str, 'description': str, 'estimated_duration': int}, {
+    'slug': (str, None),
+    'audience_type': (str, 'both'),
+    'difficulty_level': (str, 'beginner'),
+    'category': (str, ''),
+    'tags': (str, ''),
+    'is_required': (bool, False),
+    'is_active': (bool, True),
+    'is_published': (bool, True),
+    'provides_certificate': (bool, True),
+    'certificate_template': (str, 'default'),
+    'passing_score': (int, 80),
+})
+MODULE_SPEC = (Module, {'title': str, 'content': str, 'duration': int}, {
+    'content_type': (str, 'text'),
+    'video_url': (str, ''),
+    'display_order': (int, None),
+})
+QUIZ_SPEC = (Quiz, {'title': str}, {
+    'description': (str, ''),
+    'passing_score': (int, 70),
+    'max_attempts': (int, 3),
+    'time_limit_minutes': (int, None),
+    'randomize_questions': (bool, False),
+    'show_correct_answers': (bool, True),
+})
+QUESTION_SPEC = (Question, {'question_text': str}, {
+    'question_type': (str, 'multiple_choice'),
+    'points': (int, 1),
+    'explanation': (str, ''),
+})
+ANSWER_SPEC = (Answer, {'answer_text': str}, {
+    'is_correct': (bool, False),
+})
+
+COURSE_FIELDS = [name for name in COURSE_SPEC[1]] + [name for name in COURSE_SPEC[2] if name != 'slug']
+MODULE_FIELDS = ['title', 'content', 'content_type', 'video_url', 'duration', 'display_order']
+QUIZ_FIELDS = ['title', 'description', 'passing_score', 'max_attempts', 'time_limit_minutes',
+               'randomize_questions', 'show_correct_answers']
+QUESTION_FIELDS = ['question_text', 'question_type', 'points', 'explanation', 'order']
+ANSWER_FIELDS = ['answer_text', 'is_correct', 'order']
+
+
+class PackageError(Exception):
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+# Reading
+
+def read_packages(*paths):
+    """Yield (source, raw package) from package files and directories"""
+    for path in map(Path, paths):
+        files = sorted(
+            p for p in path.rglob('*') if p.suffix in PACKAGE_EXTENSIONS
+        ) if path.is_dir() else [path]
+        for file in files:
+            with open(file, encoding='utf-8') as f:
+                data = json.load(f) if file.suffix == '.json' else yaml.safe_load(f)
+            if isinstance(data, dict) and 'courses' in data:
+                data = data['courses']
+            if isinstance(data, list):
+                for index, package in enumerate(data):
+                    yield f"{file}[{index}]", package
+            else:
+                yield str(file), data
+
+
+# Validation
+
+def _is_type(value, expected):
+    if expected is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, expected)
+
+
+def _normalize(data, spec, path, errors, children=()):
+    """Check one level against its spec; returns the fields with defaults filled in"""
+    model, required, defaults = spec
+    if not isinstance(data, dict):
+        errors.append(f"{path}: expected a mapping")
+        return None
+
+    unknown = set(data) - set(required) - set(defaults) - set(children)
+    if unknown:
+        errors.append(f"{path}: unknown fields {', '.join(sorted(unknown))}")
+
+    fields = {}
+    for name, expected in required.items():
+        if data.get(name) is None:
+            errors.append(f"{path}.{name}: required")
+        elif not _is_type(data[name], expected):
+            errors.append(f"{path}.{name}: expected {expected.__name__}")
+        else:
+            fields[name] = data[name]
+    for name, (expected, default) in defaults.items():
+        value = data.get(name, default)
+        if value is not None and not _is_type(value, expected):
+            errors.append(f"{path}.{name}: expected {expected.__name__}")
+            continue
+        fields[name] = value
+
+    for name, value in fields.items():
+        field = model._meta.get_field(name)
+        if field.choices and value not in dict(field.choices):
+            errors.append(f"{path}.{name}: {value!r} is not one of {', '.join(dict(field.choices))}")
+        elif isinstance(value, str) and field.max_length and len(value) > field.max_length:
+            errors.append(f"{path}.{name}: longer than {field.max_length} characters")
+        elif _is_type(value, int) and value < 0:
+            errors.append(f"{path}.{name}: must not be negative")
+    return fields
+
+
+def _items(data, name, path, errors):
+    items = data.get(name) or []
+    if not isinstance(items, list):
+        errors.append(f"{path}.{name}: expected a list")
+        return []
+    return items
+
+
+def validate(data):
+    """Normalize a raw package; raises PackageError listing every problem"""
+    errors = []
+    course = _normalize(data, COURSE_SPEC, 'course', errors, children=('modules',))
+    if course is None:
+        raise PackageError(errors)
+    course['slug'] = course.get('slug') or slugify(course.get('title', ''))
+    if not course['slug'] or slugify(course['slug']) != course['slug']:
+        errors.append(f"course.slug: {course['slug']!r} is not a valid slug")
+
+    course['modules'] = []
+    for index, raw in enumerate(_items(data, 'modules', 'course', errors)):
+        path = f"modules[{index}]"
+        module = _normalize(raw, MODULE_SPEC, path, errors, children=('quiz',))
+        if module is None:
+            continue
+        if module['display_order'] is None:
+            module['display_order'] = index + 1
+        module['quiz'] = None
+        if raw.get('quiz') is not None:
+            module['quiz'] = quiz = _normalize(raw['quiz'], QUIZ_SPEC, f"{path}.quiz", errors, children=('questions',))
+            if quiz is None:
+                continue
+            quiz['questions'] = []
+            for q_index, raw_question in enumerate(_items(raw['quiz'], 'questions', f"{path}.quiz", errors)):
+                q_path = f"{path}.quiz.questions[{q_index}]"
+                question = _normalize(raw_question, QUESTION_SPEC, q_path, errors, children=('answers',))
+                if question is None:
+                    continue
+                question['order'] = q_index
+                question['answers'] = []
+                for a_index, raw_answer in enumerate(_items(raw_question, 'answers', q_path, errors)):
+                    answer = _normalize(raw_answer, ANSWER_SPEC, f"{q_path}.answers[{a_index}]", errors)
+                    if answer is not None:
+                        answer['order'] = a_index
+                        question['answers'].append(answer)
+                if question['question_type'] in CHOICE_TYPES and not any(
+                    answer['is_correct'] for answer in question['answers']
+                ):
+                    errors.append(f"{q_path}: needs at least one correct answer")
+                quiz['questions'].append(question)
+        course['modules'].append(module)
+
+    if errors:
+        raise PackageError(errors)
+    return course
+
+
+def content_hash(package):
+    encoded = json.dumps([PACKAGE_FORMAT, package], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+# Applying
+
+class _Batch:
+    """Pending creates / updates / deletes for one model, applied together"""
+
+    def __init__(self, model, fields, key, touch=None, unique=None):
+        self.model = model
+        self.fields = fields
+        self.key = key
+        # Timestamp field to set on every kept row, changed or not
+        self.touch = touch
+        # Field under a unique constraint, moved out of the way before updates
+        self.unique = unique
+        self.create = []
+        self.update = []
+        self.delete = []
+
+    def sync(self, existing, wanted, build):
+        """
+        Match existing rows to wanted field dicts: first by `key` (title or
+        text), then the leftovers in order, so both inserted and renamed
+        items keep their rows. Returns [(row, wanted)] for the rows that
+        will remain; unmatched rows are deleted.
+        """
+        by_key = {}
+        for row in existing:
+            by_key.setdefault(getattr(row, self.key), []).append(row)
+        matched = [by_key[data[self.key]].pop(0) if by_key.get(data[self.key]) else None for data in wanted]
+        taken = {row.pk for row in matched if row is not None}
+        leftovers = [row for row in existing if row.pk not in taken]
+        for index, row in enumerate(matched):
+            if row is None and leftovers:
+                matched[index] = leftovers.pop(0)
+        self.delete.extend(leftovers)
+
+        pairs = []
+        for row, data in zip(matched, wanted):
+            if row is None:
+                row = build(data)
+                self.create.append(row)
+            elif self.touch or any(getattr(row, name) != data[name] for name in self.fields):
+                for name in self.fields:
+                    setattr(row, name, data[name])
+                if self.touch:
+                    setattr(row, self.touch, timezone.now())
+                self.update.append(row)
+            pairs.append((row, data))
+        return pairs
+
+    def apply(self):
+        if self.delete:
+            self.model.objects.filter(pk__in=[row.pk for row in self.delete]).delete()
+        if self.update:
+            if self.unique:
+                # Rows swapping values would collide mid-update; park them above the range first
+                self.model.objects.filter(pk__in=[row.pk for row in self.update]).update(
+                    **{self.unique: F(self.unique) + UNIQUE_PARKING_OFFSET}
+                )
+            self.model.objects.bulk_update(self.update, self.fields + ([self.touch] if self.touch else []))
+        if self.create:
+            self.model.objects.bulk_create(self.create)
+
+
+def _fields(data, names):
+    return {name: data[name] for name in names}
+
+
+def _group(rows, key):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(getattr(row, key), []).append(row)
+    return grouped
+
+
+def _apply(package, package_hash, course=None, created_by=None):
+    """Write one package; `course` is the existing row to update, if any"""
+    creating = course is None
+    if creating:
+        course = Course(
+            slug=package['slug'],
+            created_by=created_by,
+            modules_count=len(package['modules']),
+            **_fields(package, COURSE_FIELDS),
+        )
+    else:
+        for name in COURSE_FIELDS:
+            setattr(course, name, package[name])
+    course.package_hash = package_hash
+
+    modules = _Batch(Module, MODULE_FIELDS, 'title', unique='display_order')
+    # Question and answer edits must retire cached compiled quizzes (see lms.quizzes)
+    quizzes = _Batch(Quiz, QUIZ_FIELDS, 'title', touch=None if creating else 'updated_at')
+    questions = _Batch(Question, QUESTION_FIELDS, 'question_text')
+    answers = _Batch(Answer, ANSWER_FIELDS, 'answer_text')
+
+    existing_modules, existing_quizzes, existing_questions, existing_answers = [], {}, {}, {}
+    if not creating:
+        existing_modules = list(course.modules.order_by('display_order', 'id'))
+        existing_quizzes = {quiz.module_id: quiz for quiz in Quiz.objects.filter(module__course=course)}
+        existing_questions = _group(
+            Question.objects.filter(quiz__module__course=course).order_by('order', 'id'), 'quiz_id'
+        )
+        existing_answers = _group(
+            Answer.objects.filter(question__quiz__module__course=course).order_by('order', 'id'), 'question_id'
+        )
+
+    # Rows reference unsaved parents; bulk_create fills in the ids top-down
+    for module, module_data in modules.sync(
+        existing_modules, package['modules'],
+        lambda data: Module(course=course, **_fields(data, MODULE_FIELDS)),
+    ):
+        quiz_data = module_data['quiz']
+        current = existing_quizzes.get(module.pk) if module.pk else None
+        wanted = [quiz_data] if quiz_data else []
+        for quiz, quiz_data in quizzes.sync(
+            [current] if current else [], wanted,
+            lambda data: Quiz(module=module, **_fields(data, QUIZ_FIELDS)),
+        ):
+            for question, question_data in questions.sync(
+                existing_questions.get(quiz.pk, []) if quiz.pk else [], quiz_data['questions'],
+                lambda data: Question(quiz=quiz, **_fields(data, QUESTION_FIELDS)),
+            ):
+                answers.sync(
+                    existing_answers.get(question.pk, []) if question.pk else [], question_data['answers'],
+                    lambda data: Answer(question=question, **_fields(data, ANSWER_FIELDS)),
+                )
+
+    if creating:
+        Course.objects.bulk_create([course])
+    else:
+        course.save(update_fields=COURSE_FIELDS + ['package_hash'])
+    modules.apply()
+    quizzes.apply()
+    questions.apply()
+    answers.apply()
+
+    if not creating and (modules.create or modules.delete):
+        progress.recount(courses=Course.objects.filter(pk=course.pk))
+    return course
+
+
+def load_packages(packages, created_by=None, dry_run=False):
+    """
+    Validate and apply (source, raw package) pairs. Returns one report per
+    package: source, slug, status (created / updated / unchanged / invalid)
+    and errors.
+    """
+    reports = []
+    valid = []
+    seen = {}
+    for source, raw in packages:
+        report = {'source': source, 'slug': None, 'status': None, 'errors': []}
+        reports.append(report)
+        try:
+            package = validate(raw)
+        except PackageError as e:
+            report.update(status=INVALID, errors=e.errors)
+            continue
+        report['slug'] = package['slug']
+        if package['slug'] in seen:
+            report.update(status=INVALID, errors=[f"slug {package['slug']!r} is also used by {seen[package['slug']]}"])
+            continue
+        seen[package['slug']] = source
+        valid.append((report, package))
+
+    existing = {
+        course.slug: course
+        for course in Course.objects.filter(slug__in=[package['slug'] for _, package in valid])
+    }
+
+    changed = False
+    for report, package in valid:
+        package_hash = content_hash(package)
+        course = existing.get(package['slug'])
+        if course is not None and course.package_hash == package_hash:
+            report['status'] = UNCHANGED
+            continue
+        report['status'] = CREATED if course is None else UPDATED
+        if dry_run:
+            continue
+        try:
+            with transaction.atomic():
+                _apply(package, package_hash, course=course, created_by=created_by)
+        except DatabaseError as e:
+            logger.exception(f"Loading course package {report['source']} failed")
+            report.update(status=INVALID, errors=[str(e)])
+            continue
+        changed = True
+
+    if changed:
+        catalog.invalidate()
+    return reports
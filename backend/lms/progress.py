@@ -0,0 +1,138 @@
+"""
+Incremental course progress.
+
+Each enrollment stores how many of its course's modules exist
+(`modules_total`) and how many the learner has completed
+(`completed_modules`). Completing or un-completing a module flips the
+ModuleProgress row with a conditional UPDATE and, only when it actually
+changed, applies a +1/-1 to the enrollment with a single UPDATE that also
+derives `progress_percentage`, `completion_status` and `completion_date`
+from the new counts. Adding or removing a module adjusts every enrollment
+in the course with one UPDATE (see lms.signals).
+
+`recount` recomputes everything from the tables if the counters drift
+(`manage.py rebuild_enrollment_progress`).
+"""
+
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from lms.models import Course, Enrollment, Module, ModuleProgress
+
+
+def apply_deltas(enrollments, completed=0, total=0):
+    """
+    Add `completed` / `total` to the counters of every enrollment in the
+    queryset and refresh the derived fields, in one UPDATE.
+    """
+    new_completed = Greatest(F('completed_modules') + completed, Value(0))
+    new_total = Greatest(F('modules_total') + total, Value(0))
+    # Conditions on the new counts, written against the row's current values
+    has_modules = Q(modules_total__gt=-total)
+    all_done = has_modules & Q(completed_modules__gte=F('modules_total') + (total - completed))
+    any_done = has_modules & Q(completed_modules__gt=-completed)
+
+    return enrollments.update(
+        completed_modules=new_completed,
+        modules_total=new_total,
+        progress_percentage=Case(
+            When(has_modules, then=Least(
+                ExpressionWrapper(new_completed * 100 / new_total, output_field=IntegerField()),
+                Value(100),
+            )),
+            default=Value(0),
+        ),
+        completion_status=Case(
+            When(all_done, then=Value('completed')),
+            When(any_done, then=Value('in_progress')),
+            default=F('completion_status'),
+        ),
+        completion_date=Case(
+            When(all_done & Q(completion_date__isnull=True), then=Value(timezone.now())),
+            default=F('completion_date'),
+        ),
+    )
+
+
+def record_module_progress(enrollment, module, completed=None, time_spent=0, quiz_score=None):
+    """
+    Record activity on a module. `completed` True/False marks the module
+    done/not done (None leaves it); the enrollment's counters only move when
+    the completion state actually changes. Refreshes the enrollment's
+    progress fields and returns the ModuleProgress row.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        progress, _ = ModuleProgress.objects.get_or_create(enrollment=enrollment, module=module)
+        rows = ModuleProgress.objects.filter(pk=progress.pk)
+
+        fields = {}
+        if time_spent:
+            fields['time_spent'] = F('time_spent') + time_spent
+        if quiz_score is not None:
+            fields['quiz_score'] = quiz_score
+        if fields:
+            rows.update(**fields)
+
+        delta = 0
+        if completed is True:
+            delta = rows.filter(completed=False).update(completed=True, completed_at=now)
+        elif completed is False:
+            delta = -rows.filter(completed=True).update(completed=False, completed_at=None)
+        if delta:
+            apply_deltas(Enrollment.objects.filter(pk=enrollment.pk), completed=delta)
+
+    progress.refresh_from_db()
+    enrollment.refresh_from_db(fields=[
+        'completed_modules', 'modules_total', 'progress_percentage', 'completion_status', 'completion_date',
+    ])
+    return progress
+
+
+def module_added(module):
+    with transaction.atomic():
+        Course.objects.filter(pk=module.course_id).update(modules_count=F('modules_count') + 1)
+        apply_deltas(Enrollment.objects.filter(course_id=module.course_id), total=1)
+
+
+def module_removed(module):
+    """Call before the module (and its progress rows) are deleted"""
+    with transaction.atomic():
+        apply_deltas(
+            Enrollment.objects.filter(
+                course_id=module.course_id,
+                module_progress__module=module,
+                module_progress__completed=True,
+            ),
+            completed=-1,
+        )
+        Course.objects.filter(pk=module.course_id).update(modules_count=Greatest(F('modules_count') - 1, Value(0)))
+        apply_deltas(Enrollment.objects.filter(course_id=module.course_id), total=-1)
+
+
+def _module_count(course_ref):
+    return Coalesce(Subquery(
+        Module.objects.filter(course=OuterRef(course_ref)).order_by().values('course')
+        .annotate(n=Count('id')).values('n')
+    ), 0)
+
+
+def recount(courses=None, enrollments=None):
+    """Recompute module totals and completed counts from the tables"""
+    (Course.objects.all() if courses is None else courses).update(modules_count=_module_count('pk'))
+
+    if enrollments is None:
+        enrollments = Enrollment.objects.all()
+        if courses is not None:
+            enrollments = enrollments.filter(course__in=courses)
+    with transaction.atomic():
+        enrollments.update(
+            modules_total=_module_count('course_id'),
+            completed_modules=Coalesce(Subquery(
+                ModuleProgress.objects.filter(enrollment=OuterRef('pk'), completed=True).order_by()
+                .values('enrollment').annotate(n=Count('id')).values('n')
+            ), 0),
+        )
+        return apply_deltas(enrollments)
@@ -0,0 +1,94 @@
+"""
+Compiled quiz payloads.
+
+A quiz is compiled once per version into everything the API needs: the
+public question list (what `get_quiz_questions` returns), its counts and
+points, and the answer key used by lms.grading. The compiled quiz is cached
+under `Quiz.cache_version`, which lms.signals bumps on every question or
+answer edit, so stale entries are simply never read again.
+
+Randomized quizzes are shuffled in memory with a PRNG seeded by the
+attempt, so the same attempt always sees the same order (and can be
+resumed) without `ORDER BY RANDOM()` in the database.
+"""
+
+import random
+
+from django.core.cache import cache
+
+from lms.models import Answer, Question
+
+COMPILED_QUIZ_CACHE_KEY = "quiz_compiled:{quiz_id}:{version}"
+COMPILED_QUIZ_CACHE_SECONDS = 60 * 60
+
+CHOICE_TYPES = ('multiple_choice', 'true_false')
+
+
+def normalize_text(text):
+    return (text or '').lower().strip()
+
+
+def compile_quiz(quiz):
+    """Build the compiled form of a quiz with two queries"""
+    questions = []
+    answer_key = {}
+    by_id = {}
+    for question_id, text, question_type, points, order in Question.objects.filter(
+        quiz_id=quiz.id
+    ).values_list('id', 'question_text', 'question_type', 'points', 'order'):
+        question = {
+            'id': question_id,
+            'question_text': text,
+            'question_type': question_type,
+            'points': points,
+            'order': order,
+            'answers': [] if question_type in CHOICE_TYPES else None,
+        }
+        questions.append(question)
+        by_id[question_id] = question
+        answer_key[question_id] = {
+            'type': question_type,
+            'points': points,
+            'choices': set(),
+            'correct': set(),
+            'accepted': set(),
+        }
+
+    for answer_id, question_id, text, order, is_correct in Answer.objects.filter(
+        question__quiz_id=quiz.id
+    ).order_by('order', 'id').values_list('id', 'question_id', 'answer_text', 'order', 'is_correct'):
+        if by_id[question_id]['answers'] is not None:
+            by_id[question_id]['answers'].append({'id': answer_id, 'answer_text': text, 'order': order})
+        entry = answer_key[question_id]
+        entry['choices'].add(answer_id)
+        if is_correct:
+            entry['correct'].add(answer_id)
+            entry['accepted'].add(normalize_text(text))
+
+    return {
+        'version': quiz.cache_version,
+        'questions': questions,
+        'questions_count': len(questions),
+        'total_points': sum(question['points'] for question in questions),
+        'answer_key': answer_key,
+    }
+
+
+def load_compiled_quiz(quiz):
+    """Compiled quiz for the current version, from the cache when possible"""
+    key = COMPILED_QUIZ_CACHE_KEY.format(quiz_id=quiz.id, version=quiz.cache_version)
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_quiz(quiz)
+        cache.set(key, compiled, COMPILED_QUIZ_CACHE_SECONDS)
+    return compiled
+
+
+def ordered_questions(quiz, compiled, seed):
+    """The quiz's questions in presentation order for an attempt seed"""
+    questions = compiled['questions']
+    if not quiz.randomize_questions:
+        return questions
+    questions = list(questions)
+    random.Random(f"{quiz.id}:{compiled['version']}:{seed}").shuffle(questions)
+    return questions
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from lms import catalog, progress
+from lms.models import Course, Enrollment, Module, Quiz, Question, Answer
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_quiz_version_for_question(sender, instance, **kwargs):
+    """Question edits retire cached compiled quizzes (see lms.quizzes)"""
+    Quiz.objects.filter(id=instance.quiz_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def bump_quiz_version_for_answer(sender, instance, **kwargs):
+    Quiz.objects.filter(questions=instance.question_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Module)
+def count_added_module(sender, instance, created, raw=False, **kwargs):
+    """Adding or removing a module adjusts every enrollment in the course"""
+    if created and not raw:
+        progress.module_added(instance)
+
+
+@receiver(pre_delete, sender=Module)
+def count_removed_module(sender, instance, **kwargs):
+    progress.module_removed(instance)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def refresh_catalog(sender, **kwargs):
+    """Course and module edits show up in the catalog snapshot right away"""
+    catalog.invalidate()
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def refresh_catalog_counts(sender, instance, created=True, **kwargs):
+    if created:
+        catalog.invalidate()
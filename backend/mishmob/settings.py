@@ -70,6 +70,7 @@ INSTALLED_APPS = [
     'api',
     'messaging',
     'events',
+    'notifications',
 ]
 
 MIDDLEWARE = [
@@ -134,6 +135,27 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Redis is shared by every worker; fall back to per-process memory locally
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -184,6 +206,13 @@ STORAGES = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Lifetime of signed media links handed out by the API (see api.media)
+MEDIA_SIGNED_URL_SECONDS = config('MEDIA_SIGNED_URL_SECONDS', default=6 * 3600, cast=int)
+# Hand file bodies to the frontend server: '' (stream from Django), 'x-accel' (nginx) or 'x-sendfile'
+MEDIA_OFFLOAD = config('MEDIA_OFFLOAD', default='')
+# nginx `internal` location that maps onto MEDIA_ROOT, used with MEDIA_OFFLOAD=x-accel
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -241,6 +270,46 @@ SOCIALACCOUNT_AUTO_SIGNUP = True
 SOCIALACCOUNT_QUERY_EMAIL = True
 SOCIALACCOUNT_STORE_TOKENS = True
 
+# JWT Authentication
+# Seconds an authenticated user's principal snapshot stays in the cache
+PRINCIPAL_CACHE_TIMEOUT = config('PRINCIPAL_CACHE_TIMEOUT', default=300, cast=int)
+# Tokens signed by the mock auth router are only accepted in DEBUG builds
+JWT_MOCK_SECRET_KEY = 'mock-secret-key'
+JWT_ACCEPT_MOCK_TOKENS = DEBUG and config('JWT_ACCEPT_MOCK_TOKENS', default=False, cast=bool)
+# Access tokens are short-lived; clients renew them with a rotating refresh token
+ACCESS_TOKEN_LIFETIME_SECONDS = config('ACCESS_TOKEN_LIFETIME_SECONDS', default=15 * 60, cast=int)
+REFRESH_TOKEN_LIFETIME_DAYS = config('REFRESH_TOKEN_LIFETIME_DAYS', default=30, cast=int)
+# How often each worker checks the shared cache for newly revoked sessions
+TOKEN_REVOCATION_SYNC_SECONDS = config('TOKEN_REVOCATION_SYNC_SECONDS', default=1, cast=int)
+
+# Rate limiting
+# Per-scope overrides for @rate_limit, e.g. {'login': '20/m', 'verify_identity': '5/h'}
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMITS = {}
+
+# Check-in audit log retention
+# Raw CheckIn rows older than this are rolled up into daily summaries and archived
+CHECKIN_RETENTION_DAYS = config('CHECKIN_RETENTION_DAYS', default=90, cast=int)
+# Storage path (default storage) for compressed archives of compacted rows
+CHECKIN_ARCHIVE_PATH = config('CHECKIN_ARCHIVE_PATH', default='archives/checkins')
+
+# Push notifications
+# Transport used by dispatch_notifications. Defaults to Expo when an access token is
+# configured; LocalTransport only records messages, so it is never an implicit choice
+# outside DEBUG. Left unset, the dispatcher refuses to start (see notifications.checks).
+EXPO_ACCESS_TOKEN = config('EXPO_ACCESS_TOKEN', default='')
+PUSH_TRANSPORT = config('PUSH_TRANSPORT', default='') or (
+    'notifications.transports.ExpoTransport' if EXPO_ACCESS_TOKEN
+    else 'notifications.transports.LocalTransport' if DEBUG
+    else ''
+)
+
+# Course certificates
+# Public URL that verification tokens are appended to (see lms.certificates)
+CERTIFICATE_VERIFY_URL = config('CERTIFICATE_VERIFY_URL', default='https://mishmob.com/api/lms/certificates/verify')
+# Storage path (default storage) for rendered certificate PDFs and PNGs
+CERTIFICATE_STORAGE_PATH = config('CERTIFICATE_STORAGE_PATH', default='certificates')
+
 # Custom adapters
 ACCOUNT_ADAPTER = 'users.adapters.AccountAdapter'
 SOCIALACCOUNT_ADAPTER = 'users.adapters.SocialAccountAdapter'
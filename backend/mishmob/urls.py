@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from django.views.generic import RedirectView
 from django.http import JsonResponse
 from ninja import NinjaAPI
+from api import media
 from api.urls import setup_api_routes
 
 def health_check(request):
@@ -42,6 +43,8 @@ urlpatterns = [
     path('health/', health_check, name='health_check'),
     path('admin/', admin.site.urls),
     path('api/', api.urls),
+    # Uploaded files behind signed, expiring links (ranges, conditional requests)
+    path('media/signed/<path:path>', media.serve_signed, name='signed-media'),
     # Django Allauth URLs
     path('accounts/', include('allauth.urls')),
     # Only redirect non-API, non-admin paths to frontend
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'kind', 'title', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['user__username', 'user__email', 'title']
+    raw_id_fields = ['user']
+    readonly_fields = ['created_at', 'sent_at', 'attempts', 'last_error']
+    show_full_result_count = False
+    actions = ['requeue']
+    
+    @admin.action(description="Requeue selected notifications")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status='pending').update(
+            status='pending',
+            attempts=0,
+            available_at=timezone.now(),
+            last_error='',
+        )
+        self.message_user(request, f"{updated} notifications requeued.")
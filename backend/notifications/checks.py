@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from notifications.transports import MISSING_TRANSPORT
+
+
+@register(deploy=True)
+def check_push_transport(app_configs, **kwargs):
+    """Without a transport, dispatch_notifications can't deliver anything"""
+    if settings.PUSH_TRANSPORT:
+        return []
+    return [Error(MISSING_TRANSPORT, id='notifications.E001')]
@@ -0,0 +1,244 @@
+"""
+Push notification outbox and dispatcher.
+
+Producers call `notify()` inside their own transaction, so a notification
+exists exactly when the change it announces was committed. The worker
+(`manage.py dispatch_notifications`) repeatedly:
+
+1. claims a batch of due rows by pushing their `available_at` forward by a
+   lease, so a crashed worker's rows become due again on their own;
+2. coalesces per user: pending notifications sharing a collapse key keep
+   only the newest, and a user with more than COALESCE_THRESHOLD left gets
+   a single summary push instead of a burst;
+3. fans out to every active device with a push token (one query), sends in
+   transport-sized batches, and prunes tokens the provider reports dead in
+   one UPDATE;
+4. records outcomes with one UPDATE per status, backing off retries.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateformat import time_format
+
+from events.models import DeviceRegistration, EventTicket
+from notifications import transports
+from notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_BATCH_SIZE = 500
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+COALESCE_THRESHOLD = 3
+
+REMINDER_LEAD = timedelta(hours=2)
+
+
+def notify(users, kind, title, body='', data=None, collapse_key='', dedupe_key=''):
+    """
+    Queue a push notification for each of `users` (instances or ids).
+    With a `dedupe_key`, users who already have one with that key are skipped.
+    """
+    rows = [
+        Notification(
+            user_id=getattr(user, 'pk', user),
+            kind=kind,
+            title=title[:200],
+            body=body[:500],
+            data=data or {},
+            collapse_key=collapse_key,
+            dedupe_key=dedupe_key,
+        )
+        for user in users
+    ]
+    Notification.objects.bulk_create(rows, ignore_conflicts=bool(dedupe_key))
+    return len(rows)
+
+
+def queue_event_reminders(now=None, lead=REMINDER_LEAD):
+    """Queue one reminder per active ticket for events whose check-in opens within `lead`"""
+    now = now or timezone.now()
+    tickets = EventTicket.objects.filter(
+        status='active',
+        event__check_in_opens_at__gt=now,
+        event__check_in_opens_at__lte=now + lead,
+    ).values_list('user_id', 'event_id', 'event__opportunity__title', 'event__check_in_opens_at')
+
+    rows = [
+        Notification(
+            user_id=user_id,
+            kind='event_reminder',
+            title=f"{title} starts soon",
+            body=f"Check-in opens at {time_format(timezone.localtime(opens_at), 'g:i A')}.",
+            data={'event_id': event_id},
+            collapse_key=f"event:{event_id}",
+            dedupe_key=f"event-reminder:{event_id}",
+        )
+        for user_id, event_id, title, opens_at in tickets.iterator(chunk_size=2000)
+    ]
+    Notification.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def claim(batch_size=DISPATCH_BATCH_SIZE, now=None):
+    """Lease up to `batch_size` due notifications to this worker"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = Notification.objects.filter(status='pending', available_at__lte=now).order_by('available_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        Notification.objects.filter(id__in=[n.id for n in batch]).update(
+            available_at=now + timedelta(seconds=LEASE_SECONDS)
+        )
+    return batch
+
+
+def _envelopes(notifications):
+    """
+    Coalesce one user's notifications. Returns (envelopes, superseded):
+    each envelope is (message fields, notifications it delivers).
+    """
+    latest = {}
+    superseded = []
+    for n in sorted(notifications, key=lambda n: n.id):
+        key = n.collapse_key or f"id:{n.id}"
+        if key in latest:
+            superseded.append(latest[key])
+        latest[key] = n
+    kept = sorted(latest.values(), key=lambda n: n.id)
+
+    if len(kept) > COALESCE_THRESHOLD:
+        newest = kept[-1]
+        message = {
+            'title': f"You have {len(kept)} new notifications",
+            'body': newest.title,
+            'data': {'kind': 'summary', 'notification_ids': [n.id for n in kept]},
+            'badge': len(kept),
+            'collapse_key': 'summary',
+        }
+        return [(message, kept)], superseded
+
+    envelopes = [
+        (
+            {
+                'title': n.title,
+                'body': n.body,
+                'data': {**n.data, 'kind': n.kind, 'notification_id': n.id},
+                'badge': len(kept),
+                'collapse_key': n.collapse_key,
+            },
+            [n],
+        )
+        for n in kept
+    ]
+    return envelopes, superseded
+
+
+def dispatch(batch_size=DISPATCH_BATCH_SIZE, transport=None):
+    """
+    Deliver one batch of due notifications. Returns a dict of counts by
+    outcome plus `messages` sent and `pruned` tokens.
+    """
+    transport = transport or transports.get_transport()
+    stats = {'claimed': 0, 'sent': 0, 'coalesced': 0, 'undeliverable': 0,
+             'retried': 0, 'failed': 0, 'messages': 0, 'pruned': 0}
+
+    batch = claim(batch_size)
+    if not batch:
+        return stats
+    stats['claimed'] = len(batch)
+
+    by_user = defaultdict(list)
+    for n in batch:
+        by_user[n.user_id].append(n)
+
+    tokens = defaultdict(set)
+    for user_id, token in DeviceRegistration.objects.filter(
+        user_id__in=by_user, is_active=True
+    ).exclude(push_token='').values_list('user_id', 'push_token'):
+        tokens[user_id].add(token)
+
+    outcome = {}  # notification id -> (status, error)
+    messages = []  # outgoing message dicts
+    delivers = []  # notifications each message covers
+    for user_id, notifications in by_user.items():
+        if not tokens[user_id]:
+            for n in notifications:
+                outcome[n.id] = ('undeliverable', 'No device with a push token')
+            continue
+        envelopes, superseded = _envelopes(notifications)
+        for n in superseded:
+            outcome[n.id] = ('coalesced', '')
+        for message, covered in envelopes:
+            for token in sorted(tokens[user_id]):
+                messages.append({**message, 'token': token})
+                delivers.append(covered)
+
+    # Per notification: any accepted message delivers it
+    results = defaultdict(list)
+    dead = set()
+    for start in range(0, len(messages), transport.batch_size):
+        chunk = messages[start:start + transport.batch_size]
+        for message, covered, (status, error) in zip(
+            chunk, delivers[start:start + transport.batch_size], transport.send(chunk)
+        ):
+            if status == transports.DEAD_TOKEN:
+                dead.add(message['token'])
+            for n in covered:
+                results[n.id].append((status, error))
+    stats['messages'] = len(messages)
+
+    for n_id, sends in results.items():
+        statuses = {status for status, _ in sends}
+        errors = '; '.join(sorted({error for _, error in sends if error}))
+        if transports.OK in statuses:
+            outcome[n_id] = ('sent', '')
+        elif transports.RETRY in statuses:
+            outcome[n_id] = ('retry', errors)
+        elif statuses == {transports.DEAD_TOKEN}:
+            outcome[n_id] = ('undeliverable', errors)
+        else:
+            outcome[n_id] = ('failed', errors)
+
+    if dead:
+        stats['pruned'] = DeviceRegistration.objects.filter(push_token__in=dead).update(push_token='')
+        logger.info(f"Pruned {stats['pruned']} dead push tokens")
+
+    _record(batch, outcome, stats)
+    return stats
+
+
+def _record(batch, outcome, stats):
+    now = timezone.now()
+    by_status = defaultdict(list)
+    retries = []
+    for n in batch:
+        status, error = outcome[n.id]
+        if status == 'retry':
+            n.attempts += 1
+            n.last_error = error[:1000]
+            if n.attempts >= MAX_ATTEMPTS:
+                n.status = 'failed'
+                stats['failed'] += 1
+            else:
+                n.available_at = now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (n.attempts - 1))
+                stats['retried'] += 1
+            retries.append(n)
+        else:
+            by_status[(status, error[:1000])].append(n.id)
+            stats[status] += 1
+
+    with transaction.atomic():
+        for (status, error), ids in by_status.items():
+            fields = {'status': status, 'last_error': error}
+            if status == 'sent':
+                fields['sent_at'] = now
+            Notification.objects.filter(id__in=ids).update(**fields)
+        if retries:
+            Notification.objects.bulk_update(retries, ['status', 'attempts', 'available_at', 'last_error'])
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications import dispatcher, transports
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued push notifications (run with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new notifications',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the outbox is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=dispatcher.DISPATCH_BATCH_SIZE,
+            help=f'Notifications claimed per pass (default: {dispatcher.DISPATCH_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--reminder-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between event reminder scans (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        # One transport for the whole run so its connections are reused
+        transport = transports.get_transport()
+        next_reminders = 0
+        try:
+            while True:
+                if time.monotonic() >= next_reminders:
+                    dispatcher.queue_event_reminders()
+                    next_reminders = time.monotonic() + options['reminder_interval']
+
+                stats = dispatcher.dispatch(options['batch_size'], transport=transport)
+                if stats['claimed']:
+                    self.stdout.write(
+                        f"Claimed {stats['claimed']}: {stats['sent']} sent, {stats['coalesced']} coalesced, "
+                        f"{stats['undeliverable']} undeliverable, {stats['retried']} retrying, "
+                        f"{stats['failed']} failed ({stats['messages']} messages, {stats['pruned']} tokens pruned)"
+                    )
+
+                if not options['loop']:
+                    if stats['claimed'] < options['batch_size']:
+                        break
+                elif stats['claimed'] < options['batch_size']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            transport.close()
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('new_message', 'New Message'), ('application_update', 'Application Update'), ('event_reminder', 'Event Reminder'), ('waitlist_promoted', 'Waitlist Promoted')], max_length=30)),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.CharField(blank=True, max_length=500)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('collapse_key', models.CharField(blank=True, max_length=100)),
+                ('dedupe_key', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('coalesced', 'Coalesced'), ('undeliverable', 'Undeliverable'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='notificatio_status_bb4971_idx'), models.Index(fields=['user', '-created_at'], name='notificatio_user_id_05b4bc_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('dedupe_key', ''), _negated=True), fields=('user', 'dedupe_key'), name='unique_notification_dedupe_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import models
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Notification(models.Model):
+    """
+    Outbox of push notifications.
+
+    Producers insert rows (in the same transaction as the change they
+    announce); the dispatcher worker delivers them to the user's devices.
+    """
+    
+    KIND_CHOICES = [
+        ('new_message', 'New Message'),
+        ('application_update', 'Application Update'),
+        ('event_reminder', 'Event Reminder'),
+        ('waitlist_promoted', 'Waitlist Promoted'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('coalesced', 'Coalesced'),
+        ('undeliverable', 'Undeliverable'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    title = models.CharField(max_length=200)
+    body = models.CharField(max_length=500, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    
+    # Pending notifications with the same collapse key replace each other
+    collapse_key = models.CharField(max_length=100, blank=True)
+    # At most one notification per user and dedupe key is ever queued
+    dedupe_key = models.CharField(max_length=100, blank=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Next time the dispatcher may pick this up (retry backoff / claim lease)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'dedupe_key'],
+                condition=~Q(dedupe_key=''),
+                name='unique_notification_dedupe_key',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} for {self.user_id} ({self.status})"
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from notifications.dispatcher import notify
+from opportunities.models import Application
+
+
+@receiver(post_save, sender=Application)
+def notify_application_decision(sender, instance, created, **kwargs):
+    """Tell the volunteer once when their application is accepted or rejected"""
+    if created or instance.status not in ('accepted', 'rejected'):
+        return
+    notify(
+        [instance.volunteer_id],
+        'application_update',
+        f"Application {instance.status}",
+        f"Your application for {instance.role.title} was {instance.status}.",
+        data={'application_id': instance.id, 'opportunity_id': str(instance.opportunity_id), 'status': instance.status},
+        collapse_key=f"application:{instance.id}",
+        dedupe_key=f"application:{instance.id}:{instance.status}",
+    )
@@ -0,0 +1,163 @@
+"""
+Push transports used by the notification dispatcher.
+
+A transport takes a batch of at most `batch_size` messages (dicts with
+`token`, `title`, `body`, `data`, `badge`, `collapse_key`) and returns one
+(status, error) pair per message:
+
+- OK: accepted by the provider;
+- DEAD_TOKEN: the token is no longer registered and should be dropped;
+- RETRY: temporary failure (rate limit, provider outage);
+- FAILED: permanent failure for this message.
+
+The transport class is chosen with settings.PUSH_TRANSPORT: ExpoTransport
+when EXPO_ACCESS_TOKEN is set, otherwise LocalTransport (which only records
+what it was given) in DEBUG. Production must configure one explicitly:
+`get_transport` raises ImproperlyConfigured otherwise, and `check --deploy`
+reports it (notifications.checks).
+"""
+
+import gzip
+import json
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MISSING_TRANSPORT = (
+    "Set PUSH_TRANSPORT (e.g. notifications.transports.ExpoTransport) or EXPO_ACCESS_TOKEN when DEBUG is off"
+)
+
+OK = 'ok'
+DEAD_TOKEN = 'dead_token'
+RETRY = 'retry'
+FAILED = 'failed'
+
+
+class PushTransport:
+    batch_size = 100
+
+    def send(self, messages):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalTransport(PushTransport):
+    """
+    Records batches in memory instead of sending them.
+    Tokens listed in `dead_tokens` are reported as unregistered.
+    """
+
+    def __init__(self, batch_size=100, dead_tokens=()):
+        self.batch_size = batch_size
+        self.dead_tokens = set(dead_tokens)
+        self.batches = []
+
+    @property
+    def sent(self):
+        return [message for batch in self.batches for message in batch]
+
+    def send(self, messages):
+        self.batches.append(list(messages))
+        for message in messages:
+            logger.debug(f"Push to {message['token'][:12]}…: {message['title']}")
+        return [
+            (DEAD_TOKEN, 'DeviceNotRegistered') if message['token'] in self.dead_tokens else (OK, '')
+            for message in messages
+        ]
+
+
+class ExpoTransport(PushTransport):
+    """
+    Expo push service: up to 100 messages per request, gzipped, over one
+    pooled keep-alive session reused for the life of the worker.
+    """
+
+    URL = 'https://exp.host/--/api/v2/push/send'
+    batch_size = 100
+    timeout = 15
+
+    # Per-message error codes worth another attempt later
+    RETRY_ERRORS = {'MessageRateExceeded'}
+
+    def __init__(self, access_token=None, pool_size=4):
+        self.access_token = access_token if access_token is not None else settings.EXPO_ACCESS_TOKEN
+        self.pool_size = pool_size
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+            session.headers.update({
+                'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip',
+            })
+            if self.access_token:
+                session.headers['Authorization'] = f'Bearer {self.access_token}'
+            self._session = session
+        return self._session
+
+    def _payload(self, message):
+        payload = {
+            'to': message['token'],
+            'title': message['title'],
+            'body': message['body'],
+            'data': message['data'],
+            'sound': 'default',
+        }
+        if message.get('badge') is not None:
+            payload['badge'] = message['badge']
+        if message.get('collapse_key'):
+            payload['collapseId'] = message['collapse_key'][:64]
+        return payload
+
+    def send(self, messages):
+        body = gzip.compress(json.dumps([self._payload(m) for m in messages]).encode())
+        try:
+            response = self.session.post(self.URL, data=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            return [(RETRY, str(e))] * len(messages)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            return [(RETRY, f"HTTP {response.status_code}")] * len(messages)
+        if response.status_code != 200:
+            logger.error(f"Expo push rejected batch: HTTP {response.status_code} {response.text[:200]}")
+            return [(FAILED, f"HTTP {response.status_code}")] * len(messages)
+
+        tickets = response.json().get('data', [])
+        results = []
+        for index in range(len(messages)):
+            ticket = tickets[index] if index < len(tickets) else {}
+            if ticket.get('status') == 'ok':
+                results.append((OK, ''))
+                continue
+            error = ticket.get('details', {}).get('error') or ticket.get('message') or 'No ticket returned'
+            if error == 'DeviceNotRegistered':
+                results.append((DEAD_TOKEN, error))
+            elif error in self.RETRY_ERRORS or not ticket:
+                results.append((RETRY, error))
+            else:
+                results.append((FAILED, error))
+        return results
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def get_transport():
+    if not settings.PUSH_TRANSPORT:
+        raise ImproperlyConfigured(MISSING_TRANSPORT)
+    return import_string(settings.PUSH_TRANSPORT)()
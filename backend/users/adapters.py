@@ -5,6 +5,8 @@ from django.contrib.auth import get_user_model
 from django.http import JsonResponse
 import logging
 
+from users.social import get_http_session, social_apps
+
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,20 @@ class SocialAccountAdapter(DefaultSocialAccountAdapter):
         """Allow social account signup"""
         return True
     
+    def get_requests_session(self):
+        """Share one pooled session per worker thread instead of one per call"""
+        return get_http_session()
+    
+    def list_apps(self, request, provider=None, client_id=None):
+        """Serve provider app configs from the in-process cache"""
+        key = (request is not None, provider, client_id)
+        return social_apps.get_or_load(
+            key,
+            lambda: super(SocialAccountAdapter, self).list_apps(
+                request, provider=provider, client_id=client_id
+            ),
+        )
+    
     def pre_social_login(self, request, sociallogin):
         """Handle user linking before social login"""
         # Get user from social account if exists
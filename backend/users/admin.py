@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, UserProfile, Skill, UserSkill
+from .models import User, UserProfile, Skill, UserSkill, RefreshToken
 
 
 class UserProfileInline(admin.StackedInline):
@@ -35,3 +35,12 @@ class UserSkillAdmin(admin.ModelAdmin):
     list_filter = ['proficiency_level', 'is_verified']
     search_fields = ['user__username', 'skill__name']
     raw_id_fields = ['user', 'skill', 'verified_by']
+
+
+@admin.register(RefreshToken)
+class RefreshTokenAdmin(admin.ModelAdmin):
+    list_display = ['user', 'session_id', 'created_at', 'expires_at', 'rotated_at', 'revoked_at']
+    list_filter = ['revoked_at']
+    search_fields = ['user__username', 'session_id']
+    raw_id_fields = ['user']
+    readonly_fields = ['token_hash', 'session_id', 'created_at']
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import RefreshToken
+
+
+class Command(BaseCommand):
+    help = 'Delete refresh tokens that expired or were rotated/revoked long enough ago'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-days',
+            type=int,
+            default=7,
+            help='Keep rotated/revoked tokens this long so reuse can still be detected'
+        )
+    
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['grace_days'])
+        
+        deleted, _ = RefreshToken.objects.filter(
+            Q(expires_at__lt=now) | Q(revoked_at__lt=cutoff) | Q(rotated_at__lt=cutoff)
+        ).delete()
+        
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} refresh tokens'))
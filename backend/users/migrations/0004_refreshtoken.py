@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-19 05:29
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_rename_auth_user_user_ty_90c0e9_idx_users_user_user_ty_4573bb_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_hash', models.CharField(max_length=64, unique=True)),
+                ('session_id', models.UUIDField(default=uuid.uuid4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('rotated_at', models.DateTimeField(blank=True, null=True)),
+                ('revoked_at', models.DateTimeField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refresh_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['session_id'], name='users_refre_session_331aac_idx'), models.Index(fields=['user', 'revoked_at'], name='users_refre_user_id_2e316d_idx'), models.Index(fields=['expires_at'], name='users_refre_expires_cdd00d_idx')],
+            },
+        ),
+    ]
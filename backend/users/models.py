@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import RegexValidator
+from django.utils import timezone
 import uuid
 
 
@@ -139,3 +140,40 @@ class UserSkill(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.skill.name} ({self.get_proficiency_level_display()})"
+
+
+class RefreshToken(models.Model):
+    """
+    Rotating refresh tokens for JWT sessions.
+    Only a SHA-256 hash of the token is stored; every token issued for the
+    same login shares a session_id so a whole session can be revoked at once.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='refresh_tokens')
+    token_hash = models.CharField(max_length=64, unique=True)
+    session_id = models.UUIDField(default=uuid.uuid4)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    rotated_at = models.DateTimeField(null=True, blank=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+    
+    user_agent = models.CharField(max_length=255, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['session_id']),
+            models.Index(fields=['user', 'revoked_at']),
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - session {self.session_id}"
+    
+    def is_usable(self):
+        """A token can be exchanged once, before it expires, unless revoked"""
+        return (
+            self.rotated_at is None
+            and self.revoked_at is None
+            and self.expires_at > timezone.now()
+        )
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from allauth.socialaccount.models import SocialApp
+
+from users.social import social_apps
+
+
+@receiver(post_save, sender=SocialApp)
+@receiver(post_delete, sender=SocialApp)
+@receiver(m2m_changed, sender=SocialApp.sites.through)
+def invalidate_social_apps(sender, **kwargs):
+    """Provider config edits (admin or setup_social_providers) clear the app cache"""
+    social_apps.invalidate()
@@ -0,0 +1,204 @@
+"""
+Outbound HTTP and provider metadata caching for social login.
+
+Every social login used to build a fresh `requests.Session` (no connection
+reuse), look the provider's SocialApp up in the database and download the
+provider's signing keys before it could verify an id_token. This module keeps
+one pooled session per worker thread, memoises provider app lookups until an
+admin edits them, and caches the Google/Apple key sets and OIDC discovery
+documents so id_tokens are verified locally.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.cache import cache
+from allauth.socialaccount import app_settings
+from allauth.socialaccount.providers.google.views import CERTS_URL as GOOGLE_CERTS_URL
+from allauth.socialaccount.providers.apple.views import AppleOAuth2Adapter
+
+logger = logging.getLogger(__name__)
+
+
+# Documents that change rarely and are fetched on every id_token verification
+CACHED_DOCUMENT_URLS = frozenset([
+    GOOGLE_CERTS_URL,
+    'https://www.googleapis.com/oauth2/v3/certs',
+    'https://accounts.google.com/.well-known/openid-configuration',
+    AppleOAuth2Adapter.public_key_url,
+    'https://appleid.apple.com/.well-known/openid-configuration',
+])
+
+DOCUMENT_DEFAULT_TTL = 3600
+DOCUMENT_MAX_TTL = 24 * 3600
+DOCUMENT_CACHE_KEY = "social_doc:{digest}"
+
+SOCIAL_APPS_GENERATION_KEY = "social_apps_generation"
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def _document_ttl(response):
+    """Honour the provider's Cache-Control max-age, within sane bounds"""
+    match = _MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+    if not match:
+        return DOCUMENT_DEFAULT_TTL
+    return max(60, min(int(match.group(1)), DOCUMENT_MAX_TTL))
+
+
+def _cached_response(url, content):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = content
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+class ProviderSession(requests.Session):
+    """
+    Pooled session used for all provider traffic.
+
+    Requests get the allauth timeout by default, idempotent GETs are retried
+    on transient gateway errors, and GETs for the documents listed in
+    CACHED_DOCUMENT_URLS are answered from cache.
+    """
+
+    def __init__(self):
+        super().__init__()
+        retries = Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(['GET']),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=getattr(settings, 'SOCIAL_HTTP_POOL_CONNECTIONS', 10),
+            pool_maxsize=getattr(settings, 'SOCIAL_HTTP_POOL_MAXSIZE', 10),
+            max_retries=retries,
+        )
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', app_settings.REQUESTS_TIMEOUT)
+        if method.upper() == 'GET' and url in CACHED_DOCUMENT_URLS and not kwargs.get('params'):
+            return self._get_document(url, **kwargs)
+        return super().request(method, url, **kwargs)
+
+    def _get_document(self, url, **kwargs):
+        content = _documents.get(url)
+        if content is not None:
+            return _cached_response(url, content)
+
+        response = super().request('GET', url, **kwargs)
+        if response.ok:
+            _documents.set(url, response.content, _document_ttl(response))
+        return response
+
+
+class DocumentCache:
+    """
+    Two-level cache for provider documents: a per-process dict in front of
+    the shared cache, so most lookups never leave the worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+
+    @staticmethod
+    def _key(url):
+        return DOCUMENT_CACHE_KEY.format(digest=hashlib.sha1(url.encode()).hexdigest())
+
+    def get(self, url):
+        entry = self._local.get(url)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        shared = cache.get(self._key(url))
+        if shared is None:
+            return None
+        content, expires_at = shared
+        ttl = expires_at - time.time()
+        if ttl <= 0:
+            return None
+        with self._lock:
+            self._local[url] = (time.monotonic() + ttl, content)
+        return content
+
+    def set(self, url, content, ttl):
+        with self._lock:
+            self._local[url] = (time.monotonic() + ttl, content)
+        cache.set(self._key(url), (content, time.time() + ttl), ttl)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        cache.delete_many([self._key(url) for url in CACHED_DOCUMENT_URLS])
+
+
+_documents = DocumentCache()
+_thread_local = threading.local()
+
+
+def get_http_session():
+    """Return this thread's pooled provider session"""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = _thread_local.session = ProviderSession()
+    return session
+
+
+def clear_provider_documents():
+    """Force the next id_token verification to refetch provider keys"""
+    _documents.clear()
+
+
+class SocialAppCache:
+    """
+    Per-process memo of `list_apps` results.
+
+    Entries are keyed by a generation counter kept in the shared cache, so an
+    admin edit in any worker invalidates the memo in every worker at the cost
+    of one cache read per lookup instead of a database query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._apps = {}
+        self._generation = None
+
+    def get_or_load(self, key, loader):
+        generation = cache.get(SOCIAL_APPS_GENERATION_KEY, 0)
+        with self._lock:
+            if generation != self._generation:
+                self._apps = {}
+                self._generation = generation
+            apps = self._apps.get(key)
+        if apps is None:
+            apps = loader()
+            with self._lock:
+                if generation == self._generation:
+                    self._apps[key] = apps
+        return list(apps)
+
+    def invalidate(self):
+        cache.add(SOCIAL_APPS_GENERATION_KEY, 0, None)
+        try:
+            cache.incr(SOCIAL_APPS_GENERATION_KEY)
+        except ValueError:
+            cache.set(SOCIAL_APPS_GENERATION_KEY, 1, None)
+        with self._lock:
+            self._apps = {}
+            self._generation = None
+
+
+social_apps = SocialAppCache()
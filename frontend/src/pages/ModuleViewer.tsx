@@ -55,8 +55,8 @@ export function ModuleViewer() {
   });
 
   const { data: questions } = useQuery({
-    queryKey: ['quiz-questions', quiz?.id],
-    queryFn: () => lmsApi.getQuizQuestions(quiz!.id),
+    queryKey: ['quiz-questions', quiz?.id, quizAttempt?.id],
+    queryFn: () => lmsApi.getQuizQuestions(quiz!.id, quizAttempt!.id),
     enabled: !!quiz?.id && !!quizAttempt,
   });
 
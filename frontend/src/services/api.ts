@@ -32,6 +32,8 @@ export interface RegisterData {
 
 export interface AuthToken {
   access_token: string;
+  refresh_token: string;
+  expires_in: number;
   token_type: string;
   user_id: string;
   username: string;
@@ -157,15 +159,55 @@ export class ApiError extends Error {
 
 // Token management
 const TOKEN_KEY = 'mishmob_auth_token';
+const REFRESH_TOKEN_KEY = 'mishmob_refresh_token';
 
 export const tokenManager = {
   getToken: () => localStorage.getItem(TOKEN_KEY),
   setToken: (token: string) => localStorage.setItem(TOKEN_KEY, token),
-  removeToken: () => localStorage.removeItem(TOKEN_KEY),
+  getRefreshToken: () => localStorage.getItem(REFRESH_TOKEN_KEY),
+  setTokens: (tokens: { access_token: string; refresh_token?: string }) => {
+    localStorage.setItem(TOKEN_KEY, tokens.access_token);
+    if (tokens.refresh_token) {
+      localStorage.setItem(REFRESH_TOKEN_KEY, tokens.refresh_token);
+    }
+  },
+  removeToken: () => {
+    localStorage.removeItem(TOKEN_KEY);
+    localStorage.removeItem(REFRESH_TOKEN_KEY);
+  },
 };
 
+// Access tokens are short-lived; concurrent 401s share one refresh request
+let refreshInFlight: Promise<boolean> | null = null;
+
+async function refreshAccessToken(): Promise<boolean> {
+  const refreshToken = tokenManager.getRefreshToken();
+  if (!refreshToken) return false;
+
+  if (!refreshInFlight) {
+    refreshInFlight = fetch(`${API_BASE_URL}/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    })
+      .then(async (response) => {
+        if (!response.ok) {
+          tokenManager.removeToken();
+          return false;
+        }
+        tokenManager.setTokens(await response.json());
+        return true;
+      })
+      .catch(() => false)
+      .finally(() => {
+        refreshInFlight = null;
+      });
+  }
+  return refreshInFlight;
+}
+
 // Base fetch function with auth headers
-async function fetchWithAuth(url: string, options: RequestInit = {}) {
+async function fetchWithAuth(url: string, options: RequestInit = {}, retry = true): Promise<any> {
   const token = tokenManager.getToken();
   
   console.log('fetchWithAuth called:', { url, hasToken: !!token });
@@ -182,6 +224,10 @@ async function fetchWithAuth(url: string, options: RequestInit = {}) {
     headers,
   });
 
+  if (response.status === 401 && token && retry && await refreshAccessToken()) {
+    return fetchWithAuth(url, options, false);
+  }
+
   if (!response.ok) {
     const errorText = await response.text();
     let errorMessage = errorText;
@@ -207,7 +253,7 @@ export const authApi = {
       body: JSON.stringify(credentials),
     });
     
-    tokenManager.setToken(response.access_token);
+    tokenManager.setTokens(response);
     return response;
   },
 
@@ -219,7 +265,10 @@ export const authApi = {
   },
 
   async logout(): Promise<void> {
-    await fetchWithAuth('/auth/logout', { method: 'POST' });
+    await fetchWithAuth('/auth/logout', {
+      method: 'POST',
+      body: JSON.stringify({ refresh_token: tokenManager.getRefreshToken() }),
+    });
     tokenManager.removeToken();
   },
 
@@ -632,8 +681,9 @@ export const lmsApi = {
     return fetchWithAuth(`/lms/modules/${moduleId}/quiz`);
   },
 
-  async getQuizQuestions(quizId: number): Promise<Question[]> {
-    return fetchWithAuth(`/lms/quizzes/${quizId}/questions`);
+  async getQuizQuestions(quizId: number, attemptId?: number): Promise<Question[]> {
+    const query = attemptId ? `?attempt_id=${attemptId}` : '';
+    return fetchWithAuth(`/lms/quizzes/${quizId}/questions${query}`);
   },
 
   async startQuizAttempt(quizId: number): Promise<QuizAttempt> {
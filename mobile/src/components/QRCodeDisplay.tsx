@@ -1,6 +1,8 @@
 import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { View, Image, StyleSheet, ActivityIndicator, Text, Platform } from 'react-native';
 import { ticketsApi } from '../services/api';
+import { TicketCodeConfig, getTicketCodeConfig } from '../services/ticketCodes';
+import RotatingQRCode from './RotatingQRCode';
 
 interface QRCodeDisplayProps {
   ticketId: string;
@@ -14,7 +16,38 @@ interface QRCodeData {
   valid_seconds: number;
 }
 
-export default function QRCodeDisplay({ 
+// Prefer device-generated rotating codes; fall back to server-rendered QR images
+export default function QRCodeDisplay(props: QRCodeDisplayProps) {
+  const [codeConfig, setCodeConfig] = useState<TicketCodeConfig | null | undefined>(undefined);
+
+  useEffect(() => {
+    let cancelled = false;
+    setCodeConfig(undefined);
+    getTicketCodeConfig(props.ticketId).then(config => {
+      if (!cancelled) setCodeConfig(config);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [props.ticketId]);
+
+  if (codeConfig === undefined) {
+    const size = props.size ?? 200;
+    return (
+      <View style={[styles.container, { width: size, height: size }]}>
+        <ActivityIndicator size="large" color="#3B82F6" />
+      </View>
+    );
+  }
+
+  if (codeConfig) {
+    return <RotatingQRCode config={codeConfig} size={props.size} />;
+  }
+
+  return <ServerQRCode {...props} />;
+}
+
+function ServerQRCode({ 
   ticketId, 
   size = 200, 
   autoRefresh = true 
@@ -0,0 +1,59 @@
+import React, { useState, useEffect } from 'react';
+import { View, StyleSheet, Text } from 'react-native';
+import QRCode from 'react-native-qrcode-svg';
+import { TicketCodeConfig, generateCode, secondsUntilRotation } from '../services/ticketCodes';
+
+interface RotatingQRCodeProps {
+  config: TicketCodeConfig;
+  size?: number;
+}
+
+// Renders the ticket's rotating check-in code entirely on the device
+export default function RotatingQRCode({ config, size = 200 }: RotatingQRCodeProps) {
+  const [code, setCode] = useState(() => generateCode(config));
+  const [countdown, setCountdown] = useState(() => secondsUntilRotation(config));
+
+  useEffect(() => {
+    const interval = setInterval(() => {
+      setCode(generateCode(config));
+      setCountdown(secondsUntilRotation(config));
+    }, 1000);
+    return () => clearInterval(interval);
+  }, [config]);
+
+  return (
+    <View style={[styles.container, { width: size, height: size }]}>
+      <QRCode value={`${config.payload_prefix}${code}`} size={size - 60} />
+      <View style={styles.countdownContainer}>
+        <Text style={styles.countdownText}>Refreshes in {countdown}s</Text>
+      </View>
+    </View>
+  );
+}
+
+const styles = StyleSheet.create({
+  container: {
+    backgroundColor: 'white',
+    padding: 20,
+    borderRadius: 12,
+    justifyContent: 'center',
+    alignItems: 'center',
+    shadowColor: '#000',
+    shadowOffset: { width: 0, height: 2 },
+    shadowOpacity: 0.1,
+    shadowRadius: 4,
+    elevation: 3,
+  },
+  countdownContainer: {
+    marginTop: 12,
+    paddingHorizontal: 12,
+    paddingVertical: 6,
+    backgroundColor: '#3B82F6',
+    borderRadius: 16,
+  },
+  countdownText: {
+    color: 'white',
+    fontSize: 11,
+    fontWeight: '600',
+  },
+});
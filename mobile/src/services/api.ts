@@ -65,9 +65,25 @@ export const tokenManager = {
     }
   },
   
+  async getRefreshToken(): Promise<string | null> {
+    try {
+      return await AsyncStorage.getItem('refresh_token');
+    } catch (error) {
+      console.error('Failed to get refresh token:', error);
+      return null;
+    }
+  },
+  
+  async setTokens(tokens: { access_token: string; refresh_token?: string }): Promise<void> {
+    await tokenManager.setToken(tokens.access_token);
+    if (tokens.refresh_token) {
+      await AsyncStorage.setItem('refresh_token', tokens.refresh_token);
+    }
+  },
+  
   async removeToken(): Promise<void> {
     try {
-      await AsyncStorage.removeItem('auth_token');
+      await AsyncStorage.multiRemove(['auth_token', 'refresh_token']);
     } catch (error) {
       console.error('Failed to remove token:', error);
       throw error;
@@ -75,8 +91,37 @@ export const tokenManager = {
   },
 };
 
+// Access tokens are short-lived; concurrent 401s share one refresh request
+let refreshInFlight: Promise<boolean> | null = null;
+
+async function refreshAccessToken(): Promise<boolean> {
+  const refreshToken = await tokenManager.getRefreshToken();
+  if (!refreshToken) return false;
+
+  if (!refreshInFlight) {
+    refreshInFlight = fetch(`${API_BASE_URL}/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    })
+      .then(async (response) => {
+        if (!response.ok) {
+          await tokenManager.removeToken();
+          return false;
+        }
+        await tokenManager.setTokens(await response.json());
+        return true;
+      })
+      .catch(() => false)
+      .finally(() => {
+        refreshInFlight = null;
+      });
+  }
+  return refreshInFlight;
+}
+
 // Base fetch function with timeout
-async function fetchWithAuth(url: string, options: RequestInit = {}) {
+async function fetchWithAuth(url: string, options: RequestInit = {}, retry = true): Promise<any> {
   const token = await tokenManager.getToken();
   
   const headers = {
@@ -105,6 +150,10 @@ async function fetchWithAuth(url: string, options: RequestInit = {}) {
     console.log('Response status:', response.status);
     console.log('Response headers:', response.headers);
 
+    if (response.status === 401 && token && retry && await refreshAccessToken()) {
+      return fetchWithAuth(url, options, false);
+    }
+
     if (!response.ok) {
       const errorText = await response.text();
       console.error('Error response:', errorText);
@@ -141,7 +190,7 @@ export const authApi = {
         throw new Error('No access token received');
       }
       
-      await tokenManager.setToken(response.access_token);
+      await tokenManager.setTokens(response);
       return response;
     } catch (error: any) {
       console.error('Login failed:', error.message);
@@ -157,7 +206,10 @@ export const authApi = {
   },
 
   async logout() {
-    await fetchWithAuth('/auth/logout', { method: 'POST' });
+    await fetchWithAuth('/auth/logout', {
+      method: 'POST',
+      body: JSON.stringify({ refresh_token: await tokenManager.getRefreshToken() }),
+    });
     await tokenManager.removeToken();
   },
 
@@ -188,10 +240,18 @@ export const eventsApi = {
     return fetchWithAuth('/events/my-tickets');
   },
   
-  async registerForEvent(opportunityId: string, deviceInfo?: any) {
+  // Pass the same idempotencyKey when retrying so a lost response can't double-register
+  async registerForEvent(opportunityId: string, deviceInfo?: any, idempotencyKey?: string) {
     return fetchWithAuth(`/opportunities/${opportunityId}/register-for-event`, {
       method: 'POST',
       body: JSON.stringify(deviceInfo || {}),
+      ...(idempotencyKey && { headers: { 'Idempotency-Key': idempotencyKey } }),
+    });
+  },
+
+  async leaveWaitlist(opportunityId: string) {
+    return fetchWithAuth(`/opportunities/${opportunityId}/waitlist`, {
+      method: 'DELETE',
     });
   },
 
@@ -205,6 +265,24 @@ export const eventsApi = {
       body: JSON.stringify(scanData),
     });
   },
+
+  async getScannerManifest(eventId: number) {
+    return fetchWithAuth(`/events/${eventId}/scanner-manifest`);
+  },
+
+  async syncScans(eventId: number, manifestSignature: string, scans: any[]) {
+    return fetchWithAuth(`/events/${eventId}/scanner-sync`, {
+      method: 'POST',
+      body: JSON.stringify({ manifest_signature: manifestSignature, scans }),
+    });
+  },
+
+  async checkInBatch(scans: { scan_id?: string; qr_token: string; latitude?: number; longitude?: number }[]) {
+    return fetchWithAuth('/events/check-in/batch', {
+      method: 'POST',
+      body: JSON.stringify({ scans }),
+    });
+  },
 };
 
 // Tickets API
@@ -213,6 +291,19 @@ export const ticketsApi = {
     return fetchWithAuth(`/tickets/${ticketId}/qr-code`);
   },
 
+  async cancelTicket(ticketId: string) {
+    return fetchWithAuth(`/tickets/${ticketId}/cancel`, {
+      method: 'POST',
+    });
+  },
+
+  async issueCodeSecret(ticketId: string, reissue = false) {
+    return fetchWithAuth(`/tickets/${ticketId}/code-secret`, {
+      method: 'POST',
+      body: JSON.stringify({ reissue }),
+    });
+  },
+
   async scanTicket(scanData: {
     qr_token: string;
     event_id?: string;
@@ -230,6 +321,21 @@ export const ticketsApi = {
   },
 };
 
+// Devices API
+export const devicesApi = {
+  async getMyDevices() {
+    return fetchWithAuth('/devices');
+  },
+
+  // Register this install for push notifications; pass an empty token to opt out
+  async setPushToken(deviceId: string, pushToken: string) {
+    return fetchWithAuth(`/devices/${deviceId}/push-token`, {
+      method: 'PUT',
+      body: JSON.stringify({ push_token: pushToken }),
+    });
+  },
+};
+
 // User Verification API
 export const verificationApi = {
   async verifyIdentity(idImageUri: string, selfieImageUri: string) {
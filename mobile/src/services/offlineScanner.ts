@@ -0,0 +1,150 @@
+import AsyncStorage from '@react-native-async-storage/async-storage';
+import { eventsApi } from './api';
+
+// Offline scanner mode: validate scans against a downloaded event manifest,
+// queue the results locally and upload them in batches when back online.
+
+export interface ScannerManifest {
+  version: number;
+  event_id: number;
+  issued_at: number;
+  check_in_opens_at: number;
+  check_in_closes_at: number;
+  code_period: number;
+  code_prefix: string;
+  flags: { verified: number; checked_in: number; rotating_codes: number };
+  tickets: [string, number][];
+  signature: string;
+}
+
+export interface QueuedScan {
+  scan_id: string;
+  qr_token: string;
+  scanned_at: string;
+  latitude?: number;
+  longitude?: number;
+}
+
+export interface LocalScanResult {
+  accepted: boolean;
+  message: string;
+  ticketId?: string;
+}
+
+const SYNC_BATCH_SIZE = 500;
+
+const manifestKey = (eventId: number) => `scanner_manifest:${eventId}`;
+const queueKey = (eventId: number) => `scanner_queue:${eventId}`;
+const seenKey = (eventId: number) => `scanner_seen:${eventId}`;
+
+function uuid4(): string {
+  return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, c => {
+    const r = (Math.random() * 16) | 0;
+    return (c === 'x' ? r : (r & 0x3) | 0x8).toString(16);
+  });
+}
+
+function ticketIdFromToken(qrToken: string, prefix: string): { ticketHex: string | null; expired: boolean } {
+  if (qrToken.startsWith(`${prefix}:`)) {
+    const parts = qrToken.split(':');
+    return { ticketHex: parts.length === 3 ? parts[1] : null, expired: false };
+  }
+  // Server-issued JWT: read (not verify) the claims; the server verifies on sync
+  try {
+    const body = qrToken.split('.')[1].replace(/-/g, '+').replace(/_/g, '/');
+    const claims = JSON.parse(atob(body));
+    return {
+      ticketHex: String(claims.ticket_id).replace(/-/g, ''),
+      expired: Date.now() / 1000 > claims.exp + 5,
+    };
+  } catch {
+    return { ticketHex: null, expired: false };
+  }
+}
+
+export async function downloadManifest(eventId: number): Promise<ScannerManifest> {
+  const manifest: ScannerManifest = await eventsApi.getScannerManifest(eventId);
+  await AsyncStorage.setItem(manifestKey(eventId), JSON.stringify(manifest));
+  return manifest;
+}
+
+export async function loadManifest(eventId: number): Promise<ScannerManifest | null> {
+  const stored = await AsyncStorage.getItem(manifestKey(eventId));
+  return stored ? JSON.parse(stored) : null;
+}
+
+/**
+ * Validate a scan against the manifest and queue it for upload.
+ * Local validation is advisory; the server has the final say on sync.
+ */
+export async function scanOffline(
+  manifest: ScannerManifest,
+  qrToken: string,
+  location?: { latitude: number; longitude: number },
+): Promise<LocalScanResult> {
+  const { ticketHex, expired } = ticketIdFromToken(qrToken, manifest.code_prefix);
+  const entry = ticketHex ? manifest.tickets.find(([id]) => id === ticketHex) : undefined;
+
+  let result: LocalScanResult;
+  const seen: string[] = JSON.parse((await AsyncStorage.getItem(seenKey(manifest.event_id))) || '[]');
+  const now = Date.now() / 1000;
+
+  if (!entry) {
+    result = { accepted: false, message: 'Ticket not found for this event' };
+  } else if (expired) {
+    result = { accepted: false, message: 'Token expired', ticketId: ticketHex! };
+  } else if ((entry[1] & manifest.flags.checked_in) || seen.includes(ticketHex!)) {
+    result = { accepted: false, message: 'Already checked in', ticketId: ticketHex! };
+  } else if (!(entry[1] & manifest.flags.verified)) {
+    result = { accepted: false, message: 'User verification required', ticketId: ticketHex! };
+  } else if (now < manifest.check_in_opens_at || now > manifest.check_in_closes_at) {
+    result = { accepted: false, message: 'Check-in is not open for this event', ticketId: ticketHex! };
+  } else {
+    result = { accepted: true, message: 'Checked in (pending sync)', ticketId: ticketHex! };
+    seen.push(ticketHex!);
+    await AsyncStorage.setItem(seenKey(manifest.event_id), JSON.stringify(seen));
+  }
+
+  // Every scan is queued, rejected ones included, so the audit log stays complete
+  const queue: QueuedScan[] = JSON.parse((await AsyncStorage.getItem(queueKey(manifest.event_id))) || '[]');
+  queue.push({
+    scan_id: uuid4(),
+    qr_token: qrToken,
+    scanned_at: new Date().toISOString(),
+    ...(location || {}),
+  });
+  await AsyncStorage.setItem(queueKey(manifest.event_id), JSON.stringify(queue));
+
+  return result;
+}
+
+export async function pendingScanCount(eventId: number): Promise<number> {
+  const queue: QueuedScan[] = JSON.parse((await AsyncStorage.getItem(queueKey(eventId))) || '[]');
+  return queue.length;
+}
+
+/**
+ * Upload queued scans. Scans are removed from the queue only after the
+ * server acknowledged them; re-sending is safe because scan ids are
+ * idempotency keys.
+ */
+export async function syncPendingScans(eventId: number): Promise<any[]> {
+  const manifest = await loadManifest(eventId);
+  if (!manifest) return [];
+
+  const results: any[] = [];
+  let queue: QueuedScan[] = JSON.parse((await AsyncStorage.getItem(queueKey(eventId))) || '[]');
+
+  while (queue.length > 0) {
+    const batch = queue.slice(0, SYNC_BATCH_SIZE);
+    const response = await eventsApi.syncScans(eventId, manifest.signature, batch);
+    results.push(...response.results);
+
+    const synced = new Set(batch.map(scan => scan.scan_id));
+    queue = JSON.parse((await AsyncStorage.getItem(queueKey(eventId))) || '[]')
+      .filter((scan: QueuedScan) => !synced.has(scan.scan_id));
+    await AsyncStorage.setItem(queueKey(eventId), JSON.stringify(queue));
+  }
+
+  return results;
+}
@@ -0,0 +1,133 @@
+import AsyncStorage from '@react-native-async-storage/async-storage';
+import { ticketsApi } from './api';
+
+// Rotating check-in codes (RFC 6238 TOTP) generated on the device.
+// The server hands out a per-ticket secret once; after that the QR code
+// rotates without any network traffic.
+
+export interface TicketCodeConfig {
+  ticket_id: string;
+  secret: string;
+  algorithm: string;
+  digits: number;
+  period: number;
+  payload_prefix: string;
+}
+
+const storageKey = (ticketId: string) => `ticket_code:${ticketId}`;
+
+function sha1(message: Uint8Array): Uint8Array {
+  const length = message.length;
+  const words = new Uint32Array((((length + 8) >> 6) + 1) * 16);
+  for (let i = 0; i < length; i++) {
+    words[i >> 2] |= message[i] << (24 - (i % 4) * 8);
+  }
+  words[length >> 2] |= 0x80 << (24 - (length % 4) * 8);
+  words[words.length - 1] = length * 8;
+
+  let h0 = 0x67452301, h1 = 0xefcdab89, h2 = 0x98badcfe, h3 = 0x10325476, h4 = 0xc3d2e1f0;
+  const w = new Uint32Array(80);
+  const rotl = (x: number, n: number) => (x << n) | (x >>> (32 - n));
+
+  for (let block = 0; block < words.length; block += 16) {
+    for (let t = 0; t < 16; t++) w[t] = words[block + t];
+    for (let t = 16; t < 80; t++) w[t] = rotl(w[t - 3] ^ w[t - 8] ^ w[t - 14] ^ w[t - 16], 1);
+
+    let a = h0, b = h1, c = h2, d = h3, e = h4;
+    for (let t = 0; t < 80; t++) {
+      let f: number, k: number;
+      if (t < 20) { f = (b & c) | (~b & d); k = 0x5a827999; }
+      else if (t < 40) { f = b ^ c ^ d; k = 0x6ed9eba1; }
+      else if (t < 60) { f = (b & c) | (b & d) | (c & d); k = 0x8f1bbcdc; }
+      else { f = b ^ c ^ d; k = 0xca62c1d6; }
+      const temp = (rotl(a, 5) + f + e + k + w[t]) >>> 0;
+      e = d; d = c; c = rotl(b, 30) >>> 0; b = a; a = temp;
+    }
+    h0 = (h0 + a) >>> 0; h1 = (h1 + b) >>> 0; h2 = (h2 + c) >>> 0;
+    h3 = (h3 + d) >>> 0; h4 = (h4 + e) >>> 0;
+  }
+
+  const out = new Uint8Array(20);
+  [h0, h1, h2, h3, h4].forEach((h, i) => {
+    out[i * 4] = h >>> 24; out[i * 4 + 1] = h >>> 16; out[i * 4 + 2] = h >>> 8; out[i * 4 + 3] = h;
+  });
+  return out;
+}
+
+function hmacSha1(key: Uint8Array, message: Uint8Array): Uint8Array {
+  const block = new Uint8Array(64);
+  block.set(key.length > 64 ? sha1(key) : key);
+  const inner = new Uint8Array(64 + message.length);
+  const outer = new Uint8Array(64 + 20);
+  for (let i = 0; i < 64; i++) {
+    inner[i] = block[i] ^ 0x36;
+    outer[i] = block[i] ^ 0x5c;
+  }
+  inner.set(message, 64);
+  outer.set(sha1(inner), 64);
+  return sha1(outer);
+}
+
+function base32Decode(input: string): Uint8Array {
+  const alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567';
+  const clean = input.replace(/=+$/, '').toUpperCase();
+  const bytes: number[] = [];
+  let bits = 0, value = 0;
+  for (const char of clean) {
+    value = (value << 5) | alphabet.indexOf(char);
+    bits += 5;
+    if (bits >= 8) {
+      bytes.push((value >>> (bits - 8)) & 0xff);
+      bits -= 8;
+    }
+  }
+  return new Uint8Array(bytes);
+}
+
+export function generateCode(config: TicketCodeConfig, now: number = Date.now()): string {
+  let step = Math.floor(now / 1000 / config.period);
+  const counter = new Uint8Array(8);
+  for (let i = 7; i >= 0; i--) {
+    counter[i] = step & 0xff;
+    step = Math.floor(step / 256);
+  }
+  const digest = hmacSha1(base32Decode(config.secret), counter);
+  const offset = digest[19] & 0x0f;
+  const binary = ((digest[offset] & 0x7f) << 24) | (digest[offset + 1] << 16)
+    | (digest[offset + 2] << 8) | digest[offset + 3];
+  return String(binary % 10 ** config.digits).padStart(config.digits, '0');
+}
+
+export function secondsUntilRotation(config: TicketCodeConfig, now: number = Date.now()): number {
+  return config.period - (Math.floor(now / 1000) % config.period);
+}
+
+/**
+ * Load the ticket's code secret, fetching it from the server on first use.
+ * Returns null if the ticket can't use rotating codes (caller falls back to
+ * server-generated QR codes).
+ */
+export async function getTicketCodeConfig(ticketId: string): Promise<TicketCodeConfig | null> {
+  try {
+    const stored = await AsyncStorage.getItem(storageKey(ticketId));
+    if (stored) return JSON.parse(stored);
+  } catch (error) {
+    console.error('Failed to read ticket code secret:', error);
+  }
+
+  try {
+    let config: TicketCodeConfig;
+    try {
+      config = await ticketsApi.issueCodeSecret(ticketId);
+    } catch (error: any) {
+      // Issued to this account before (reinstall/new phone) - rotate it
+      if (!error.message?.includes('already issued')) throw error;
+      config = await ticketsApi.issueCodeSecret(ticketId, true);
+    }
+    await AsyncStorage.setItem(storageKey(ticketId), JSON.stringify(config));
+    return config;
+  } catch (error) {
+    console.error('Rotating codes unavailable for ticket:', error);
+    return null;
+  }
+}